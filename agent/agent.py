@@ -1,19 +1,55 @@
 """
 Computer Use Agent — Placeholder Script
-Opens a browser, searches a query on Google, and saves a screenshot.
-Uploads all outputs to S3 and updates DynamoDB task status.
+Opens a browser, searches a query on Google, and saves a screenshot, the
+extracted search results (results.json) and a size-capped text snapshot.
+Uploads all outputs to S3 and updates DynamoDB task status; small result
+sets are also stored inline on the task item.
+
+Artifacts are content-addressed: bytes go to blobs/{sha256} only if that blob
+is not already stored, and the task item's `artifacts` map points at them.
+
+MULTI_TARGET jobs carry a list of queries/URLs on the task item; those run
+over a bounded pool of concurrent pages in one browser context using the
+async Playwright API; each target's outputs are listed in the `targets` manifest.
+
+Cancelling a job (cancel_job Lambda) stops the ECS task, which delivers
+SIGTERM; the agent then uploads its execution log and whatever targets have
+finished, and exits without touching the CANCELLED status.
+
+Every job also has a deadline (DEADLINE_SECONDS, settable per job at submit
+time), enforced by a watchdog thread (watchdog.py). When it passes, the agent
+keeps a viewport screenshot of where it got stuck, flushes the execution log
+and marks the task TIMED_OUT with its step timings before the browser is torn
+down.
+
+After every navigation the agent reads the page's Performance API timings
+(page_metrics.py). The task gets a `page_metrics` summary, each target
+record its own, and the tenant's histograms get page_ttfb, page_dom_ready
+and page_fcp samples, so a slow job can be put down to the site or to us.
 """
 
 import os
 import sys
 import json
 import time
+import signal
+import asyncio
+import hashlib
 import logging
 import traceback
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 import boto3
+from botocore.exceptions import ClientError
 from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+
+import latency
+import page_metrics
+from asset_cache import AssetCache
+from execution_log import ExecutionLog
+from profile_store import ProfileStore
+from watchdog import DeadlineExceeded, Watchdog
 
 # ---------------------------------------------------------------------------
 # Configuration from environment
@@ -23,7 +59,69 @@ SEARCH_QUERY = os.environ.get("SEARCH_QUERY", "hello world")
 S3_BUCKET = os.environ["S3_BUCKET"]
 DYNAMODB_TABLE = os.environ["DYNAMODB_TABLE"]
 PROXY_URL = os.environ.get("PROXY_URL", "")
+# Shared asset cache (asset_cache.py); only sub-resources go to it, pages go direct
+ASSET_CACHE_URL = os.environ.get("ASSET_CACHE_URL", "")
 AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
+JOB_TYPE = os.environ.get("JOB_TYPE", "SEARCH_QUERY")
+TARGET_CONCURRENCY = int(os.environ.get("TARGET_CONCURRENCY", "4"))
+TARGET_TIMEOUT_SECONDS = int(os.environ.get("TARGET_TIMEOUT_SECONDS", "120"))
+MAX_RESULTS = int(os.environ.get("MAX_RESULTS", "20"))
+PAGE_TEXT_MAX_BYTES = int(os.environ.get("PAGE_TEXT_MAX_BYTES", str(64 * 1024)))
+# Result sets up to this size are written to the task item for get_status
+INLINE_RESULTS_MAX_BYTES = int(os.environ.get("INLINE_RESULTS_MAX_BYTES", str(16 * 1024)))
+# Re-used blobs older than this are copied onto themselves, so a blob's last
+# write is never more than this behind its last use; the bucket keeps blobs
+# this much longer than other outputs (see terraform/s3.tf)
+BLOB_REFRESH_DAYS = int(os.environ.get("BLOB_REFRESH_DAYS", "7"))
+# Execution-log chunks go to S3 every N seconds, or sooner once N lines are pending
+LOG_FLUSH_SECONDS = float(os.environ.get("LOG_FLUSH_SECONDS", "5"))
+LOG_FLUSH_LINES = int(os.environ.get("LOG_FLUSH_LINES", "200"))
+TENANT_ID = os.environ.get("TENANT_ID", "")
+# Named browser profile (cookies + localStorage) to restore and refresh; see profile_store.py
+PROFILE = os.environ.get("PROFILE", "")
+PROFILE_MAX_BYTES = int(os.environ.get("PROFILE_MAX_BYTES", str(256 * 1024)))
+PROFILE_REFRESH_MINUTES = int(os.environ.get("PROFILE_REFRESH_MINUTES", "60"))
+# Latency histograms (see latency.py); timestamps come from submit_job / process_job
+STATS_TABLE = os.environ.get("STATS_TABLE", "")
+CREATED_AT = os.environ.get("CREATED_AT", "")
+DISPATCHED_AT = os.environ.get("DISPATCHED_AT", "")
+# Job-level deadline; the entrypoint's AGENT_TIMEOUT_SECONDS stays the hard backstop
+DEADLINE_SECONDS = int(os.environ.get("DEADLINE_SECONDS", "1200"))
+DEADLINE_GRACE_SECONDS = int(os.environ.get("DEADLINE_GRACE_SECONDS", "30"))
+
+# Runs in the page: organic results are the links wrapping an <h3> inside #search
+EXTRACT_RESULTS_JS = """
+(maxResults) => {
+    const results = [];
+    const seen = new Set();
+    const root = document.querySelector('#search') || document.body;
+    for (const h3 of root.querySelectorAll('a h3')) {
+        const link = h3.closest('a');
+        const url = link && link.href;
+        if (!url || !url.startsWith('http') || seen.has(url)) continue;
+        seen.add(url);
+        const block = link.closest('div.g, div[data-hveid], div[data-snc]') || link.parentElement;
+        const snippetEl = block && block.querySelector('[data-sncf], .VwiC3b, [style*="-webkit-line-clamp"]');
+        results.push({
+            rank: results.length + 1,
+            title: h3.innerText.trim(),
+            url: url,
+            snippet: snippetEl ? snippetEl.innerText.trim() : '',
+        });
+        if (results.length >= maxResults) break;
+    }
+    return results;
+}
+"""
+
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 1920, "height": 1080},
+    "user_agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/131.0.0.0 Safari/537.36"
+    ),
+}
 
 # ---------------------------------------------------------------------------
 # Logging
@@ -41,40 +139,187 @@ logger = logging.getLogger("agent")
 s3 = boto3.client("s3", region_name=AWS_REGION)
 dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
 table = dynamodb.Table(DYNAMODB_TABLE)
+stats_table = dynamodb.Table(STATS_TABLE) if STATS_TABLE and TENANT_ID else None
+
+# Streamed to tasks/{TASK_ID}/log/ while the job runs
+execution_log = ExecutionLog(s3, S3_BUCKET, TASK_ID, LOG_FLUSH_SECONDS, LOG_FLUSH_LINES)
+
+# Static assets go through the shared cache proxy (see asset_cache.py)
+asset_cache = AssetCache(ASSET_CACHE_URL) if ASSET_CACHE_URL else None
+
+profile_store = (
+    ProfileStore(s3, S3_BUCKET, TENANT_ID, PROFILE, PROFILE_MAX_BYTES, PROFILE_REFRESH_MINUTES)
+    if PROFILE and TENANT_ID else None
+)
+
+
+class JobCancelled(BaseException):
+    """The job was cancelled: ECS sent SIGTERM, or its status is already CANCELLED.
+
+    A BaseException so the per-target `except Exception` handlers don't swallow it.
+    """
+
+
+def on_sigterm(signum, frame):
+    # Only the first signal interrupts; the clean-up after it must be allowed to finish
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    raise JobCancelled("Stopped by ECS (SIGTERM)")
 
 
 def update_task_status(status: str, extra: dict | None = None):
-    """Update the task status in DynamoDB."""
+    """Update the task status in DynamoDB; raises JobCancelled if it was cancelled."""
     update_expr = "SET #s = :s, updated_at = :u"
     expr_values = {
         ":s": status,
         ":u": datetime.now(timezone.utc).isoformat(),
+        ":cancelled": "CANCELLED",
     }
     expr_names = {"#s": "status"}
 
     if extra:
         for key, value in extra.items():
-            update_expr += f", {key} = :{key}"
+            update_expr += f", #{key} = :{key}"
             expr_values[f":{key}"] = value
+            expr_names[f"#{key}"] = key
 
-    table.update_item(
-        Key={"task_id": TASK_ID},
-        UpdateExpression=update_expr,
-        ExpressionAttributeValues=expr_values,
-        ExpressionAttributeNames=expr_names,
-    )
+    try:
+        table.update_item(
+            Key={"task_id": TASK_ID},
+            UpdateExpression=update_expr,
+            ConditionExpression="#s <> :cancelled",
+            ExpressionAttributeValues=expr_values,
+            ExpressionAttributeNames=expr_names,
+        )
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            raise JobCancelled("Task was cancelled")
+        raise
     logger.info("Task %s status updated to %s", TASK_ID, status)
+    record_transition(status)
+
+
+# Set when the task goes RUNNING; the start of the `run` latency
+running_since = None
+
+
+def record_transition(status: str):
+    """Add this transition's latencies to the tenant's histograms; never fails the job."""
+    global running_since
+    if not stats_table:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    samples = []
+    if status == "RUNNING":
+        running_since = now
+        if DISPATCHED_AT:
+            samples.append(("provisioning", latency.elapsed_ms(DISPATCHED_AT)))
+    elif status in ("COMPLETED", "FAILED", "TIMED_OUT"):
+        if running_since:
+            samples.append(("run", latency.elapsed_ms(running_since)))
+        if CREATED_AT:
+            samples.append(("total", latency.elapsed_ms(CREATED_AT)))
+    for metric, ms in samples:
+        try:
+            latency.record(stats_table, TENANT_ID, metric, ms)
+        except Exception as exc:
+            logger.warning("Failed to record %s latency: %s", metric, exc)
+    if status in ("COMPLETED", "FAILED", "TIMED_OUT"):
+        for metric, values in page_metrics.samples(page_records).items():
+            try:
+                latency.record_many(stats_table, TENANT_ID, metric, values)
+            except Exception as exc:
+                logger.warning("Failed to record %s latency: %s", metric, exc)
 
 
-def upload_to_s3(local_path: str, s3_key: str, content_type: str = "application/octet-stream"):
-    """Upload a file to S3."""
-    s3.upload_file(
-        local_path,
-        S3_BUCKET,
-        s3_key,
-        ExtraArgs={"ContentType": content_type},
-    )
-    logger.info("Uploaded %s → s3://%s/%s", local_path, S3_BUCKET, s3_key)
+# Performance API records of every page the job navigated to (page_metrics.py)
+page_records = []
+
+
+def capture_page_metrics(page) -> dict | None:
+    """Read the current page's timings into page_records; never fails the job."""
+    try:
+        record = page_metrics.compact(page.evaluate(page_metrics.COLLECT_JS))
+    except Exception as exc:
+        logger.warning("Could not read page metrics: %s", exc)
+        return None
+    if record:
+        page_records.append(record)
+    return record
+
+
+async def capture_page_metrics_async(page) -> dict | None:
+    """Async twin of capture_page_metrics."""
+    try:
+        record = page_metrics.compact(await page.evaluate(page_metrics.COLLECT_JS))
+    except Exception as exc:
+        logger.warning("Could not read page metrics: %s", exc)
+        return None
+    if record:
+        page_records.append(record)
+    return record
+
+
+def page_metrics_attrs() -> dict:
+    """The task's `page_metrics` summary, if any page was measured."""
+    return {"page_metrics": page_metrics.summarize(page_records)} if page_records else {}
+
+
+# The job's steps as [name, started, ended] (monotonic), for the TIMED_OUT timings
+steps = []
+
+
+def begin_step(name: str):
+    """Close the current step and start the next one."""
+    now = time.monotonic()
+    if steps and steps[-1][2] is None:
+        steps[-1][2] = now
+    steps.append([name, now, None])
+
+
+def step_timings() -> dict:
+    """Elapsed time per step, and the step the job was in (if unfinished)."""
+    now = time.monotonic()
+    return {
+        "elapsed_ms": int(job_watchdog.elapsed() * 1000),
+        "steps": [{"step": name, "ms": int(((ended or now) - started) * 1000)} for name, started, ended in steps],
+        "stuck_in": steps[-1][0] if steps and steps[-1][2] is None else "",
+    }
+
+
+def mark_timed_out():
+    """Mark the task TIMED_OUT with its timings, unless it already reached another final status."""
+    now = datetime.now(timezone.utc).isoformat()
+    extra = page_metrics_attrs()
+    try:
+        table.update_item(
+            Key={"task_id": TASK_ID},
+            UpdateExpression=(
+                "SET #s = :s, updated_at = :u, timed_out_at = :u, #e = :e, artifacts = :a, "
+                "timings = :t, deadline_seconds = :d"
+                + "".join(f", {name} = :{name}" for name in extra)
+            ),
+            ConditionExpression="NOT #s IN (:cancelled, :completed, :failed)",
+            ExpressionAttributeNames={"#s": "status", "#e": "error"},
+            ExpressionAttributeValues={
+                ":s": "TIMED_OUT",
+                ":u": now,
+                ":e": f"Job deadline of {DEADLINE_SECONDS}s exceeded",
+                ":a": artifacts,
+                ":t": step_timings(),
+                ":d": DEADLINE_SECONDS,
+                ":cancelled": "CANCELLED",
+                ":completed": "COMPLETED",
+                ":failed": "FAILED",
+                **{f":{name}": value for name, value in extra.items()},
+            },
+        )
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            logger.info("Task %s already finished — not marking it TIMED_OUT", TASK_ID)
+            return
+        raise
+    logger.info("Task %s status updated to TIMED_OUT", TASK_ID)
+    record_transition("TIMED_OUT")
 
 
 def upload_bytes_to_s3(data: bytes, s3_key: str, content_type: str = "application/octet-stream"):
@@ -83,6 +328,47 @@ def upload_bytes_to_s3(data: bytes, s3_key: str, content_type: str = "applicatio
     logger.info("Uploaded bytes → s3://%s/%s", S3_BUCKET, s3_key)
 
 
+def store_blob(data: bytes, content_type: str = "application/octet-stream") -> dict:
+    """Store `data` under blobs/{sha256} unless it is already there; return a pointer."""
+    digest = hashlib.sha256(data).hexdigest()
+    key = f"blobs/{digest}"
+
+    try:
+        head = s3.head_object(Bucket=S3_BUCKET, Key=key)
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+            raise
+        head = None
+
+    if head is None:
+        s3.put_object(Bucket=S3_BUCKET, Key=key, Body=data, ContentType=content_type)
+        logger.info("Uploaded %d bytes → s3://%s/%s", len(data), S3_BUCKET, key)
+    elif datetime.now(timezone.utc) - head["LastModified"] > timedelta(days=BLOB_REFRESH_DAYS):
+        s3.copy_object(
+            Bucket=S3_BUCKET,
+            Key=key,
+            CopySource={"Bucket": S3_BUCKET, "Key": key},
+            ContentType=head.get("ContentType", content_type),
+            MetadataDirective="REPLACE",
+        )
+        logger.info("Refreshed existing blob s3://%s/%s", S3_BUCKET, key)
+    else:
+        logger.info("Blob s3://%s/%s already stored — skipped upload", S3_BUCKET, key)
+
+    return {"key": key, "sha256": digest, "size": len(data), "content_type": content_type}
+
+
+# Pointers to this task's artifacts, written to the task item as `artifacts`
+artifacts = {}
+
+
+def store_artifact(name: str, data: bytes, content_type: str = "application/octet-stream") -> dict:
+    """Store a task-level artifact as a blob and remember its pointer."""
+    pointer = store_blob(data, content_type)
+    artifacts[name] = pointer
+    return pointer
+
+
 def send_heartbeat():
     """Write a heartbeat marker to S3 so the health check knows we started."""
     heartbeat = {
@@ -97,6 +383,70 @@ def send_heartbeat():
     )
 
 
+def cap_text(text: str, max_bytes: int = PAGE_TEXT_MAX_BYTES) -> str:
+    """Truncate `text` to at most `max_bytes` of UTF-8."""
+    data = text.encode()
+    if len(data) <= max_bytes:
+        return text
+    return data[:max_bytes].decode(errors="ignore") + "\n[truncated]"
+
+
+def results_document(query: str, url: str, title: str, results: list) -> dict:
+    """Shape the extracted results the way results.json is stored."""
+    return {
+        "task_id": TASK_ID,
+        "query": query,
+        "url": url,
+        "title": title,
+        "extracted_at": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+
+
+def inline_results(results: list) -> dict:
+    """Task-item attributes for a result set: always the count, the list if small."""
+    attrs = {"results_count": len(results)}
+    if len(json.dumps(results).encode()) <= INLINE_RESULTS_MAX_BYTES:
+        attrs["results"] = results
+    return attrs
+
+
+def launch_options() -> dict:
+    """Chromium launch options shared by the sync and async paths."""
+    launch_opts = {
+        "headless": True,
+        "args": ["--no-sandbox", "--disable-dev-shm-usage"],
+    }
+    if PROXY_URL:
+        launch_opts["proxy"] = {"server": PROXY_URL}
+        logger.info("Using proxy: %s", PROXY_URL)
+    return launch_opts
+
+
+def context_options() -> dict:
+    """new_context() options, starting from the job's stored profile if it has one."""
+    options = dict(CONTEXT_OPTIONS)
+    if profile_store:
+        state = profile_store.load()
+        if state:
+            options["storage_state"] = state
+            execution_log.log(f"Restored browser profile '{PROFILE}' ({len(state.get('cookies', []))} cookies)")
+        else:
+            execution_log.log(f"No stored browser profile '{PROFILE}' yet — starting fresh")
+    return options
+
+
+def save_profile(state: dict):
+    """Write the context's state back to the job's profile; never fails the job."""
+    if not profile_store:
+        return
+    try:
+        if profile_store.save(state):
+            execution_log.log(f"Saved browser profile '{PROFILE}'")
+    except Exception as exc:
+        logger.warning("Failed to save browser profile %s: %s", PROFILE, exc)
+
+
 def run_agent():
     """Main agent logic: open browser → search → screenshot."""
     logger.info("Starting agent for task %s with query: %s", TASK_ID, SEARCH_QUERY)
@@ -107,89 +457,356 @@ def run_agent():
     # Send heartbeat
     send_heartbeat()
 
-    screenshot_path = "/tmp/screenshot.png"
-    execution_log_lines = []
-
     with sync_playwright() as p:
-        # Browser launch options
-        launch_opts = {
-            "headless": True,
-            "args": ["--no-sandbox", "--disable-dev-shm-usage"],
-        }
-        if PROXY_URL:
-            launch_opts["proxy"] = {"server": PROXY_URL}
-            logger.info("Using proxy: %s", PROXY_URL)
-
-        execution_log_lines.append(f"[{datetime.now(timezone.utc).isoformat()}] Launching browser")
-        browser = p.chromium.launch(**launch_opts)
-
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/131.0.0.0 Safari/537.36"
-            ),
-        )
+        begin_step("launch")
+        execution_log.log("Launching browser")
+        browser = p.chromium.launch(**launch_options())
+
+        context = browser.new_context(**context_options())
+        context.add_init_script(page_metrics.INIT_JS)
+        if asset_cache:
+            context.route("**/*", asset_cache.handle_route)
         page = context.new_page()
 
-        # Step 1: Navigate to Google
-        execution_log_lines.append(f"[{datetime.now(timezone.utc).isoformat()}] Navigating to Google")
-        logger.info("Navigating to Google…")
-        page.goto("https://www.google.com", wait_until="domcontentloaded", timeout=30000)
-        time.sleep(1)
-
-        # Step 2: Search
-        execution_log_lines.append(
-            f"[{datetime.now(timezone.utc).isoformat()}] Searching for: {SEARCH_QUERY}"
-        )
-        logger.info("Searching for: %s", SEARCH_QUERY)
-
-        # Handle consent dialogs (common in some regions)
         try:
-            consent_btn = page.locator("button:has-text('Accept all'), button:has-text('I agree')")
-            if consent_btn.count() > 0:
-                consent_btn.first.click()
-                time.sleep(1)
-        except Exception:
-            pass  # No consent dialog
-
-        search_box = page.locator('textarea[name="q"], input[name="q"]')
-        search_box.first.fill(SEARCH_QUERY)
-        search_box.first.press("Enter")
-        page.wait_for_load_state("domcontentloaded", timeout=15000)
-        time.sleep(2)
-
-        # Step 3: Screenshot
-        execution_log_lines.append(
-            f"[{datetime.now(timezone.utc).isoformat()}] Taking screenshot of search results"
-        )
-        logger.info("Taking screenshot…")
-        page.screenshot(path=screenshot_path, full_page=True)
-
-        execution_log_lines.append(f"[{datetime.now(timezone.utc).isoformat()}] Done — closing browser")
+            # Step 1: Navigate to Google
+            begin_step("navigate")
+            execution_log.log("Navigating to Google")
+            logger.info("Navigating to Google…")
+            page.goto("https://www.google.com", wait_until="domcontentloaded", timeout=30000)
+            capture_page_metrics(page)
+            time.sleep(1)
+
+            # Step 2: Search
+            begin_step("search")
+            execution_log.log(f"Searching for: {SEARCH_QUERY}")
+            logger.info("Searching for: %s", SEARCH_QUERY)
+
+            # Handle consent dialogs (common in some regions)
+            try:
+                consent_btn = page.locator("button:has-text('Accept all'), button:has-text('I agree')")
+                if consent_btn.count() > 0:
+                    consent_btn.first.click()
+                    time.sleep(1)
+            except Exception:
+                pass  # No consent dialog
+
+            search_box = page.locator('textarea[name="q"], input[name="q"]')
+            search_box.first.fill(SEARCH_QUERY)
+            search_box.first.press("Enter")
+            page.wait_for_load_state("domcontentloaded", timeout=15000)
+            time.sleep(2)
+            capture_page_metrics(page)
+
+            # Step 3: Extract results + text snapshot from the DOM
+            begin_step("extract")
+            execution_log.log("Extracting search results")
+            results = page.evaluate(EXTRACT_RESULTS_JS, MAX_RESULTS)
+            results_doc = results_document(SEARCH_QUERY, page.url, page.title(), results)
+            page_text = cap_text(page.inner_text("body"))
+            logger.info("Extracted %d results", len(results))
+
+            # Step 4: Screenshot
+            begin_step("screenshot")
+            execution_log.log("Taking screenshot of search results")
+            logger.info("Taking screenshot…")
+            screenshot = page.screenshot(full_page=True)
+        except DeadlineExceeded:
+            save_viewport(page)
+            raise
+
+        if asset_cache:
+            execution_log.log(asset_cache.summary())
+        browser_state = context.storage_state()
+        execution_log.log("Done — closing browser")
         browser.close()
 
+    save_profile(browser_state)
+
     # Upload outputs to S3
+    begin_step("upload")
     logger.info("Uploading outputs to S3…")
-    upload_to_s3(screenshot_path, f"tasks/{TASK_ID}/screenshot.png", "image/png")
+    store_artifact("screenshot", screenshot, "image/png")
+    store_artifact("results", json.dumps(results_doc, indent=2).encode(), "application/json")
+    store_artifact("page_text", page_text.encode(), "text/plain; charset=utf-8")
 
-    execution_log = "\n".join(execution_log_lines)
-    upload_bytes_to_s3(
-        execution_log.encode(),
-        f"tasks/{TASK_ID}/execution.log",
-        "text/plain",
-    )
+    store_artifact("execution_log", execution_log.close(), "text/plain")
 
     # Mark COMPLETED
-    update_task_status("COMPLETED", {"completed_at": datetime.now(timezone.utc).isoformat()})
+    update_task_status("COMPLETED", {
+        "completed_at": datetime.now(timezone.utc).isoformat(),
+        "artifacts": artifacts,
+        **inline_results(results),
+        **page_metrics_attrs(),
+    })
     logger.info("Agent completed successfully for task %s", TASK_ID)
 
 
+def save_viewport(page):
+    """Keep a viewport screenshot of wherever the job got stuck; best effort."""
+    try:
+        store_artifact("screenshot", page.screenshot(full_page=False, timeout=5000), "image/png")
+        execution_log.log(f"Saved a viewport screenshot of {page.url}")
+    except Exception as exc:
+        logger.warning("Could not capture a viewport screenshot: %s", exc)
+
+
+# ---------------------------------------------------------------------------
+# Multi-target jobs
+# ---------------------------------------------------------------------------
+def load_targets() -> list:
+    """Read the job's target list from its DynamoDB item."""
+    result = table.get_item(
+        Key={"task_id": TASK_ID},
+        ProjectionExpression="targets",
+        ConsistentRead=True,
+    )
+    return list(result.get("Item", {}).get("targets", []))
+
+
+def record_target_progress(succeeded: bool):
+    """Bump the task's targets_completed / targets_failed counter."""
+    counter = "targets_completed" if succeeded else "targets_failed"
+    table.update_item(
+        Key={"task_id": TASK_ID},
+        UpdateExpression=f"ADD {counter} :one SET updated_at = :u",
+        ExpressionAttributeValues={":one": 1, ":u": datetime.now(timezone.utc).isoformat()},
+    )
+
+
+async def _search(page, query: str):
+    """Run one Google search on `page` (async twin of the single-query flow)."""
+    await page.goto("https://www.google.com", wait_until="domcontentloaded", timeout=30000)
+    try:
+        consent_btn = page.locator("button:has-text('Accept all'), button:has-text('I agree')")
+        if await consent_btn.count() > 0:
+            await consent_btn.first.click()
+    except Exception:
+        pass  # No consent dialog
+
+    search_box = page.locator('textarea[name="q"], input[name="q"]')
+    await search_box.first.fill(query)
+    await search_box.first.press("Enter")
+    await page.wait_for_load_state("domcontentloaded", timeout=15000)
+
+
+async def _run_target(page, index: int, target: str) -> dict:
+    """Execute one target and upload its outputs; returns its result record."""
+    if target.startswith(("http://", "https://")):
+        await page.goto(target, wait_until="domcontentloaded", timeout=30000)
+    else:
+        await _search(page, target)
+
+    metrics = await capture_page_metrics_async(page)
+    title = await page.title()
+    results = await page.evaluate(EXTRACT_RESULTS_JS, MAX_RESULTS)
+    page_text = cap_text(await page.inner_text("body"))
+    screenshot = await page.screenshot(full_page=True)
+
+    results_doc = results_document(target, page.url, title, results)
+    target_artifacts = {
+        "screenshot": await asyncio.to_thread(store_blob, screenshot, "image/png"),
+        "results": await asyncio.to_thread(
+            store_blob, json.dumps(results_doc, indent=2).encode(), "application/json"
+        ),
+        "page_text": await asyncio.to_thread(
+            store_blob, page_text.encode(), "text/plain; charset=utf-8"
+        ),
+    }
+    record = {
+        "status": "COMPLETED",
+        "url": page.url,
+        "title": title,
+        "results_count": len(results),
+        "artifacts": target_artifacts,
+    }
+    if metrics:
+        record["page_metrics"] = metrics
+    return record
+
+
+async def _target_worker(context, queue: asyncio.Queue, results: list):
+    """Drain targets from `queue` on one page, replacing the page after a failure."""
+    page = await context.new_page()
+    while True:
+        try:
+            index, target = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+
+        started_at = datetime.now(timezone.utc).isoformat()
+        try:
+            result = await asyncio.wait_for(_run_target(page, index, target), TARGET_TIMEOUT_SECONDS)
+        except Exception as exc:
+            logger.warning("Target %d failed: %s", index, exc)
+            result = {"status": "FAILED", "error": str(exc) or type(exc).__name__}
+            # A timed-out or crashed page can't be trusted for the next target
+            try:
+                await page.close()
+            except Exception:
+                pass
+            page = await context.new_page()
+
+        result.update(index=index, target=target, started_at=started_at,
+                      finished_at=datetime.now(timezone.utc).isoformat())
+        results[index] = result
+        execution_log.log(f"Target {index} {result['status']}: {target}")
+
+        try:
+            await asyncio.to_thread(record_target_progress, result["status"] == "COMPLETED")
+        except Exception as exc:
+            logger.error("Failed to record target %d: %s", index, exc)
+
+    await page.close()
+
+
+async def run_targets(targets: list, results: list) -> list:
+    """Run every target over a pool of TARGET_CONCURRENCY pages in one context.
+
+    Each finished target's record is put in `results` as soon as it's done, so
+    a cancelled run still knows which targets completed.
+    """
+    queue = asyncio.Queue()
+    for index, target in enumerate(targets):
+        queue.put_nowait((index, target))
+
+    async with async_playwright() as p:
+        execution_log.log("Launching browser")
+        browser = await p.chromium.launch(**launch_options())
+        context = await browser.new_context(**context_options())
+        await context.add_init_script(page_metrics.INIT_JS)
+        if asset_cache:
+            await context.route("**/*", asset_cache.handle_route_async)
+
+        workers = min(TARGET_CONCURRENCY, len(targets))
+        execution_log.log(f"Running {len(targets)} targets on {workers} pages")
+        await asyncio.gather(*(
+            _target_worker(context, queue, results) for _ in range(workers)
+        ))
+
+        if asset_cache:
+            execution_log.log(asset_cache.summary())
+        browser_state = await context.storage_state()
+        execution_log.log("Done — closing browser")
+        await browser.close()
+
+    save_profile(browser_state)
+    return results
+
+
+def store_target_manifest(results: list, total: int) -> int:
+    """Store the `targets` manifest for the finished targets; returns how many completed.
+
+    A cancelled or timed-out run lists only the targets that finished, so
+    readers find a target by its record's `index`, not its position.
+    """
+    completed = sum(1 for r in results if r["status"] == "COMPLETED")
+    manifest = {
+        "task_id": TASK_ID,
+        "total": total,
+        "completed": completed,
+        "failed": len(results) - completed,
+        "targets": results,
+    }
+    store_artifact("targets", json.dumps(manifest, indent=2).encode(), "application/json")
+    return completed
+
+
+def run_multi_target_agent():
+    """Fan a MULTI_TARGET job's targets out over concurrent pages."""
+    targets = load_targets()
+    if not targets:
+        raise ValueError("MULTI_TARGET job has no targets")
+    logger.info("Starting agent for task %s with %d targets", TASK_ID, len(targets))
+
+    update_task_status("RUNNING")
+    send_heartbeat()
+
+    results = [None] * len(targets)
+    begin_step("targets")
+    try:
+        asyncio.run(run_targets(targets, results))
+    except (JobCancelled, DeadlineExceeded):
+        store_target_manifest([r for r in results if r], len(targets))
+        raise
+
+    begin_step("upload")
+    completed = store_target_manifest(results, len(targets))
+    store_artifact("execution_log", execution_log.close(), "text/plain")
+
+    if not completed:
+        raise RuntimeError(f"All {len(results)} targets failed")
+
+    update_task_status("COMPLETED", {
+        "completed_at": datetime.now(timezone.utc).isoformat(),
+        "artifacts": artifacts,
+        **page_metrics_attrs(),
+    })
+    logger.info("Agent completed %d/%d targets for task %s", completed, len(results), TASK_ID)
+
+
+def save_cancelled_outputs():
+    """Upload the execution log and point the cancelled task at what was saved."""
+    execution_log.log("Job cancelled — saving partial outputs")
+    store_artifact("execution_log", execution_log.close(), "text/plain")
+    table.update_item(
+        Key={"task_id": TASK_ID},
+        UpdateExpression="SET artifacts = :a, updated_at = :u",
+        ExpressionAttributeValues={":a": artifacts, ":u": datetime.now(timezone.utc).isoformat()},
+    )
+
+
+def save_timed_out_outputs():
+    """Upload the execution log and mark the task TIMED_OUT."""
+    timings = step_timings()
+    execution_log.log(
+        f"Job deadline of {DEADLINE_SECONDS}s exceeded after {timings['elapsed_ms']} ms"
+        + (f" in step '{timings['stuck_in']}'" if timings["stuck_in"] else "")
+    )
+    store_artifact("execution_log", execution_log.close(), "text/plain")
+    mark_timed_out()
+
+
+def on_hard_timeout():
+    """Runs on the watchdog thread when the main thread didn't wind down in time."""
+    execution_log.log("Agent did not wind down after the deadline — exiting")
+    try:
+        store_artifact("execution_log", execution_log.close(), "text/plain")
+    finally:
+        mark_timed_out()
+
+
+job_watchdog = Watchdog(DEADLINE_SECONDS, DEADLINE_GRACE_SECONDS, on_hard_timeout)
+
+
 def main():
+    signal.signal(signal.SIGTERM, on_sigterm)
+    execution_log.start()
+    job_watchdog.start()
     try:
-        run_agent()
+        if JOB_TYPE == "MULTI_TARGET":
+            run_multi_target_agent()
+        else:
+            run_agent()
+        job_watchdog.stop()
+    except DeadlineExceeded as exc:
+        logger.error("Agent timed out: %s", exc)
+        try:
+            save_timed_out_outputs()
+        except Exception as upload_err:
+            logger.error("Failed to save partial outputs: %s", upload_err)
+        job_watchdog.stop()
+        sys.exit(1)
+    except JobCancelled as exc:
+        job_watchdog.stop()
+        logger.warning("Agent cancelled: %s", exc)
+        try:
+            save_cancelled_outputs()
+        except Exception as upload_err:
+            logger.error("Failed to save partial outputs: %s", upload_err)
+        sys.exit(143)
     except Exception as exc:
+        job_watchdog.stop()
         logger.error("Agent failed: %s", exc)
         logger.error(traceback.format_exc())
 
@@ -200,16 +817,17 @@ def main():
             "traceback": traceback.format_exc(),
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
+        execution_log.log(f"Agent failed: {exc}")
         try:
-            upload_bytes_to_s3(
-                json.dumps(error_info, indent=2).encode(),
-                f"tasks/{TASK_ID}/error.json",
-                "application/json",
-            )
+            store_artifact("error", json.dumps(error_info, indent=2).encode(), "application/json")
+            store_artifact("execution_log", execution_log.close(), "text/plain")
         except Exception as upload_err:
             logger.error("Failed to upload error info: %s", upload_err)
 
-        update_task_status("FAILED", {"error": str(exc)})
+        try:
+            update_task_status("FAILED", {"error": str(exc), "artifacts": artifacts, **page_metrics_attrs()})
+        except JobCancelled:
+            logger.info("Task was cancelled meanwhile — leaving it CANCELLED")
         sys.exit(1)
 
 
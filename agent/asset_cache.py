@@ -0,0 +1,141 @@
+"""
+Route the browser's static sub-resources through the shared cache proxy.
+
+The cache is never a hard dependency: the browser itself connects directly,
+and only stylesheets, scripts, fonts and images are intercepted with
+Playwright routing. They are requested from the proxy (ASSET_CACHE_URL) as
+absolute-form GETs over plain HTTP (the proxy makes the TLS connection
+upstream) and the page is fulfilled from the response. Any failure falls
+back to the browser's own, direct request. After a connection failure the
+cache is bypassed for BYPASS_SECONDS, so a proxy that is down or being
+redeployed costs one short connect timeout rather than one per asset.
+"""
+
+import gzip
+import time
+import asyncio
+import logging
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("agent")
+
+CACHED_RESOURCE_TYPES = {"stylesheet", "script", "font", "image"}
+FETCH_TIMEOUT_SECONDS = 30
+CONNECT_TIMEOUT_SECONDS = 2
+BYPASS_SECONDS = 30
+
+# Not copied from the browser's request / proxy's response
+SKIP_REQUEST_HEADERS = {"host", "connection", "accept-encoding", "proxy-connection"}
+SKIP_RESPONSE_HEADERS = {"connection", "content-encoding", "content-length", "transfer-encoding", "x-cache"}
+
+
+class AssetCache:
+    """Fetches cacheable requests via the proxy; one keep-alive connection per thread."""
+
+    def __init__(self, proxy_url: str):
+        parts = urlsplit(proxy_url if "://" in proxy_url else f"http://{proxy_url}")
+        self.host = parts.hostname
+        self.port = parts.port or 3128
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._down_until = 0.0
+
+    def wants(self, request) -> bool:
+        if time.monotonic() < self._down_until:
+            self.bypassed += 1
+            return False
+        return (
+            request.method == "GET"
+            and request.resource_type in CACHED_RESOURCE_TYPES
+            and request.url.startswith(("http://", "https://"))
+        )
+
+    def fetch(self, url: str, headers: dict) -> dict:
+        """GET url through the proxy; returns kwargs for route.fulfill()."""
+        try:
+            return self._fetch(url, headers)
+        except (http.client.HTTPException, OSError):
+            # Stale keep-alive connection — retry once on a fresh one
+            self._local.conn = None
+        try:
+            return self._fetch(url, headers)
+        except (http.client.HTTPException, OSError):
+            # The proxy itself is unreachable or broken: go direct for a while
+            self._local.conn = None
+            self._down_until = time.monotonic() + BYPASS_SECONDS
+            logger.warning("Asset cache failing — bypassing it for %ds", BYPASS_SECONDS)
+            raise
+
+    def _fetch(self, url: str, headers: dict) -> dict:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=CONNECT_TIMEOUT_SECONDS)
+            conn.connect()
+            conn.sock.settimeout(FETCH_TIMEOUT_SECONDS)
+            self._local.conn = conn
+
+        conn.putrequest("GET", url, skip_host=True, skip_accept_encoding=True)
+        conn.putheader("Host", urlsplit(url).netloc)
+        conn.putheader("Accept-Encoding", "gzip")
+        for name, value in headers.items():
+            if name.lower() not in SKIP_REQUEST_HEADERS:
+                conn.putheader(name, value)
+        conn.endheaders()
+
+        response = conn.getresponse()
+        body = response.read()
+        if response.getheader("Content-Encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+        if response.getheader("X-Cache") == "HIT":
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        return {
+            "status": response.status,
+            "headers": {
+                name: value for name, value in response.getheaders()
+                if name.lower() not in SKIP_RESPONSE_HEADERS
+            },
+            "body": body,
+        }
+
+    def handle_route(self, route):
+        """Sync Playwright route handler."""
+        request = route.request
+        if not self.wants(request):
+            route.continue_()
+            return
+        try:
+            fulfilled = self.fetch(request.url, request.headers)
+        except Exception as exc:
+            logger.debug("Asset cache fetch failed for %s: %s", request.url, exc)
+            route.continue_()
+            return
+        route.fulfill(**fulfilled)
+
+    async def handle_route_async(self, route):
+        """Async Playwright route handler; the blocking fetch runs in a worker thread."""
+        request = route.request
+        if not self.wants(request):
+            await route.continue_()
+            return
+        try:
+            fulfilled = await asyncio.to_thread(self.fetch, request.url, request.headers)
+        except Exception as exc:
+            logger.debug("Asset cache fetch failed for %s: %s", request.url, exc)
+            await route.continue_()
+            return
+        await route.fulfill(**fulfilled)
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        ratio = self.hits / total if total else 0.0
+        summary = f"{self.hits}/{total} assets served from the shared cache ({ratio:.0%})"
+        if self.bypassed:
+            summary += f", {self.bypassed} fetched directly while it was failing"
+        return summary
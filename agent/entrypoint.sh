@@ -6,6 +6,8 @@ set -euo pipefail
 # - Sends an initial heartbeat to S3 so health checks know the task started
 # - Runs the agent with a 25-minute timeout (buffer under ECS 30-min stop)
 # - On timeout / failure, marks the task as FAILED/HUNG in DynamoDB
+# - Forwards SIGTERM (ECS StopTask, e.g. a cancelled job) to the agent so it
+#   can upload partial outputs before the SIGKILL that follows
 # ============================================================================
 
 TIMEOUT_SECONDS=${AGENT_TIMEOUT_SECONDS:-1500}  # 25 minutes
@@ -14,12 +16,23 @@ echo "[entrypoint] Task ID: ${TASK_ID}"
 echo "[entrypoint] Search Query: ${SEARCH_QUERY:-hello world}"
 echo "[entrypoint] Timeout: ${TIMEOUT_SECONDS}s"
 
-# Run the agent with a timeout
-if timeout "${TIMEOUT_SECONDS}" python /app/agent.py; then
+# Run the agent with a timeout. As PID 1 this shell gets ECS's SIGTERM; pass it
+# on (timeout relays it to python) and keep waiting for the agent to finish.
+timeout "${TIMEOUT_SECONDS}" python /app/agent.py &
+AGENT_PID=$!
+trap 'echo "[entrypoint] SIGTERM received — stopping agent"; kill -TERM "${AGENT_PID}" 2>/dev/null || true' TERM INT
+
+EXIT_CODE=0
+wait "${AGENT_PID}" || EXIT_CODE=$?
+while kill -0 "${AGENT_PID}" 2>/dev/null; do
+    EXIT_CODE=0
+    wait "${AGENT_PID}" || EXIT_CODE=$?
+done
+
+if [ "${EXIT_CODE}" -eq 0 ]; then
     echo "[entrypoint] Agent completed successfully."
     exit 0
 else
-    EXIT_CODE=$?
     if [ "${EXIT_CODE}" -eq 124 ]; then
         echo "[entrypoint] ERROR: Agent exceeded timeout of ${TIMEOUT_SECONDS}s — marking as HUNG."
         # Best-effort status update
@@ -30,7 +43,8 @@ table = boto3.resource('dynamodb', region_name=os.environ.get('AWS_REGION','us-e
 table.update_item(
     Key={'task_id': os.environ['TASK_ID']},
     UpdateExpression='SET #s = :s, updated_at = :u, error = :e',
-    ExpressionAttributeValues={':s': 'HUNG', ':u': datetime.now(timezone.utc).isoformat(), ':e': 'Agent timed out after ${TIMEOUT_SECONDS}s'},
+    ConditionExpression='#s <> :c',
+    ExpressionAttributeValues={':s': 'HUNG', ':c': 'CANCELLED', ':u': datetime.now(timezone.utc).isoformat(), ':e': 'Agent timed out after ${TIMEOUT_SECONDS}s'},
     ExpressionAttributeNames={'#s': 'status'}
 )
 " 2>/dev/null || true
@@ -0,0 +1,143 @@
+"""
+Incremental execution log for the agent.
+
+Lines are kept in memory only until the next flush: every `flush_seconds`, or
+as soon as `flush_lines` are pending, they are uploaded as a gzip-compressed,
+sequence-numbered chunk and the chunk index is rewritten:
+
+    tasks/{task_id}/log/000001.log.gz
+    tasks/{task_id}/log/000002.log.gz
+    tasks/{task_id}/log/index.json   {"chunks": [...], "next_seq": 3, "complete": false}
+
+A job that hangs or crashes still leaves everything up to its last flush in
+S3. The full log is also appended to a local file so the finished run can
+store it as one artifact.
+"""
+
+import gzip
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+
+logger = logging.getLogger("agent")
+
+
+class ExecutionLog:
+    """Thread-safe line log that flushes chunks to S3 from a background thread."""
+
+    def __init__(self, s3, bucket: str, task_id: str, flush_seconds: float = 5,
+                 flush_lines: int = 200, local_path: str = "/tmp/execution.log"):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = f"tasks/{task_id}/log"
+        self.task_id = task_id
+        self.flush_seconds = flush_seconds
+        self.flush_lines = flush_lines
+        self.local_path = local_path
+
+        self._pending = []
+        self._chunks = []
+        self._next_seq = 1
+        self._lock = threading.Lock()        # guards _pending and the local file
+        self._flush_lock = threading.Lock()  # one upload at a time, in sequence order
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        open(self.local_path, "w").close()
+
+    def start(self):
+        """Start the background flusher."""
+        self._thread = threading.Thread(target=self._run, name="execution-log", daemon=True)
+        self._thread.start()
+
+    def log(self, message: str):
+        """Append a timestamped line."""
+        line = f"[{datetime.now(timezone.utc).isoformat()}] {message}"
+        with self._lock:
+            self._pending.append(line)
+            with open(self.local_path, "a") as fh:
+                fh.write(line + "\n")
+            if len(self._pending) >= self.flush_lines:
+                self._wake.set()
+
+    def close(self) -> bytes:
+        """Stop the flusher, upload what's left, mark the index complete.
+
+        Returns the full log for storing as the execution_log artifact.
+        """
+        self._stopped.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+        self.flush(complete=True)
+        with self._lock, open(self.local_path, "rb") as fh:
+            return fh.read()
+
+    def flush(self, complete: bool = False):
+        """Upload pending lines as the next chunk and rewrite the index."""
+        with self._flush_lock:
+            with self._lock:
+                lines, self._pending = self._pending, []
+            if not lines and not complete:
+                return
+
+            if lines:
+                try:
+                    self._upload_chunk(lines)
+                except Exception as exc:
+                    # Keep the lines for the next attempt rather than losing them
+                    logger.warning("Execution log chunk upload failed: %s", exc)
+                    with self._lock:
+                        self._pending = lines + self._pending
+                    return
+
+            try:
+                self._write_index(complete)
+            except Exception as exc:
+                # The next flush rewrites the whole index
+                logger.warning("Execution log index upload failed: %s", exc)
+
+    def _upload_chunk(self, lines: list):
+        seq = self._next_seq
+        key = f"{self.prefix}/{seq:06d}.log.gz"
+        body = gzip.compress(("\n".join(lines) + "\n").encode())
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=body,
+            ContentType="text/plain; charset=utf-8",
+            ContentEncoding="gzip",
+        )
+        self._chunks.append({
+            "seq": seq,
+            "key": key,
+            "lines": len(lines),
+            "bytes": len(body),
+            "first_at": lines[0][1:lines[0].index("]")],
+            "last_at": lines[-1][1:lines[-1].index("]")],
+        })
+        self._next_seq = seq + 1
+
+    def _write_index(self, complete: bool):
+        index = {
+            "task_id": self.task_id,
+            "chunks": self._chunks,
+            "next_seq": self._next_seq,
+            "complete": complete,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=f"{self.prefix}/index.json",
+            Body=json.dumps(index).encode(),
+            ContentType="application/json",
+            CacheControl="no-cache",
+        )
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            if not self._stopped.is_set():
+                self.flush()
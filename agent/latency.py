@@ -0,0 +1,72 @@
+"""
+Records the agent's share of the job latency histograms (see
+lambda/layer/python/common/latency.py for the item layout). The bucket
+layout here must match the layer's — the stats API merges both.
+"""
+
+import math
+import time
+from datetime import datetime, timezone
+
+BASE_MS = 100
+PAGE_BASE_MS = 1
+BUCKETS_PER_DOUBLING = 2
+NUM_BUCKETS = 48
+RETENTION_DAYS = 90
+
+
+def base_ms(metric: str) -> int:
+    """Upper edge of bucket 0 for a metric."""
+    return PAGE_BASE_MS if metric.startswith("page_") else BASE_MS
+
+
+def bucket_index(ms: float, base: int = BASE_MS) -> int:
+    if ms < base:
+        return 0
+    return min(NUM_BUCKETS - 1, 1 + int(math.log2(ms / base) * BUCKETS_PER_DOUBLING))
+
+
+def elapsed_ms(since: str) -> float:
+    """Milliseconds from an ISO-8601 timestamp until now."""
+    return (datetime.now(timezone.utc) - datetime.fromisoformat(since)).total_seconds() * 1000
+
+
+def record(table, tenant_id: str, metric: str, ms: float):
+    """Add one sample to the tenant's histogram for the current hour (boto3 Table)."""
+    ms = max(ms, 0)
+    table.update_item(
+        Key={"tenant_id": tenant_id, "period": f"{datetime.now(timezone.utc):%Y-%m-%dT%H}#{metric}"},
+        UpdateExpression="ADD #b :one, n :one, sum_ms :ms SET expires_at = if_not_exists(expires_at, :exp)",
+        ExpressionAttributeNames={"#b": f"b{bucket_index(ms, base_ms(metric)):02d}"},
+        ExpressionAttributeValues={
+            ":one": 1,
+            ":ms": int(ms),
+            ":exp": int(time.time()) + RETENTION_DAYS * 86400,
+        },
+    )
+
+
+def record_many(table, tenant_id: str, metric: str, samples: list):
+    """Add several samples of one metric in a single update (boto3 Table)."""
+    if not samples:
+        return
+    base = base_ms(metric)
+    counts = {}
+    for ms in samples:
+        index = bucket_index(max(ms, 0), base)
+        counts[index] = counts.get(index, 0) + 1
+
+    names = {f"#b{index}": f"b{index:02d}" for index in counts}
+    values = {f":c{index}": count for index, count in counts.items()}
+    adds = ", ".join(f"#b{index} :c{index}" for index in counts)
+    table.update_item(
+        Key={"tenant_id": tenant_id, "period": f"{datetime.now(timezone.utc):%Y-%m-%dT%H}#{metric}"},
+        UpdateExpression=f"ADD {adds}, n :n, sum_ms :ms SET expires_at = if_not_exists(expires_at, :exp)",
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues={
+            **values,
+            ":n": len(samples),
+            ":ms": int(sum(max(ms, 0) for ms in samples)),
+            ":exp": int(time.time()) + RETENTION_DAYS * 86400,
+        },
+    )
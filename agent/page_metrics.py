@@ -0,0 +1,99 @@
+"""
+Target-site performance, read from the browser's Performance API after each
+navigation, so a slow job can be put down to the site or to the agent.
+
+`COLLECT_JS` turns the page's navigation, paint and resource timing entries
+into one compact record (integer ms and bytes, absent when unknown):
+
+    url             origin + path of the document
+    dns_ms          DNS lookup
+    connect_ms      TCP + TLS connect
+    ttfb_ms         navigation start → first response byte (redirects included)
+    download_ms     first → last byte of the document
+    dom_ready_ms    navigation start → DOMContentLoaded handled
+    load_ms         navigation start → load event handled, if it fired yet
+    fcp_ms          first contentful paint
+    bytes           document + resource transfer size
+    resources       resource requests, with `cached` served from cache and
+                    `by_type` counted per initiator (script, img, css, ...)
+
+Cross-origin resources without Timing-Allow-Origin report a transfer size
+of 0, so `bytes` is a lower bound. `summarize` folds a job's records into
+the task's `page_metrics` map; `samples` feeds the per-tenant histograms.
+"""
+
+import statistics
+
+# Chromium keeps 250 resource entries by default; busy pages load more
+INIT_JS = "performance.setResourceTimingBufferSize(1000);"
+
+COLLECT_JS = """
+() => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    if (!nav) return null;
+    const ms = (end, start) => (end > 0 && end >= start) ? Math.round(end - start) : undefined;
+    const record = {
+        url: location.origin + location.pathname,
+        dns_ms: ms(nav.domainLookupEnd, nav.domainLookupStart),
+        connect_ms: ms(nav.connectEnd, nav.connectStart),
+        ttfb_ms: ms(nav.responseStart, nav.startTime),
+        download_ms: ms(nav.responseEnd, nav.responseStart),
+        dom_ready_ms: ms(nav.domContentLoadedEventEnd, nav.startTime),
+        load_ms: ms(nav.loadEventEnd, nav.startTime),
+    };
+    const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+    if (fcp) record.fcp_ms = Math.round(fcp.startTime);
+
+    let bytes = nav.transferSize || 0, cached = 0;
+    const byType = {};
+    const resources = performance.getEntriesByType('resource');
+    for (const r of resources) {
+        bytes += r.transferSize || 0;
+        if (!r.transferSize && r.decodedBodySize) cached++;
+        byType[r.initiatorType] = (byType[r.initiatorType] || 0) + 1;
+    }
+    Object.assign(record, {bytes: bytes, resources: resources.length, cached: cached, by_type: byType});
+    return record;
+}
+"""
+
+# Per-page records kept on the task item; longer jobs keep only the summary
+MAX_PAGE_RECORDS = 5
+
+# Histogram metric (see latency.py) ← record field
+HISTOGRAM_FIELDS = {
+    "page_ttfb": "ttfb_ms",
+    "page_dom_ready": "dom_ready_ms",
+    "page_fcp": "fcp_ms",
+}
+
+
+def compact(record: dict | None) -> dict | None:
+    """Drop the fields the page couldn't report."""
+    if not record:
+        return None
+    return {key: value for key, value in record.items() if value is not None}
+
+
+def summarize(records: list) -> dict:
+    """The task's `page_metrics`: medians and totals, plus the records themselves for short jobs."""
+    summary = {"pages": len(records)}
+    for field in ("ttfb_ms", "dom_ready_ms", "load_ms", "fcp_ms"):
+        values = [record[field] for record in records if field in record]
+        if values:
+            summary[field] = int(statistics.median(values))
+    summary["bytes"] = sum(record.get("bytes", 0) for record in records)
+    summary["resources"] = sum(record.get("resources", 0) for record in records)
+    # Time spent waiting on the sites themselves, to set against the job's run time
+    summary["site_ms"] = sum(record.get("load_ms", record.get("dom_ready_ms", 0)) for record in records)
+    if len(records) <= MAX_PAGE_RECORDS:
+        summary["navigations"] = records
+    return summary
+
+
+def samples(records: list) -> dict:
+    """{histogram metric: [ms, ...]} across the job's records."""
+    return {
+        metric: [record[field] for record in records if field in record]
+        for metric, field in HISTOGRAM_FIELDS.items()
+    }
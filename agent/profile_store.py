@@ -0,0 +1,117 @@
+"""
+Browser profile snapshots (cookies + localStorage) kept in S3 per tenant.
+
+A job submitted with `"profile": "<name>"` starts its browser context from
+`profiles/{tenant_id}/{name}.json.gz` (Playwright storage_state, gzipped)
+instead of an empty one, so consent choices and site cookies carry over
+between runs. At the end of a successful run the context's state is written
+back when it has changed and the stored snapshot is older than
+`refresh_minutes`.
+
+Versions come from bucket versioning: every refresh is a new version of the
+same key, written with If-Match on the version that was loaded, so of two
+jobs refreshing the same profile at once only one wins. Snapshots larger
+than `max_bytes` compressed are trimmed — biggest localStorage origins
+first — and skipped if still too big.
+"""
+
+import gzip
+import json
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger("agent")
+
+
+class ProfileStore:
+    """Load and refresh one named storage_state snapshot."""
+
+    def __init__(self, s3, bucket: str, tenant_id: str, name: str,
+                 max_bytes: int = 256 * 1024, refresh_minutes: int = 60):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = f"profiles/{tenant_id}/{name}.json.gz"
+        self.max_bytes = max_bytes
+        self.refresh_minutes = refresh_minutes
+        self._etag = None
+        self._sha256 = None
+        self._saved_at = None
+
+    def load(self):
+        """Return the stored storage_state dict, or None if there is none (or it's unreadable)."""
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=self.key)
+            state = json.loads(gzip.decompress(obj["Body"].read()))
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        except (ClientError, OSError, ValueError) as exc:
+            logger.warning("Could not load profile %s: %s", self.key, exc)
+            return None
+
+        metadata = obj.get("Metadata", {})
+        self._etag = obj["ETag"]
+        self._sha256 = metadata.get("state-sha256")
+        self._saved_at = metadata.get("saved-at")
+        return state
+
+    def save(self, state: dict) -> bool:
+        """Store `state` as a new version if it changed and the current one is due for refresh."""
+        state = {
+            "cookies": state.get("cookies", []),
+            "origins": sorted(state.get("origins", []), key=lambda o: o.get("origin", "")),
+        }
+        raw = json.dumps(state, sort_keys=True, separators=(",", ":")).encode()
+        sha256 = hashlib.sha256(raw).hexdigest()
+        if sha256 == self._sha256:
+            return False
+        if self._etag and not self._refresh_due():
+            return False
+
+        body = self._compress_within_limit(state)
+        if body is None:
+            logger.warning("Profile %s exceeds %d bytes even without localStorage — not saved", self.key, self.max_bytes)
+            return False
+
+        conditions = {"IfMatch": self._etag} if self._etag else {"IfNoneMatch": "*"}
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=body,
+                ContentType="application/json",
+                ContentEncoding="gzip",
+                Metadata={
+                    "state-sha256": sha256,
+                    "saved-at": datetime.now(timezone.utc).isoformat(),
+                },
+                **conditions,
+            )
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("PreconditionFailed", "ConditionalRequestConflict"):
+                logger.info("Profile %s was refreshed by another job — keeping theirs", self.key)
+                return False
+            raise
+        return True
+
+    def _refresh_due(self) -> bool:
+        if not self._saved_at:
+            return True
+        try:
+            saved_at = datetime.fromisoformat(self._saved_at)
+        except ValueError:
+            return True
+        return datetime.now(timezone.utc) - saved_at >= timedelta(minutes=self.refresh_minutes)
+
+    def _compress_within_limit(self, state: dict):
+        """Gzip the state, dropping the largest localStorage origins until it fits."""
+        origins = sorted(state["origins"], key=lambda o: len(json.dumps(o)))
+        while True:
+            body = gzip.compress(json.dumps({"cookies": state["cookies"], "origins": origins}).encode())
+            if len(body) <= self.max_bytes:
+                return body
+            if not origins:
+                return None
+            origins = origins[:-1]
@@ -0,0 +1,81 @@
+"""
+Job-level deadline for the agent.
+
+Playwright's per-call timeouts bound each step but not the job: a slow page
+can use up most of every timeout in turn, and a wedged process never gets to
+the next one. The watchdog thread gives the whole job one deadline:
+
+  1. At the deadline it interrupts the main thread with SIGALRM, whose
+     handler raises DeadlineExceeded. The agent catches that, salvages what
+     it can (viewport screenshot, finished targets, execution log), marks the
+     task TIMED_OUT and lets the browser be torn down.
+  2. If the main thread hasn't finished that within `grace_seconds` (it may
+     be stuck where signals can't reach it), the watchdog runs `on_hard_timeout`
+     itself and ends the process with os._exit — the browser goes with it.
+"""
+
+import os
+import time
+import signal
+import logging
+import threading
+
+logger = logging.getLogger("agent")
+
+
+class DeadlineExceeded(BaseException):
+    """Raised in the main thread when the job's deadline passes.
+
+    A BaseException so the per-step `except Exception` handlers don't swallow it.
+    """
+
+
+class Watchdog:
+    def __init__(self, deadline_seconds: float, grace_seconds: float = 20,
+                 on_hard_timeout=None, exit_code: int = 1):
+        self.deadline_seconds = deadline_seconds
+        self.grace_seconds = grace_seconds
+        self.on_hard_timeout = on_hard_timeout
+        self.exit_code = exit_code
+        self.expired = False
+        self.started = None
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Arm the deadline. Must be called from the main thread (installs the SIGALRM handler)."""
+        signal.signal(signal.SIGALRM, self._on_alarm)
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """The job is over (finished, failed, or salvaged) — disarm."""
+        self._done.set()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started if self.started else 0.0
+
+    def _on_alarm(self, signum, frame):
+        # Once only; the salvage that follows must be allowed to finish
+        signal.signal(signal.SIGALRM, signal.SIG_IGN)
+        if self._done.is_set():
+            return  # the job ended as the deadline passed
+        raise DeadlineExceeded(f"Job deadline of {self.deadline_seconds}s exceeded")
+
+    def _run(self):
+        if self._done.wait(self.deadline_seconds):
+            return
+        self.expired = True
+        logger.error("Job deadline of %ss exceeded — interrupting the agent", self.deadline_seconds)
+        signal.pthread_kill(threading.main_thread().ident, signal.SIGALRM)
+
+        if self._done.wait(self.grace_seconds):
+            return
+        logger.error("Agent did not wind down within %ss of the deadline — exiting", self.grace_seconds)
+        if self.on_hard_timeout:
+            try:
+                self.on_hard_timeout()
+            except Exception as exc:
+                logger.error("Hard-timeout handler failed: %s", exc)
+        os._exit(self.exit_code)
@@ -0,0 +1,173 @@
+"""
+Cold-start benchmark for the Lambda handlers.
+
+Imports each handler in a fresh interpreter (what the Lambda INIT phase does)
+and then builds the AWS clients its first request needs, repeating `--runs`
+times per function. No AWS calls are made — credentials and env vars are dummies.
+
+To compare against another revision, check it out next to this one; runs for
+the two trees are interleaved so machine noise hits both equally:
+
+    git worktree add /tmp/before <old-ref>
+    python benchmarks/bench_cold_start.py --baseline-dir /tmp/before/lambda
+
+Requires boto3 (and python-jose for the authorizer) in the local environment.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FUNCTIONS = [
+    "authorizer",
+    "submit_job",
+    "process_job",
+    "get_status",
+    "get_logs",
+    "list_jobs",
+    "register_tenant",
+    "manage_users",
+    "ws_connections",
+    "publish_status",
+    "cancel_job",
+    "job_stats",
+    "archive_tasks",
+    "index_jobs",
+    "release_jobs",
+    "backfill_tenant_shard",
+]
+
+# Clients each function builds for its requests (only used with the shared
+# layer). An optional third element is an expression, evaluated in the
+# handler's namespace, for the keyword arguments its call sites pass.
+FIRST_REQUEST = {
+    "authorizer": [("table", "USERS_TABLE")],
+    "submit_job": [("table", "DYNAMODB_TABLE"), ("client", "sqs")],
+    "process_job": [
+        ("table", "DYNAMODB_TABLE"), ("client", "dynamodb"), ("client", "sqs"),
+        ("client", "ecs", "ECS_CLIENT_OPTIONS"),
+    ],
+    "get_status": [("client", "dynamodb"), ("client", "s3")],
+    "get_logs": [("client", "dynamodb"), ("client", "logs"), ("client", "s3")],
+    "list_jobs": [("client", "dynamodb"), ("client", "s3")],
+    "register_tenant": [("client", "dynamodb")],
+    "manage_users": [("client", "dynamodb"), ("table", "USERS_TABLE")],
+    "ws_connections": [("client", "dynamodb")],
+    "publish_status": [
+        ("client", "dynamodb"),
+        ("client", "apigatewaymanagementapi", "{'endpoint_url': WEBSOCKET_ENDPOINT}"),
+    ],
+    "cancel_job": [("client", "dynamodb"), ("client", "ecs")],
+    "job_stats": [("client", "dynamodb")],
+    "archive_tasks": [("client", "dynamodb"), ("client", "s3")],
+    "index_jobs": [("table", "SEARCH_TABLE"), ("client", "s3")],
+    "release_jobs": [("client", "dynamodb"), ("client", "ecs"), ("client", "sqs")],
+    "backfill_tenant_shard": [("client", "dynamodb")],
+}
+
+DUMMY_ENV = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_EC2_METADATA_DISABLED": "true",
+    "DYNAMODB_TABLE": "bench-tasks",
+    "USERS_TABLE": "bench-users",
+    "S3_BUCKET": "bench-bucket",
+    "SQS_QUEUE_URL": "https://sqs.us-east-1.amazonaws.com/000000000000/bench",
+    "ECS_CLUSTER": "bench",
+    "TASK_DEFINITION": "bench",
+    "SUBNETS": "subnet-1,subnet-2",
+    "SECURITY_GROUP": "sg-1",
+    "LOG_GROUP": "/ecs/bench",
+    "USER_POOL_ID": "us-east-1_bench",
+    "APP_CLIENT_ID": "bench",
+    "CONNECTIONS_TABLE": "bench-ws-connections",
+    "WEBSOCKET_ENDPOINT": "https://bench.execute-api.us-east-1.amazonaws.com/v1",
+    "ARCHIVE_BUCKET": "bench-archive",
+    "STATS_TABLE": "bench-job-stats",
+    "SEARCH_TABLE": "bench-job-search",
+    "AGENT_TASK_FAMILY": "bench",
+}
+
+PROBE = """
+import sys, time, json
+t0 = time.perf_counter()
+import handler
+t1 = time.perf_counter()
+if hasattr(handler, "aws"):
+    import os
+    for kind, arg, *kwargs in json.loads(sys.argv[1]):
+        if kind == "table":
+            handler.aws.table(os.environ[arg])
+        else:
+            handler.aws.client(arg, **(eval(kwargs[0], vars(handler)) if kwargs else {}))
+t2 = time.perf_counter()
+print(json.dumps([t1 - t0, t2 - t0]))
+"""
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(lambda_dir: str, name: str, runs: int):
+    """Return (init_times, first_request_times) in milliseconds."""
+    env = dict(os.environ, **DUMMY_ENV)
+    paths = [os.path.join(lambda_dir, name), os.path.join(lambda_dir, "layer", "python")]
+    env["PYTHONPATH"] = os.pathsep.join(paths)
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+
+    init, first = [], []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE, json.dumps(FIRST_REQUEST[name])],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        t_init, t_first = json.loads(out.stdout.strip().splitlines()[-1])
+        init.append(t_init * 1000)
+        first.append(t_first * 1000)
+    return init, first
+
+
+def _row(label: str, init, first) -> str:
+    return (
+        f"{label:<34} {statistics.median(init):>9.1f} {_percentile(init, 99):>9.1f}"
+        f" {statistics.median(first):>13.1f} {_percentile(first, 99):>13.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lambda-dir", default=os.path.join(REPO_ROOT, "lambda"))
+    parser.add_argument("--baseline-dir", help="lambda/ directory of the tree to compare against")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--functions", nargs="*", default=FUNCTIONS)
+    args = parser.parse_args()
+
+    print(f"{'function':<34} {'init p50':>9} {'init p99':>9} {'+1st req p50':>13} {'+1st req p99':>13}  (ms)")
+    for name in args.functions:
+        results = {"current": ([], [])}
+        if args.baseline_dir:
+            results = {"baseline": ([], []), "current": ([], [])}
+        if args.baseline_dir and not os.path.isdir(os.path.join(args.baseline_dir, name)):
+            del results["baseline"]
+        for _ in range(args.runs):
+            for label, (init, first) in results.items():
+                lambda_dir = args.baseline_dir if label == "baseline" else args.lambda_dir
+                run_init, run_first = measure(lambda_dir, name, 1)
+                init.extend(run_init)
+                first.extend(run_first)
+        for label, (init, first) in results.items():
+            print(_row(f"{name} ({label})" if args.baseline_dir else name, init, first))
+
+
+if __name__ == "__main__":
+    main()
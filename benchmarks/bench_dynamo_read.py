@@ -0,0 +1,140 @@
+"""
+DynamoDB read-path benchmark: low-level Query response → JSON response body.
+
+Compares, for a page of task items:
+
+  resource  botocore parse → boto3 TypeDeserializer (Decimal) → api.sanitize → json.dumps
+  lowlevel  botocore parse → common.dynamo.item                → json.dumps
+
+The botocore parse step is identical in both paths and is included so the
+numbers reflect the whole handler-side cost of a page; the `parse` row shows
+that shared floor on its own. No AWS calls are made.
+
+    python benchmarks/bench_dynamo_read.py --pages 20 100
+
+Requires boto3 in the local environment.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "lambda", "layer", "python"))
+
+import botocore.session  # noqa: E402
+from botocore.parsers import create_parser  # noqa: E402
+from boto3.dynamodb.types import TypeDeserializer  # noqa: E402
+
+from common import dynamo  # noqa: E402
+from common.api import sanitize  # noqa: E402
+
+STATUSES = ["PENDING", "PROVISIONING", "PROVISIONED", "RUNNING", "COMPLETED", "FAILED"]
+
+
+def _task_item(n: int, rich: bool) -> dict:
+    """A tasks-table item in low-level form, shaped like what the pipeline writes."""
+    created = f"2026-10-18T12:{n % 60:02d}:{(n * 7) % 60:02d}.{n:06d}+00:00"
+    item = {
+        "task_id": {"S": f"3f2b9c1e-7d4a-4e8b-9c51-{n:012d}"},
+        "tenant_id": {"S": "tenant-9a8b7c6d"},
+        "submitted_by": {"S": "us-east-1:4c1f7a52-0e7b-4b7e-a1d2-3f4e5a6b7c8d"},
+        "query": {"S": f"Find the top results for benchmark query number {n} and summarise them"},
+        "status": {"S": STATUSES[n % len(STATUSES)]},
+        "created_at": {"S": created},
+        "updated_at": {"S": created},
+        "ttl": {"N": str(1792000000 + n)},
+        "ecs_task_arn": {"S": f"arn:aws:ecs:us-east-1:000000000000:task/bench/{n:032x}"},
+        "ecs_task_id": {"S": f"{n:032x}"},
+    }
+    if n % 6 == 4:
+        item["completed_at"] = {"S": created}
+    if n % 6 == 5:
+        item["error"] = {"S": "Timeout 30000ms exceeded while waiting for selector"}
+    if rich:
+        item["metrics"] = {"M": {
+            "queue_wait_ms": {"N": str(1200 + n)},
+            "run_time_ms": {"N": str(45000 + n * 3)},
+            "score": {"N": f"0.{n:04d}"},
+        }}
+        item["tags"] = {"SS": ["bench", "search", f"batch-{n % 4}"]}
+    return item
+
+
+def _raw_response(page_size: int, rich: bool) -> dict:
+    """An HTTP response dict as the botocore JSON parser receives it."""
+    body = {
+        "Items": [_task_item(n, rich) for n in range(page_size)],
+        "Count": page_size,
+        "ScannedCount": page_size,
+    }
+    return {
+        "status_code": 200,
+        "headers": {"x-amzn-requestid": "bench"},
+        "body": json.dumps(body).encode(),
+    }
+
+
+def _resource_path(parser, shape, raw, deserializer):
+    parsed = parser.parse(raw, shape)
+    items = [
+        {k: deserializer.deserialize(v) for k, v in item.items()}
+        for item in parsed["Items"]
+    ]
+    return json.dumps({"jobs": [sanitize(item) for item in items]})
+
+
+def _lowlevel_path(parser, shape, raw, _):
+    parsed = parser.parse(raw, shape)
+    return json.dumps({"jobs": [dynamo.item(item) for item in parsed["Items"]]})
+
+
+def _parse_only(parser, shape, raw, _):
+    return parser.parse(raw, shape)
+
+
+def _time(fn, args, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="*", default=[20, 100])
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--rich", action="store_true", help="add a nested map and a string set per item")
+    args = parser.parse_args()
+
+    model = botocore.session.get_session().get_service_model("dynamodb")
+    shape = model.operation_model("Query").output_shape
+    json_parser = create_parser(model.metadata["protocol"])
+    deserializer = TypeDeserializer()
+
+    print(f"{'page size':<10} {'path':<9} {'p50':>8} {'p99':>8}  (ms per page)")
+    for size in args.pages:
+        raw = _raw_response(size, args.rich)
+        call_args = (json_parser, shape, raw, deserializer)
+        assert _resource_path(*call_args) == _lowlevel_path(*call_args), "outputs differ"
+
+        results = {"parse": [], "resource": [], "lowlevel": []}
+        # Interleave in small batches so machine noise hits both paths equally
+        for _ in range(args.iterations // 10):
+            results["parse"].extend(_time(_parse_only, call_args, 10))
+            results["resource"].extend(_time(_resource_path, call_args, 10))
+            results["lowlevel"].extend(_time(_lowlevel_path, call_args, 10))
+
+        for label, samples in results.items():
+            ordered = sorted(samples)
+            p99 = ordered[min(len(ordered) - 1, int(0.99 * (len(ordered) - 1)))]
+            print(f"{size:<10} {label:<9} {statistics.median(samples):>8.3f} {p99:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import { API_URL } from './config';
+import { API_URL, WS_URL } from './config';
 
 async function apiFetch(path, { method = 'GET', body, token } = {}) {
   const headers = { 'Content-Type': 'application/json' };
@@ -22,10 +22,21 @@ export const api = {
     if (nextToken) path += `&next_token=${encodeURIComponent(nextToken)}`;
     return apiFetch(path, { token });
   },
-  submitJob: (token, query) =>
-    apiFetch('/jobs', { method: 'POST', body: { query }, token }),
+  searchJobs: (token, q, limit = 20, nextToken) => {
+    let path = `/jobs?q=${encodeURIComponent(q)}&limit=${limit}`;
+    if (nextToken) path += `&next_token=${encodeURIComponent(nextToken)}`;
+    return apiFetch(path, { token });
+  },
+  submitJob: (token, query, targets) =>
+    apiFetch('/jobs', { method: 'POST', body: targets ? { query, targets } : { query }, token }),
   getJob: (token, taskId) =>
     apiFetch(`/jobs/${taskId}`, { token }),
+  cancelJob: (token, taskId) =>
+    apiFetch(`/jobs/${taskId}`, { method: 'DELETE', token }),
+  cancelJobs: (token, taskIds) =>
+    apiFetch('/jobs/cancel', { method: 'POST', body: { task_ids: taskIds }, token }),
+  getJobStatuses: (token, taskIds, includeOutputs = false) =>
+    apiFetch('/jobs/status', { method: 'POST', body: { task_ids: taskIds, include_outputs: includeOutputs }, token }),
   getJobLogs: (token, taskId, limit = 200, nextToken) => {
     let path = `/jobs/${taskId}/logs?limit=${limit}`;
     if (nextToken) path += `&next_token=${encodeURIComponent(nextToken)}`;
@@ -37,10 +48,109 @@ export const api = {
     apiFetch('/tenants/register', { method: 'POST', body: { tenant_name: tenantName }, token }),
 
   // Users
-  listUsers: (token) =>
-    apiFetch('/tenants/users', { token }),
+  listUsers: (token, limit = 100, nextToken) => {
+    let path = `/tenants/users?limit=${limit}`;
+    if (nextToken) path += `&next_token=${encodeURIComponent(nextToken)}`;
+    return apiFetch(path, { token });
+  },
   addUser: (token, email, role) =>
     apiFetch('/tenants/users', { method: 'POST', body: { email, role }, token }),
+  inviteUsers: (token, invites) =>
+    apiFetch('/tenants/users', { method: 'POST', body: { invites }, token }),
   removeUser: (token, cognitoId) =>
     apiFetch(`/tenants/users/${cognitoId}`, { method: 'DELETE', token }),
 };
+
+// ---------------------------------------------------------------------------
+// Job status push channel — one WebSocket per tab, shared by all subscribers.
+// The server sends {"type": "job", "job": {...}} whenever a task in the
+// caller's tenant changes status. Reconnects with backoff; subscribers get
+// onOpen on every (re)connect so they can re-fetch anything they missed.
+// ---------------------------------------------------------------------------
+const PING_INTERVAL_MS = 5 * 60 * 1000; // API Gateway drops idle sockets after 10 min
+const MAX_BACKOFF_MS = 30000;
+
+const subscribers = new Set();
+let socket = null;
+let pingTimer = null;
+let reconnectTimer = null;
+let backoffMs = 1000;
+let tokenProvider = null;
+
+async function openSocket() {
+  if (!subscribers.size || socket) return;
+  let token;
+  try {
+    token = await tokenProvider();
+  } catch {
+    scheduleReconnect();
+    return;
+  }
+  if (!subscribers.size || socket) return;
+
+  const ws = new WebSocket(`${WS_URL}?token=${encodeURIComponent(token)}`);
+  socket = ws;
+
+  ws.onopen = () => {
+    backoffMs = 1000;
+    pingTimer = setInterval(() => ws.send(JSON.stringify({ action: 'ping' })), PING_INTERVAL_MS);
+    subscribers.forEach((s) => s.onOpen && s.onOpen());
+  };
+  ws.onmessage = (evt) => {
+    let msg;
+    try {
+      msg = JSON.parse(evt.data);
+    } catch {
+      return;
+    }
+    if (msg.type === 'job') subscribers.forEach((s) => s.onJob && s.onJob(msg.job));
+  };
+  ws.onclose = () => {
+    clearInterval(pingTimer);
+    if (socket === ws) socket = null;
+    scheduleReconnect();
+  };
+}
+
+function scheduleReconnect() {
+  if (!subscribers.size || reconnectTimer) return;
+  const delay = backoffMs / 2 + Math.random() * (backoffMs / 2);
+  backoffMs = Math.min(backoffMs * 2, MAX_BACKOFF_MS);
+  reconnectTimer = setTimeout(() => {
+    reconnectTimer = null;
+    openSocket();
+  }, delay);
+}
+
+/**
+ * Subscribe to job status changes for the caller's tenant.
+ * Returns an unsubscribe function, or null if push updates aren't configured
+ * (callers should fall back to polling).
+ */
+export function subscribeJobs(getToken, { onJob, onOpen } = {}) {
+  if (!WS_URL || typeof WebSocket === 'undefined') return null;
+
+  const subscriber = { onJob, onOpen };
+  subscribers.add(subscriber);
+  tokenProvider = getToken;
+  if (socket && socket.readyState === WebSocket.OPEN) {
+    onOpen && onOpen();
+  } else {
+    openSocket();
+  }
+
+  return () => {
+    subscribers.delete(subscriber);
+    if (!subscribers.size) {
+      clearTimeout(reconnectTimer);
+      reconnectTimer = null;
+      if (socket) {
+        const ws = socket;
+        socket = null;
+        ws.onclose = null;
+        clearInterval(pingTimer);
+        ws.close();
+      }
+    }
+  };
+}
@@ -7,4 +7,5 @@ const poolData = {
 
 export const userPool = new CognitoUserPool(poolData);
 export const API_URL = import.meta.env.VITE_API_URL || '';
+export const WS_URL = import.meta.env.VITE_WS_URL || '';
 export const AWS_REGION = import.meta.env.VITE_AWS_REGION || 'us-east-1';
@@ -35,6 +35,15 @@ export function AuthProvider({ children }) {
         return res.json();
     }, []);
 
+    // API Gateway caches authorizer results per token, and the one cached for
+    // the token used to register still says UNREGISTERED — get a fresh token.
+    const refreshSession = (cognitoUser, session) => new Promise((resolve, reject) => {
+        cognitoUser.refreshSession(session.getRefreshToken(), (err, refreshed) => {
+            if (err) return reject(err);
+            resolve(refreshed);
+        });
+    });
+
     // Check session on mount
     useEffect(() => {
         const cognitoUser = userPool.getCurrentUser();
@@ -51,6 +60,7 @@ export function AuthProvider({ children }) {
             try {
                 const token = session.getIdToken().getJwtToken();
                 const data = await registerTenant(token);
+                if (data.just_registered) await refreshSession(cognitoUser, session);
                 setUserInfo({
                     tenant_id: data.tenant_id,
                     role: data.role,
@@ -95,6 +105,7 @@ export function AuthProvider({ children }) {
                     try {
                         const token = session.getIdToken().getJwtToken();
                         const data = await registerTenant(token);
+                        if (data.just_registered) await refreshSession(cognitoUser, session);
                         setUserInfo({
                             tenant_id: data.tenant_id,
                             role: data.role,
@@ -1,16 +1,19 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { Link } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import { api } from '../api';
+import { api, subscribeJobs } from '../api';
 
 const STATUS_COLORS = {
     PENDING: '#f59e0b',
+    SCHEDULED: '#94a3b8',
     QUEUED: '#f59e0b',
     PROVISIONING: '#3b82f6',
     PROVISIONED: '#3b82f6',
     RUNNING: '#8b5cf6',
     COMPLETED: '#10b981',
     FAILED: '#ef4444',
+    CANCELLED: '#6b7280',
+    TIMED_OUT: '#f97316',
 };
 
 export default function Dashboard() {
@@ -31,11 +34,26 @@ export default function Dashboard() {
         }
     }, [getToken]);
 
+    // Merge a pushed job update into the list (new jobs go on top)
+    const applyUpdate = useCallback((job) => {
+        setJobs((current) => {
+            const index = current.findIndex((j) => j.task_id === job.task_id);
+            if (index === -1) return [job, ...current];
+            const next = [...current];
+            next[index] = { ...current[index], ...job };
+            return next;
+        });
+    }, []);
+
     useEffect(() => {
         fetchJobs();
+        // Push updates; re-fetch on every (re)connect to catch anything missed
+        const unsubscribe = subscribeJobs(getToken, { onJob: applyUpdate, onOpen: fetchJobs });
+        if (unsubscribe) return unsubscribe;
+        // No WebSocket endpoint configured — fall back to polling
         const interval = setInterval(fetchJobs, 10000);
         return () => clearInterval(interval);
-    }, [fetchJobs]);
+    }, [fetchJobs, applyUpdate, getToken]);
 
     return (
         <div className="page-container">
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useParams, Link } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import { api } from '../api';
+import { api, subscribeJobs } from '../api';
 
 export default function JobDetail() {
     const { taskId } = useParams();
@@ -11,6 +11,7 @@ export default function JobDetail() {
     const [logsLoading, setLogsLoading] = useState(false);
     const [error, setError] = useState('');
     const [tab, setTab] = useState('details'); // 'details' | 'logs'
+    const [cancelling, setCancelling] = useState(false);
 
     const fetchJob = useCallback(async () => {
         try {
@@ -41,14 +42,37 @@ export default function JobDetail() {
 
     useEffect(() => {
         fetchJob();
+        // Re-fetch when this job changes (picks up output URLs once it finishes)
+        const unsubscribe = subscribeJobs(getToken, {
+            onJob: (update) => { if (update.task_id === taskId) fetchJob(); },
+            onOpen: fetchJob,
+        });
+        if (unsubscribe) return unsubscribe;
+        // No WebSocket endpoint configured — fall back to polling
         const interval = setInterval(fetchJob, 5000);
         return () => clearInterval(interval);
-    }, [fetchJob]);
+    }, [fetchJob, getToken, taskId]);
 
     useEffect(() => {
         if (tab === 'logs') fetchLogs();
     }, [tab, fetchLogs]);
 
+    const cancelJob = async () => {
+        setCancelling(true);
+        try {
+            const token = await getToken();
+            await api.cancelJob(token, taskId);
+            await fetchJob();
+        } catch (err) {
+            if (err.status !== 409) setError(err.error || err.message || 'Failed to cancel job');
+            else await fetchJob(); // finished before the cancel landed
+        } finally {
+            setCancelling(false);
+        }
+    };
+
+    const active = job && ['SCHEDULED', 'PENDING', 'QUEUED', 'PROVISIONING', 'PROVISIONED', 'RUNNING'].includes(job.status);
+
     if (!job && !error) return <div className="loading-center"><div className="spinner" /></div>;
 
     return (
@@ -58,6 +82,11 @@ export default function JobDetail() {
                     <Link to="/" className="back-link">← Back to jobs</Link>
                     <h1>Job {taskId.slice(0, 8)}…</h1>
                 </div>
+                {active && (
+                    <button className="btn btn-outline" onClick={cancelJob} disabled={cancelling}>
+                        {cancelling ? 'Cancelling…' : 'Cancel job'}
+                    </button>
+                )}
             </div>
 
             {error && <div className="alert alert-error">{error}</div>}
@@ -79,9 +108,9 @@ export default function JobDetail() {
                         <h3>Status</h3>
                         <span className="status-badge large" style={{
                             backgroundColor: {
-                                PENDING: '#f59e0b', QUEUED: '#f59e0b', PROVISIONING: '#3b82f6',
+                                SCHEDULED: '#94a3b8', PENDING: '#f59e0b', QUEUED: '#f59e0b', PROVISIONING: '#3b82f6',
                                 PROVISIONED: '#3b82f6', RUNNING: '#8b5cf6',
-                                COMPLETED: '#10b981', FAILED: '#ef4444',
+                                COMPLETED: '#10b981', FAILED: '#ef4444', CANCELLED: '#6b7280', TIMED_OUT: '#f97316',
                             }[job.status] || '#6b7280'
                         }}>{job.status}</span>
                     </div>
@@ -89,6 +118,16 @@ export default function JobDetail() {
                         <h3>Query</h3>
                         <p>{job.query}</p>
                     </div>
+                    {job.job_type === 'MULTI_TARGET' && (
+                        <div className="detail-card">
+                            <h3>Targets</h3>
+                            <p>
+                                {job.targets_completed || 0} completed
+                                {job.targets_failed ? `, ${job.targets_failed} failed` : ''}
+                                {' '}of {job.targets_total}
+                            </p>
+                        </div>
+                    )}
                     <div className="detail-card">
                         <h3>Task ID</h3>
                         <p className="mono">{job.task_id}</p>
@@ -103,6 +142,19 @@ export default function JobDetail() {
                             <p className="mono">{job.ecs_task_id}</p>
                         </div>
                     )}
+                    {job.results && job.results.length > 0 && (
+                        <div className="detail-card full-width">
+                            <h3>Results</h3>
+                            <ol className="result-list">
+                                {job.results.map((r) => (
+                                    <li key={r.rank}>
+                                        <a href={r.url} target="_blank" rel="noreferrer">{r.title || r.url}</a>
+                                        {r.snippet && <p className="text-muted">{r.snippet}</p>}
+                                    </li>
+                                ))}
+                            </ol>
+                        </div>
+                    )}
                     {job.outputs && (
                         <div className="detail-card full-width">
                             <h3>Outputs</h3>
@@ -5,6 +5,8 @@ import { api } from '../api';
 
 export default function NewJob() {
     const [query, setQuery] = useState('');
+    const [mode, setMode] = useState('single'); // 'single' | 'multi'
+    const [targetsText, setTargetsText] = useState('');
     const [error, setError] = useState('');
     const [loading, setLoading] = useState(false);
     const { getToken } = useAuth();
@@ -12,12 +14,15 @@ export default function NewJob() {
 
     const handleSubmit = async (e) => {
         e.preventDefault();
-        if (!query.trim()) return;
+        const targets = targetsText.split('\n').map((t) => t.trim()).filter(Boolean);
+        if (mode === 'single' ? !query.trim() : targets.length === 0) return;
         setError('');
         setLoading(true);
         try {
             const token = await getToken();
-            const data = await api.submitJob(token, query);
+            const data = mode === 'single'
+                ? await api.submitJob(token, query)
+                : await api.submitJob(token, query.trim() || undefined, targets);
             navigate(`/jobs/${data.task_id}`);
         } catch (err) {
             setError(err.message || 'Failed to submit job');
@@ -34,16 +39,42 @@ export default function NewJob() {
             <div className="form-card">
                 <form onSubmit={handleSubmit}>
                     {error && <div className="alert alert-error">{error}</div>}
+                    <div className="tab-bar">
+                        <button
+                            type="button"
+                            className={`tab ${mode === 'single' ? 'active' : ''}`}
+                            onClick={() => setMode('single')}
+                        >Single query</button>
+                        <button
+                            type="button"
+                            className={`tab ${mode === 'multi' ? 'active' : ''}`}
+                            onClick={() => setMode('multi')}
+                        >Multiple targets</button>
+                    </div>
                     <div className="form-group">
-                        <label>Query</label>
+                        <label>{mode === 'single' ? 'Query' : 'Name (optional)'}</label>
                         <textarea
                             value={query}
                             onChange={(e) => setQuery(e.target.value)}
-                            placeholder="Describe the task for the agent to execute…"
-                            rows={4}
-                            required
+                            placeholder={mode === 'single'
+                                ? 'Describe the task for the agent to execute…'
+                                : 'A short label for this batch…'}
+                            rows={mode === 'single' ? 4 : 1}
+                            required={mode === 'single'}
                         />
                     </div>
+                    {mode === 'multi' && (
+                        <div className="form-group">
+                            <label>Targets — one search query or URL per line</label>
+                            <textarea
+                                value={targetsText}
+                                onChange={(e) => setTargetsText(e.target.value)}
+                                placeholder={'terraform ECS fargate tutorial\nhttps://example.com/pricing'}
+                                rows={10}
+                                required
+                            />
+                        </div>
+                    )}
                     <div className="form-actions">
                         <button
                             type="button"
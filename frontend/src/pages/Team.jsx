@@ -18,8 +18,14 @@ export default function Team() {
     const fetchUsers = useCallback(async () => {
         try {
             const token = await getToken();
-            const data = await api.listUsers(token);
-            setUsers(data.users || []);
+            const all = [];
+            let nextToken;
+            do {
+                const data = await api.listUsers(token, 500, nextToken);
+                all.push(...(data.users || []));
+                nextToken = data.next_token;
+            } while (nextToken);
+            setUsers(all);
         } catch (err) {
             setError(err.message || 'Failed to load team');
         } finally {
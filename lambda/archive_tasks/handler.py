@@ -0,0 +1,180 @@
+"""
+Lambda: Archive Tasks
+Runs daily on an EventBridge schedule. Moves terminal tasks older than
+ARCHIVE_AFTER_DAYS out of the tasks table into per-tenant, per-day gzip JSONL
+files in the archive bucket (layout in common.archive), so the hot table only holds recent and
+in-flight work while list_jobs can still page through the full history.
+
+Per tenant and day: the tasks found are merged with that day's existing file
+(if any), written as a new file, the index is repointed to it, and only then
+are the items deleted from the table. A run cut short leaves either the old
+file or the new one indexed, and items are never deleted before they are in S3.
+
+With RETENTION_DAYS set, index entries for days older than that are dropped
+whenever a tenant's index is rewritten; the day files themselves are
+expired by the bucket's lifecycle rule.
+"""
+
+import os
+import time
+import uuid
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from common import aws, dynamo, archive, tracing
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+TABLE_NAME = os.environ["DYNAMODB_TABLE"]
+ARCHIVE_BUCKET = os.environ["ARCHIVE_BUCKET"]
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "3"))
+RETENTION_DAYS = int(os.environ.get("RETENTION_DAYS", "0"))  # 0 keeps everything
+
+TERMINAL_STATUSES = ("COMPLETED", "FAILED", "CANCELLED", "TIMED_OUT")
+SCAN_SEGMENTS = 4
+TENANT_CONCURRENCY = 8
+BATCH_WRITE_SIZE = 25  # DynamoDB BatchWriteItem limit
+BATCH_WRITE_ATTEMPTS = 5
+
+# Stop scanning with this much of the invocation left, to finish writing what was read
+RESERVE_MS = 120_000
+
+aws.preload("dynamodb", "s3")
+
+
+@tracing.traced
+def handler(event, context):
+    """Archive everything terminal and older than the cutoff; returns a summary."""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoff = (today - timedelta(days=ARCHIVE_AFTER_DAYS)).isoformat()
+    deadline = time.monotonic() + max(context.get_remaining_time_in_millis() - RESERVE_MS, 0) / 1000
+
+    with ThreadPoolExecutor(max_workers=SCAN_SEGMENTS) as pool:
+        segments = list(pool.map(lambda s: _scan_segment(s, cutoff, deadline), range(SCAN_SEGMENTS)))
+
+    by_tenant = defaultdict(lambda: defaultdict(list))
+    for tasks, _ in segments:
+        for task in tasks:
+            if task.get("tenant_id") and task.get("created_at"):
+                by_tenant[task["tenant_id"]][task["created_at"][:10]].append(task)
+
+    run_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    oldest_day = (today - timedelta(days=RETENTION_DAYS)).date().isoformat() if RETENTION_DAYS else ""
+    with ThreadPoolExecutor(max_workers=TENANT_CONCURRENCY) as pool:
+        results = list(pool.map(
+            lambda tenant: _archive_tenant(tenant, by_tenant[tenant], run_id, oldest_day),
+            list(by_tenant),
+        ))
+
+    summary = {
+        "cutoff": cutoff,
+        "tenants": len(results),
+        "archived": sum(archived for archived, _ in results),
+        "failed_tenants": sum(1 for _, ok in results if not ok),
+        # False when the scan hit the deadline; the next run picks up the rest
+        "complete": all(finished for _, finished in segments),
+    }
+    logger.info("Archive run %s: %s", run_id, summary)
+    return summary
+
+
+def _scan_segment(segment: int, cutoff: str, deadline: float):
+    """Read one parallel-scan segment's archivable tasks; returns (tasks, finished)."""
+    statuses = {f":s{i}": {"S": status} for i, status in enumerate(TERMINAL_STATUSES)}
+    kwargs = {
+        "TableName": TABLE_NAME,
+        "Segment": segment,
+        "TotalSegments": SCAN_SEGMENTS,
+        "FilterExpression": f"#s IN ({', '.join(statuses)}) AND created_at < :cutoff",
+        "ExpressionAttributeNames": {"#s": "status"},
+        "ExpressionAttributeValues": {**statuses, ":cutoff": {"S": cutoff}},
+    }
+
+    ddb = aws.client("dynamodb")
+    tasks = []
+    while time.monotonic() < deadline:
+        result = ddb.scan(**kwargs)
+        tasks.extend(dynamo.item(item) for item in result.get("Items", []))
+        if "LastEvaluatedKey" not in result:
+            return tasks, True
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+    return tasks, False
+
+
+def _archive_tenant(tenant_id: str, days: dict, run_id: str, oldest_day: str = ""):
+    """Merge one tenant's tasks into its day files; returns (tasks archived, ok).
+
+    Index entries for days before `oldest_day` are dropped from the rewritten index.
+    """
+    s3 = aws.client("s3")
+    try:
+        index = archive.read_index(s3, ARCHIVE_BUCKET, tenant_id)
+        entries = {entry["day"]: entry for entry in index.get("days", [])}
+        replaced = []
+
+        for day, tasks in days.items():
+            merged = {}
+            previous = entries.get(day)
+            if previous:
+                merged.update((t["task_id"], t) for t in archive.read_day(s3, ARCHIVE_BUCKET, previous["key"]) or [])
+                replaced.append(previous["key"])
+            merged.update((t["task_id"], t) for t in tasks)
+
+            key = archive.day_key(tenant_id, day, run_id)
+            s3.put_object(
+                Bucket=ARCHIVE_BUCKET,
+                Key=key,
+                Body=archive.encode_day(list(merged.values())),
+                ContentType="application/x-ndjson",
+                ContentEncoding="gzip",
+                Tagging=archive.day_file_tagging(),
+            )
+            entries[day] = {"day": day, "key": key, "count": len(merged)}
+
+        kept = [entry for entry in entries.values() if entry["day"] >= oldest_day]
+
+        s3.put_object(
+            Bucket=ARCHIVE_BUCKET,
+            Key=archive.index_key(tenant_id),
+            Body=archive.encode_index(sorted(kept, key=lambda e: e["day"], reverse=True)),
+            ContentType="application/json",
+            CacheControl="no-cache",
+        )
+    except Exception as exc:
+        logger.exception("Archiving tenant %s failed, its tasks stay in the table: %s", tenant_id, exc)
+        return 0, False
+
+    task_ids = [task["task_id"] for tasks in days.values() for task in tasks]
+    try:
+        for key in replaced:
+            s3.delete_object(Bucket=ARCHIVE_BUCKET, Key=key)
+        not_deleted = _delete_tasks(task_ids)
+    except Exception as exc:
+        logger.warning("Tenant %s: cleanup after archiving failed: %s", tenant_id, exc)
+        not_deleted = len(task_ids)
+    if not_deleted:
+        # Already archived; the next run merges them into the same day again
+        logger.warning("Tenant %s: %d archived tasks not yet deleted from the table", tenant_id, not_deleted)
+    return len(task_ids), True
+
+
+def _delete_tasks(task_ids: list) -> int:
+    """Batch-delete tasks from the table; returns how many could not be deleted."""
+    ddb = aws.client("dynamodb")
+    failed = 0
+    for start in range(0, len(task_ids), BATCH_WRITE_SIZE):
+        remaining = [
+            {"DeleteRequest": {"Key": {"task_id": {"S": task_id}}}}
+            for task_id in task_ids[start:start + BATCH_WRITE_SIZE]
+        ]
+        for attempt in range(BATCH_WRITE_ATTEMPTS):
+            result = ddb.batch_write_item(RequestItems={TABLE_NAME: remaining})
+            remaining = result.get("UnprocessedItems", {}).get(TABLE_NAME, [])
+            if not remaining:
+                break
+            time.sleep(min(0.05 * 2 ** attempt, 1))
+        failed += len(remaining)
+    return failed
@@ -2,62 +2,87 @@
 Lambda: API Gateway Custom Authorizer (RBAC)
 Validates Cognito JWT, looks up user in DynamoDB, and returns an IAM policy
 with tenant_id and role in the context.
+
+The policy allows exactly the routes the caller's role may use (not just the
+route being requested), so API Gateway can cache it per token and reuse it
+for every later request with that token.
 """
 
 import json
 import os
 import time
 import logging
+import functools
 import urllib.request
 
-import boto3
 from jose import jwt, jwk, JWTError
 
+from common import aws, tracing
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
-
 USERS_TABLE = os.environ["USERS_TABLE"]
 USER_POOL_ID = os.environ["USER_POOL_ID"]
 AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
 APP_CLIENT_ID = os.environ["APP_CLIENT_ID"]
 
-table = dynamodb.Table(USERS_TABLE)
-
 # Cache JWKS keys on cold start
 _jwks_cache = None
 
 ROLE_PERMISSIONS = {
     "ADMIN": {
         "POST/jobs",
+        "POST/jobs/cancel",
         "GET/jobs",
         "GET/jobs/*",
+        "POST/jobs/status",
         "GET/jobs/*/logs",
+        "DELETE/jobs/*",
         "POST/tenants/users",
         "DELETE/tenants/users/*",
         "GET/tenants/users",
         "POST/tenants/register",
+        "$connect/",
     },
     "DOCTOR": {
         "POST/jobs",
+        "POST/jobs/cancel",
         "GET/jobs",
         "GET/jobs/*",
+        "POST/jobs/status",
         "GET/jobs/*/logs",
+        "DELETE/jobs/*",
         "POST/tenants/register",
+        "$connect/",
     },
     "READ_ONLY": {
         "GET/jobs",
         "GET/jobs/*",
+        "POST/jobs/status",
         "GET/jobs/*/logs",
         "POST/tenants/register",
+        "$connect/",
+    },
+    # Signed in to Cognito but not yet registered with a tenant
+    "UNREGISTERED": {
+        "POST/tenants/register",
     },
 }
 
+aws.preload(tables=(USERS_TABLE,))
+
 
+@tracing.traced
 def handler(event, context):
-    """API Gateway TOKEN authorizer."""
-    token = event.get("authorizationToken", "")
+    """API Gateway TOKEN authorizer (REST) / REQUEST authorizer (WebSocket $connect).
+
+    Browsers can't set headers on a WebSocket handshake, so the status
+    WebSocket API passes the token as the `token` query parameter.
+    """
+    token = event.get("authorizationToken") or (
+        (event.get("queryStringParameters") or {}).get("token", "")
+    )
 
     # Strip "Bearer " prefix
     if token.lower().startswith("bearer "):
@@ -73,41 +98,20 @@ def handler(event, context):
         email = claims.get("email", "")
 
         # Look up user in DynamoDB
-        result = table.get_item(Key={"cognito_id": cognito_id})
+        result = aws.table(USERS_TABLE).get_item(Key={"cognito_id": cognito_id})
         user = result.get("Item")
 
-        if not user:
+        if user:
+            tenant_id = user.get("tenant_id", "")
+            role = user.get("role", "READ_ONLY")
+        else:
             # User exists in Cognito but not registered in our system yet
-            # Allow only the register endpoint
-            policy = _generate_policy(
-                cognito_id,
-                "Allow",
-                event["methodArn"],
-                context_data={
-                    "cognito_id": cognito_id,
-                    "email": email,
-                    "tenant_id": "",
-                    "role": "UNREGISTERED",
-                },
-            )
-            return policy
-
-        tenant_id = user.get("tenant_id", "")
-        role = user.get("role", "READ_ONLY")
-
-        # Check if this role is allowed for the requested method/resource
-        method_arn = event["methodArn"]
-        http_method, resource_path = _parse_method_arn(method_arn)
-        route_key = f"{http_method}{resource_path}"
-
-        allowed_routes = ROLE_PERMISSIONS.get(role, set())
-        is_allowed = _check_permission(route_key, allowed_routes)
-
-        effect = "Allow" if is_allowed else "Deny"
-
-        policy = _generate_policy(
+            tenant_id = ""
+            role = "UNREGISTERED"
+
+        return _generate_policy(
             cognito_id,
-            effect,
+            role,
             event["methodArn"],
             context_data={
                 "cognito_id": cognito_id,
@@ -116,7 +120,6 @@ def handler(event, context):
                 "role": role,
             },
         )
-        return policy
 
     except JWTError as exc:
         logger.error("JWT validation failed: %s", exc)
@@ -169,55 +172,19 @@ def _validate_token(token: str) -> dict:
     return claims
 
 
-def _parse_method_arn(method_arn: str):
-    """Extract HTTP method and resource path from the method ARN."""
-    # arn:aws:execute-api:region:account:api-id/stage/METHOD/resource/path
-    arn_parts = method_arn.split(":")
-    api_gw_part = arn_parts[5]  # api-id/stage/METHOD/resource
-    parts = api_gw_part.split("/")
-    http_method = parts[2]  # GET, POST, etc.
-    resource_path = "/" + "/".join(parts[3:]) if len(parts) > 3 else "/"
-    return http_method, resource_path
-
-
-def _check_permission(route_key: str, allowed_routes: set) -> bool:
-    """Check if a route key matches any allowed patterns (supports * wildcards)."""
-    if route_key in allowed_routes:
-        return True
-
-    # Check wildcard patterns
-    for pattern in allowed_routes:
-        if "*" in pattern:
-            # Convert pattern to match: GET/jobs/* matches GET/jobs/abc-123
-            pattern_parts = pattern.split("/")
-            route_parts = route_key.split("/")
-
-            if len(route_parts) >= len(pattern_parts):
-                match = True
-                for i, pp in enumerate(pattern_parts):
-                    if pp == "*":
-                        continue
-                    if i >= len(route_parts) or pp != route_parts[i]:
-                        match = False
-                        break
-                if match:
-                    return True
-
-    return False
-
-
 def _generate_policy(
     principal_id: str,
-    effect: str,
+    role: str,
     method_arn: str,
     context_data: dict = None,
 ) -> dict:
-    """Generate an IAM policy document for API Gateway."""
-    # Use a wildcard ARN so the policy is cached across all methods
+    """Generate an IAM policy document allowing every route of the caller's role."""
+    # arn:aws:execute-api:region:account:api-id/stage/METHOD/resource/path
     arn_parts = method_arn.split(":")
-    api_gw_part = arn_parts[5].split("/")
-    resource_arn = ":".join(arn_parts[:5]) + ":" + api_gw_part[0] + "/*"
+    api_id, stage = arn_parts[5].split("/")[:2]
+    stage_arn = ":".join(arn_parts[:5]) + f":{api_id}/{stage}"
 
+    resources = _role_resources(role, stage_arn)
     policy = {
         "principalId": principal_id,
         "policyDocument": {
@@ -225,8 +192,8 @@ def _generate_policy(
             "Statement": [
                 {
                     "Action": "execute-api:Invoke",
-                    "Effect": effect,
-                    "Resource": resource_arn,
+                    "Effect": "Allow" if resources else "Deny",
+                    "Resource": list(resources) or f"{stage_arn}/*",
                 }
             ],
         },
@@ -237,3 +204,16 @@ def _generate_policy(
         policy["context"] = {k: str(v) for k, v in context_data.items()}
 
     return policy
+
+
+@functools.lru_cache(maxsize=64)
+def _role_resources(role: str, stage_arn: str) -> tuple:
+    """Method ARNs for a role's routes under one API stage (computed once per container).
+
+    "GET/jobs/*" becomes "<stage_arn>/GET/jobs/*"; a trailing "/" (WebSocket
+    routes such as "$connect/") is dropped.
+    """
+    return tuple(
+        f"{stage_arn}/{route.rstrip('/')}"
+        for route in sorted(ROLE_PERMISSIONS.get(role, ()))
+    )
@@ -0,0 +1,109 @@
+"""
+Lambda: Backfill Tenant Shard
+One-off migration for the write-sharded tenant index (see common.tenant_index).
+Tasks written before it have no `tenant_shard`, so `tenant-shard-index` doesn't
+list them. This parallel-scans the tasks table and sets `tenant_shard` on every
+item that has a tenant but no shard.
+
+Invoke it until it returns "complete": true (`make backfill-tenant-shards`).
+Each run stops scanning before the Lambda timeout and returns `pending`, the
+scan position of every unfinished segment; passing the summary back as the
+next event resumes there instead of re-reading what is already sharded. Writes
+are conditional on the shard still being unset, so re-running is harmless. Once it is complete
+and the new index is ACTIVE, set `tenant_shard_backfill_complete` and list_jobs
+switches off the old `tenant-index`.
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from common import aws, tenant_index, tracing
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+TABLE_NAME = os.environ["DYNAMODB_TABLE"]
+
+SCAN_SEGMENTS = 8
+# Stop scanning with this much of the invocation left
+RESERVE_MS = 30_000
+
+aws.preload("dynamodb")
+
+
+@tracing.traced
+def handler(event, context):
+    """Set tenant_shard on unsharded tasks; returns a summary.
+
+    `event["pending"]`, from the previous run's summary, maps each unfinished
+    segment to its ExclusiveStartKey ({} to start from the top); segments it
+    leaves out are done. Without it every segment is scanned from the top.
+    """
+    deadline = time.monotonic() + max(context.get_remaining_time_in_millis() - RESERVE_MS, 0) / 1000
+    pending = (event or {}).get("pending")
+    if pending is None:
+        pending = {str(segment): {} for segment in range(SCAN_SEGMENTS)}
+
+    with ThreadPoolExecutor(max_workers=SCAN_SEGMENTS) as pool:
+        segments = dict(zip(pending, pool.map(
+            lambda entry: _backfill_segment(int(entry[0]), entry[1], deadline), pending.items()
+        )))
+
+    summary = {
+        "updated": sum(updated for updated, _ in segments.values()),
+        # False when a segment hit the deadline; invoke again with this summary to carry on
+        "complete": all(start_key is None for _, start_key in segments.values()),
+        "pending": {
+            segment: start_key for segment, (_, start_key) in segments.items() if start_key is not None
+        },
+    }
+    logger.info("Tenant shard backfill: %s", summary)
+    return summary
+
+
+def _backfill_segment(segment: int, start_key: dict, deadline: float):
+    """Shard unsharded tasks in one scan segment from `start_key`.
+
+    Returns (updated, next start key), the key being None once the segment is done.
+    """
+    kwargs = {
+        "TableName": TABLE_NAME,
+        "Segment": segment,
+        "TotalSegments": SCAN_SEGMENTS,
+        "FilterExpression": "attribute_exists(tenant_id) AND attribute_not_exists(tenant_shard)",
+        "ProjectionExpression": "task_id, tenant_id",
+    }
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+
+    ddb = aws.client("dynamodb")
+    updated = 0
+    while time.monotonic() < deadline:
+        result = ddb.scan(**kwargs)
+        for item in result.get("Items", []):
+            updated += _set_shard(item["task_id"]["S"], item["tenant_id"]["S"])
+        if "LastEvaluatedKey" not in result:
+            return updated, None
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+    return updated, kwargs.get("ExclusiveStartKey", {})
+
+
+def _set_shard(task_id: str, tenant_id: str) -> int:
+    try:
+        aws.client("dynamodb").update_item(
+            TableName=TABLE_NAME,
+            Key={"task_id": {"S": task_id}},
+            UpdateExpression="SET tenant_shard = :shard",
+            # Not on items archived meanwhile, nor ones that got a shard since the scan
+            ConditionExpression="attribute_exists(task_id) AND attribute_not_exists(tenant_shard)",
+            ExpressionAttributeValues={":shard": {"S": tenant_index.shard_for(tenant_id, task_id)}},
+        )
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        return 0
+    return 1
@@ -0,0 +1,120 @@
+"""
+Lambda: Cancel Job
+  DELETE /jobs/{task_id}   → cancel one job
+  POST   /jobs/cancel      → cancel many: {"task_ids": [...]}
+
+A job is cancelled by flipping its status to CANCELLED with a conditional
+write, which every later status write (process_job, the agent) refuses to
+overwrite. What happens next depends on how far the job got:
+
+  SCHEDULED                the job leaves the schedule index and is never queued
+  PENDING / PROVISIONING   process_job drops the message instead of calling
+                           RunTask, or stops the container it has just started
+  PROVISIONED / RUNNING    the ECS task is stopped here; the agent gets SIGTERM
+                           and uploads what it has before exiting
+"""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from common import aws, dynamo, tracing
+from common.api import response as _response, auth_context as _auth_context, parse_body, path_param
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+TABLE_NAME = os.environ["DYNAMODB_TABLE"]
+ECS_CLUSTER = os.environ["ECS_CLUSTER"]
+
+ACTIVE_STATUSES = ("SCHEDULED", "PENDING", "PROVISIONING", "PROVISIONED", "RUNNING")
+MAX_BULK_CANCEL = 500
+CANCEL_CONCURRENCY = 16
+
+aws.preload("dynamodb", "ecs")
+
+
+@tracing.traced
+def handler(event, context):
+    """Route DELETE /jobs/{task_id} and POST /jobs/cancel."""
+    auth = _auth_context(event)
+    tenant_id = auth.get("tenant_id")
+    if not tenant_id:
+        return _response(403, {"error": "No tenant associated with this user"})
+    cancelled_by = auth.get("cognito_id", "")
+
+    if event.get("httpMethod") == "DELETE":
+        task_id = path_param(event, "task_id")
+        if not task_id:
+            return _response(400, {"error": "task_id is required"})
+        result = _cancel(task_id, tenant_id, cancelled_by)
+        status_code = {"CANCELLED": 200, "NOT_FOUND": 404, "ALREADY_FINISHED": 409}[result["result"]]
+        return _response(status_code, result)
+
+    body = parse_body(event)
+    if not isinstance(body, dict):
+        return _response(400, {"error": "Invalid JSON body"})
+    task_ids = body.get("task_ids")
+    if not isinstance(task_ids, list) or not task_ids or not all(isinstance(t, str) and t for t in task_ids):
+        return _response(400, {"error": "'task_ids' must be a non-empty list of task IDs"})
+    if len(task_ids) > MAX_BULK_CANCEL:
+        return _response(400, {"error": f"At most {MAX_BULK_CANCEL} task IDs per request"})
+
+    task_ids = list(dict.fromkeys(task_ids))
+    with ThreadPoolExecutor(max_workers=CANCEL_CONCURRENCY) as pool:
+        results = list(pool.map(lambda task_id: _cancel(task_id, tenant_id, cancelled_by), task_ids))
+
+    return _response(200, {
+        "results": results,
+        "cancelled": sum(1 for r in results if r["result"] == "CANCELLED"),
+        "count": len(results),
+    })
+
+
+def _cancel(task_id: str, tenant_id: str, cancelled_by: str) -> dict:
+    """Cancel one of the tenant's tasks; returns its per-task result."""
+    ddb = aws.client("dynamodb")
+    statuses = {f":s{i}": {"S": status} for i, status in enumerate(ACTIVE_STATUSES)}
+    now = datetime.now(timezone.utc).isoformat()
+    try:
+        result = ddb.update_item(
+            TableName=TABLE_NAME,
+            Key={"task_id": {"S": task_id}},
+            UpdateExpression="SET #s = :cancelled, updated_at = :now, cancelled_at = :now, cancelled_by = :by REMOVE schedule_key",
+            ConditionExpression=f"tenant_id = :tid AND #s IN ({', '.join(statuses)})",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={
+                **statuses,
+                ":cancelled": {"S": "CANCELLED"},
+                ":now": {"S": now},
+                ":by": {"S": cancelled_by},
+                ":tid": {"S": tenant_id},
+            },
+            ReturnValues="ALL_OLD",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        old = dynamo.item(exc.response.get("Item")) or {}
+        if old.get("tenant_id") != tenant_id:
+            return {"task_id": task_id, "result": "NOT_FOUND"}
+        return {"task_id": task_id, "result": "ALREADY_FINISHED", "status": old.get("status")}
+
+    old = dynamo.item(result["Attributes"])
+    if old.get("ecs_task_arn"):
+        _stop_task(task_id, old["ecs_task_arn"])
+    logger.info("Cancelled task %s (was %s)", task_id, old.get("status"))
+    return {"task_id": task_id, "result": "CANCELLED", "previous_status": old.get("status")}
+
+
+def _stop_task(task_id: str, ecs_task_arn: str):
+    """Stop the job's container; a task that already stopped is not an error."""
+    try:
+        aws.client("ecs").stop_task(cluster=ECS_CLUSTER, task=ecs_task_arn, reason="Cancelled by user")
+    except ClientError as exc:
+        # InvalidParameterException: the task has already stopped and aged out
+        logger.warning("Could not stop ECS task for %s: %s", task_id, exc)
@@ -3,52 +3,81 @@ Lambda: Get Runtime Logs
 Fetches CloudWatch runtime logs for an ECS task using the ecs_task_id stored in DynamoDB.
 Enforces tenant ownership via authorizer context.
 Log stream pattern: {prefix}/{container-name}/{ecs-task-id}
+
+With `?since=<seq>` it instead returns the agent's own execution log from
+the gzip chunks the agent streams to S3 (tasks/{id}/log/), starting after
+chunk `seq` — clients poll with the returned `next_since` to get only new lines.
+
+With any of `level`, `q`, `pattern`, `start` or `end` the search is pushed
+down to CloudWatch as a filter pattern (FilterLogEvents) over the task's
+stream. Long time ranges are split into slices searched concurrently, and
+results come back in timestamp order with an opaque `next_cursor`.
 """
 
-import json
 import os
+import gzip
+import json
+import time
+import base64
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
-import boto3
 from botocore.exceptions import ClientError
 
+from common import aws, dynamo, tracing
+from common.api import response as _response, caller_tenant_id, path_param, query_params
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
-logs_client = boto3.client("logs")
-
 TABLE_NAME = os.environ["DYNAMODB_TABLE"]
 LOG_GROUP = os.environ["LOG_GROUP"]
 LOG_STREAM_PREFIX = os.environ.get("LOG_STREAM_PREFIX", "agent")
 CONTAINER_NAME = os.environ.get("CONTAINER_NAME", "agent")
+S3_BUCKET = os.environ["S3_BUCKET"]
+MAX_CHUNKS_PER_RESPONSE = int(os.environ.get("MAX_CHUNKS_PER_RESPONSE", "50"))
+
+# Filtered search: ranges longer than MIN_SLICE_MS are split into up to
+# FILTER_SLICES windows searched concurrently, within FILTER_BUDGET_SECONDS
+FILTER_SLICES = int(os.environ.get("FILTER_SLICES", "6"))
+MIN_SLICE_MS = 5 * 60 * 1000
+FILTER_BUDGET_SECONDS = float(os.environ.get("FILTER_BUDGET_SECONDS", "20"))
+FILTER_PARAMS = ("level", "q", "pattern", "start", "end", "cursor")
 
-table = dynamodb.Table(TABLE_NAME)
+# Agent log lines look like "2026-10-18 12:00:00,123 [ERROR] message"
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
 
+aws.preload("dynamodb", "logs", "s3")
 
+
+@tracing.traced
 def handler(event, context):
     """GET /jobs/{task_id}/logs — return CloudWatch runtime logs for the ECS task."""
-    task_id = event.get("pathParameters", {}).get("task_id")
+    task_id = path_param(event, "task_id")
 
     if not task_id:
         return _response(400, {"error": "task_id is required"})
 
-    # Verify tenant ownership
-    auth_context = event.get("requestContext", {}).get("authorizer", {})
-    caller_tenant_id = auth_context.get("tenant_id", "")
-
     # Fetch task metadata from DynamoDB
-    result = table.get_item(Key={"task_id": task_id})
-    item = result.get("Item")
+    result = aws.client("dynamodb").get_item(
+        TableName=TABLE_NAME, Key={"task_id": {"S": task_id}}
+    )
+    item = dynamo.item(result.get("Item"))
 
     if not item:
         return _response(404, {"error": f"Task {task_id} not found"})
 
     # Enforce tenant isolation
-    if item.get("tenant_id") != caller_tenant_id:
+    if item.get("tenant_id") != caller_tenant_id(event):
         return _response(403, {"error": "You do not have access to this task"})
 
+    params = query_params(event)
+    if "since" in params:
+        return _execution_log(task_id, item, params["since"])
+
     ecs_task_id = item.get("ecs_task_id")
     if not ecs_task_id:
         return _response(400, {
@@ -70,10 +99,13 @@ def handler(event, context):
             pass
 
     # Query parameters from request
-    query_params = event.get("queryStringParameters") or {}
-    next_token = query_params.get("next_token")
-    limit = min(int(query_params.get("limit", "200")), 500)
+    next_token = params.get("next_token")
+    limit = min(int(params.get("limit", "200")), 500)
+
+    if any(params.get(name) for name in FILTER_PARAMS):
+        return _filtered_logs(task_id, item, ecs_task_id, log_stream_name, start_time, params, limit)
 
+    logs_client = aws.client("logs")
     try:
         # Fetch log events
         kwargs = {
@@ -130,14 +162,254 @@ def handler(event, context):
         return _response(500, {"error": f"Failed to fetch logs: {str(exc)}"})
 
 
-def _response(status_code: int, body: dict) -> dict:
-    return {
-        "statusCode": status_code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type,Authorization",
-            "Access-Control-Allow-Methods": "GET,POST,DELETE,OPTIONS",
+def _execution_log(task_id: str, item: dict, since_param: str) -> dict:
+    """Return execution-log lines from the S3 chunks after sequence `since`."""
+    try:
+        since = int(since_param or "0")
+    except ValueError:
+        return _response(400, {"error": "since must be an integer chunk sequence number"})
+
+    s3 = aws.client("s3")
+    body = {
+        "task_id": task_id,
+        "status": item.get("status", "UNKNOWN"),
+        "source": "execution_log",
+        "since": since,
+    }
+    try:
+        index = json.loads(
+            s3.get_object(Bucket=S3_BUCKET, Key=f"tasks/{task_id}/log/index.json")["Body"].read()
+        )
+    except s3.exceptions.NoSuchKey:
+        # Agent hasn't flushed its first chunk yet
+        return _response(200, {**body, "events": [], "count": 0, "next_since": since, "complete": False})
+
+    pending = [c for c in index.get("chunks", []) if c["seq"] > since]
+    chunks = pending[:MAX_CHUNKS_PER_RESPONSE]
+
+    def fetch(chunk):
+        obj = s3.get_object(Bucket=S3_BUCKET, Key=chunk["key"])
+        return gzip.decompress(obj["Body"].read()).decode()
+
+    with ThreadPoolExecutor(max_workers=min(8, len(chunks) or 1)) as pool:
+        texts = list(pool.map(fetch, chunks))
+
+    events = [_parse_line(line) for text in texts for line in text.splitlines() if line]
+    has_more = len(pending) > len(chunks)
+    return _response(200, {
+        **body,
+        "events": events,
+        "count": len(events),
+        "next_since": chunks[-1]["seq"] if chunks else since,
+        "has_more": has_more,
+        "complete": bool(index.get("complete")) and not has_more,
+    })
+
+
+def _parse_line(line: str) -> dict:
+    """Split an execution-log line ("[iso-time] message") into an event."""
+    if line.startswith("[") and "] " in line:
+        stamp, message = line[1:].split("] ", 1)
+        try:
+            timestamp = int(datetime.fromisoformat(stamp).timestamp() * 1000)
+            return {"timestamp": timestamp, "time": stamp, "message": message}
+        except ValueError:
+            pass
+    return {"timestamp": None, "time": None, "message": line}
+
+
+def _filtered_logs(task_id, item, ecs_task_id, log_stream_name, created_ms, params, limit) -> dict:
+    """Search the task's stream with a CloudWatch filter pattern over a time range."""
+    try:
+        pattern, keep = _filter_pattern(params)
+        start = _time_param(params.get("start")) or created_ms or 0
+        end = _time_param(params.get("end")) or int(time.time() * 1000)
+    except ValueError as exc:
+        return _response(400, {"error": str(exc)})
+    if start > end:
+        return _response(400, {"error": "start must not be later than end"})
+
+    # The cursor is only valid for the filter it was issued under
+    filter_args = [params.get(name) for name in ("pattern", "level", "q", "start", "end")]
+    signature = hashlib.sha256(json.dumps(filter_args).encode()).hexdigest()[:16]
+    seen_ids = set()
+    if params.get("cursor"):
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(params["cursor"]))
+        except (ValueError, TypeError):
+            return _response(400, {"error": "Invalid cursor"})
+        if not _valid_cursor(cursor, start, end):
+            return _response(400, {"error": "Invalid cursor"})
+        if cursor.get("f") != signature:
+            return _response(400, {"error": "Cursor does not match the current filter parameters"})
+        start = cursor["t"]
+        seen_ids = set(cursor.get("ids", []))
+
+    logs_client = aws.client("logs")
+    base_kwargs = {
+        "logGroupName": LOG_GROUP,
+        "logStreamNames": [log_stream_name],
+    }
+    if pattern:
+        base_kwargs["filterPattern"] = pattern
+    deadline = time.monotonic() + FILTER_BUDGET_SECONDS
+    stop = threading.Event()
+
+    def search(window):
+        """Return (events, exhausted) for one time slice, at most limit + 1 kept events."""
+        kwargs = {**base_kwargs, "startTime": window[0], "endTime": window[1]}
+        found = []
+        while time.monotonic() < deadline and not stop.is_set():
+            page = logs_client.filter_log_events(**kwargs)
+            for evt in page.get("events", []):
+                if evt["eventId"] in seen_ids or not keep(evt["message"]):
+                    continue
+                found.append(evt)
+            if len(found) > limit:
+                return found, False
+            if not page.get("nextToken"):
+                return found, True
+            kwargs["nextToken"] = page["nextToken"]
+        return found, False
+
+    windows = _slices(start, end)
+    events, has_more = [], False
+    try:
+        with ThreadPoolExecutor(max_workers=len(windows)) as pool:
+            futures = [pool.submit(search, window) for window in windows]
+            try:
+                # Consume slices in time order; later slices are only prefetch
+                for future in futures:
+                    found, exhausted = future.result()
+                    events.extend(found)
+                    if len(events) > limit or not exhausted:
+                        has_more = True
+                        break
+            finally:
+                stop.set()
+                for future in futures:
+                    future.cancel()
+    except logs_client.exceptions.ResourceNotFoundException:
+        return _response(404, {
+            "error": "Log stream not found — the task may not have started yet",
+            "task_id": task_id,
+            "ecs_task_id": ecs_task_id,
+            "log_stream": log_stream_name,
+            "status": item.get("status", "UNKNOWN"),
+        })
+    except ClientError as exc:
+        logger.error("CloudWatch error: %s", exc)
+        return _response(500, {"error": f"Failed to search logs: {str(exc)}"})
+
+    events = events[:limit]
+    result = {
+        "task_id": task_id,
+        "ecs_task_id": ecs_task_id,
+        "log_group": LOG_GROUP,
+        "log_stream": log_stream_name,
+        "status": item.get("status", "UNKNOWN"),
+        "filter": {
+            "pattern": pattern,
+            "start": _iso(start),
+            "end": _iso(end),
         },
-        "body": json.dumps(body),
+        "events": [
+            {
+                "timestamp": evt["timestamp"],
+                "time": _iso(evt["timestamp"]),
+                "message": evt["message"].rstrip("\n"),
+            }
+            for evt in events
+        ],
+        "count": len(events),
     }
+    if has_more and events:
+        # Resume at the last returned timestamp, skipping events already returned at it
+        last = events[-1]["timestamp"]
+        ids = [evt["eventId"] for evt in events if evt["timestamp"] == last]
+        if last == start:
+            ids += list(seen_ids)
+        cursor = {"t": last, "ids": ids, "f": signature}
+        result["next_cursor"] = base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+    elif has_more:
+        # Search budget ran out before anything matched; retry with the same cursor
+        result["next_cursor"] = params.get("cursor") or base64.urlsafe_b64encode(
+            json.dumps({"t": start, "ids": [], "f": signature}).encode()
+        ).decode()
+
+    return _response(200, result)
+
+
+def _valid_cursor(cursor, start: int, end: int) -> bool:
+    """A decoded cursor is {"t": ms within [start, end], "ids": [str], "f": str}."""
+    if not isinstance(cursor, dict):
+        return False
+    t, ids = cursor.get("t"), cursor.get("ids", [])
+    if not isinstance(t, int) or isinstance(t, bool) or not start <= t <= end:
+        return False
+    return isinstance(ids, list) and all(isinstance(event_id, str) for event_id in ids)
+
+
+def _filter_pattern(params: dict):
+    """Build the CloudWatch filter pattern and a local predicate for what it can't express.
+
+    Returns (pattern, keep). Unstructured patterns can AND terms or OR them but
+    not both, so a multi-level match combined with `q` is pushed down as the
+    `q` term and the level is checked locally.
+    """
+    raw = params.get("pattern")
+    level = (params.get("level") or "").upper()
+    q = params.get("q")
+
+    if level and level not in LEVELS:
+        raise ValueError(f"level must be one of: {', '.join(LEVELS)}")
+    levels = LEVELS[LEVELS.index(level):] if level else ()
+    level_tags = [f"[{lvl}]" for lvl in levels]
+
+    def keep_level(message):
+        return not level_tags or any(tag in message for tag in level_tags)
+
+    def keep_q(message):
+        return not q or q in message
+
+    if raw:
+        return raw, lambda message: keep_level(message) and keep_q(message)
+
+    if len(level_tags) > 1 and q:
+        return _term(q), keep_level
+    if len(level_tags) > 1:
+        return " ".join(f"?{_term(tag)}" for tag in level_tags), lambda message: True
+
+    terms = [_term(tag) for tag in level_tags] + ([_term(q)] if q else [])
+    return " ".join(terms), lambda message: True
+
+
+def _term(text: str) -> str:
+    """Quote a literal for an unstructured filter pattern."""
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _time_param(text):
+    """Parse an ISO 8601 time or epoch milliseconds; None when absent."""
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+    try:
+        dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid time: {text} (use ISO 8601 or epoch milliseconds)")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def _slices(start: int, end: int) -> list:
+    """Split [start, end] into contiguous, non-overlapping windows for concurrent search."""
+    count = max(1, min(FILTER_SLICES, (end - start) // MIN_SLICE_MS))
+    step = (end - start) // count + 1
+    return [(t, min(t + step - 1, end)) for t in range(start, end + 1, step)]
+
+
+def _iso(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).isoformat()
@@ -1,71 +1,203 @@
 """
 Lambda: Get Job Status
 Returns task metadata from DynamoDB and pre-signed S3 URLs for outputs.
+Small extracted result sets are stored on the task item and returned inline
+as `results`; larger ones only via the `results` output URL.
+Outputs are content-addressed blobs listed in the item's `artifacts` map;
+tasks written before that fall back to probing the per-task keys.
 Enforces tenant ownership via authorizer context.
+
+POST /jobs/status tracks many jobs in one call: {"task_ids": [...]} (up to
+100) is read with BatchGetItem and answered with compact status records,
+plus output URLs if "include_outputs" is set.
 """
 
-import json
 import os
+import json
+import time
 import logging
-import decimal
 
-import boto3
 from botocore.exceptions import ClientError
 
+from common import aws, dynamo, tracing
+from common.api import response as _response, caller_tenant_id, path_param, query_params, parse_body
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
-s3 = boto3.client("s3")
-
 TABLE_NAME = os.environ["DYNAMODB_TABLE"]
 S3_BUCKET = os.environ["S3_BUCKET"]
 PRESIGN_EXPIRY = int(os.environ.get("PRESIGN_EXPIRY", "3600"))
 
-table = dynamodb.Table(TABLE_NAME)
+TERMINAL_STATUSES = ("COMPLETED", "FAILED", "CANCELLED", "TIMED_OUT")
+
+# BatchGetItem's per-request key limit
+MAX_BATCH_TASK_IDS = 100
+BATCH_GET_ATTEMPTS = 5
+# What a batch status record carries; `artifacts` only when outputs are asked for
+BATCH_FIELDS = (
+    "task_id", "tenant_id", "status", "job_type", "created_at", "updated_at", "completed_at",
+    "error", "errorLog", "results_count", "targets_total", "targets_completed", "targets_failed",
+)
 
+aws.preload("dynamodb", "s3")
 
+
+@tracing.traced
 def handler(event, context):
-    """GET /jobs/{task_id} — return task metadata and output URLs."""
-    task_id = event.get("pathParameters", {}).get("task_id")
+    """GET /jobs/{task_id} — return task metadata and output URLs.
+
+    `?target=<n>` returns target n of a MULTI_TARGET job instead, with
+    pre-signed URLs for that target's outputs.
+    """
+    if event.get("httpMethod") == "POST":
+        return _batch_status(event)
+
+    task_id = path_param(event, "task_id")
 
     if not task_id:
         return _response(400, {"error": "task_id is required"})
 
-    # Verify tenant ownership
-    auth_context = event.get("requestContext", {}).get("authorizer", {})
-    caller_tenant_id = auth_context.get("tenant_id", "")
-
     # Fetch from DynamoDB
-    result = table.get_item(Key={"task_id": task_id})
-    item = result.get("Item")
+    result = aws.client("dynamodb").get_item(
+        TableName=TABLE_NAME, Key={"task_id": {"S": task_id}}
+    )
+    item = dynamo.item(result.get("Item"))
 
     if not item:
         return _response(404, {"error": f"Task {task_id} not found"})
 
     # Enforce tenant isolation
-    if item.get("tenant_id") != caller_tenant_id:
+    if item.get("tenant_id") != caller_tenant_id(event):
         return _response(403, {"error": "You do not have access to this task"})
 
-    # Convert Decimal types for JSON serialization
-    task_data = _sanitize_item(item)
+    artifacts = item.get("artifacts")
+    target = query_params(event).get("target")
+    if target is not None:
+        return _target_response(task_id, artifacts, target)
 
-    # If completed, generate pre-signed URLs
-    if task_data.get("status") in ("COMPLETED", "FAILED"):
-        task_data["outputs"] = _get_output_urls(task_id)
+    # If finished, generate pre-signed URLs (a cancelled job keeps its partial outputs)
+    if item.get("status") in TERMINAL_STATUSES:
+        if artifacts is not None:
+            item["outputs"] = _presign_artifacts(artifacts)
+        else:
+            item["outputs"] = _get_output_urls(task_id)
+
+    return _response(200, item)
+
+
+def _batch_status(event):
+    """POST /jobs/status — compact status records for up to 100 of the tenant's jobs."""
+    tenant_id = caller_tenant_id(event)
+    if not tenant_id:
+        return _response(403, {"error": "No tenant associated with this user"})
+
+    body = parse_body(event)
+    if not isinstance(body, dict):
+        return _response(400, {"error": "Invalid JSON body"})
+    task_ids = body.get("task_ids")
+    if not isinstance(task_ids, list) or not task_ids or not all(isinstance(t, str) and t for t in task_ids):
+        return _response(400, {"error": "'task_ids' must be a non-empty list of task IDs"})
+    if len(task_ids) > MAX_BATCH_TASK_IDS:
+        return _response(400, {"error": f"At most {MAX_BATCH_TASK_IDS} task IDs per request"})
+    include_outputs = body.get("include_outputs") is True
+
+    task_ids = list(dict.fromkeys(task_ids))
+    found, unprocessed = _batch_get(task_ids, BATCH_FIELDS + (("artifacts",) if include_outputs else ()))
+
+    jobs, not_found = [], []
+    for task_id in task_ids:
+        if task_id in unprocessed:
+            continue
+        item = found.get(task_id)
+        # Another tenant's task is reported exactly like a missing one
+        if not item or item.pop("tenant_id", None) != tenant_id:
+            not_found.append(task_id)
+            continue
+        artifacts = item.pop("artifacts", None)
+        if include_outputs and artifacts and item.get("status") in TERMINAL_STATUSES:
+            item["outputs"] = _presign_artifacts(artifacts)
+        jobs.append(item)
+
+    response_body = {"jobs": jobs, "count": len(jobs), "not_found": not_found}
+    if unprocessed:
+        # Still throttled after retrying; the client can ask for these again
+        response_body["unprocessed"] = [t for t in task_ids if t in unprocessed]
+    return _response(200, response_body)
+
+
+def _batch_get(task_ids: list, fields: tuple):
+    """BatchGetItem with retries; returns ({task_id: item}, set of task IDs never processed)."""
+    names = {f"#f{i}": field for i, field in enumerate(fields)}
+    request = {
+        "Keys": [{"task_id": {"S": task_id}} for task_id in task_ids],
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
 
-    return _response(200, task_data)
+    ddb = aws.client("dynamodb")
+    found = {}
+    for attempt in range(BATCH_GET_ATTEMPTS):
+        result = ddb.batch_get_item(RequestItems={TABLE_NAME: request})
+        for raw in result.get("Responses", {}).get(TABLE_NAME, []):
+            item = dynamo.item(raw)
+            found[item["task_id"]] = item
+        remaining = result.get("UnprocessedKeys", {}).get(TABLE_NAME)
+        if not remaining:
+            return found, set()
+        request = remaining
+        time.sleep(min(0.05 * 2 ** attempt, 1))
+    return found, {key["task_id"]["S"] for key in request["Keys"]}
+
+
+def _presign(pointer: dict) -> str:
+    """Pre-sign a GET for a content-addressed blob pointer."""
+    params = {"Bucket": S3_BUCKET, "Key": pointer["key"]}
+    if pointer.get("content_type"):
+        params["ResponseContentType"] = pointer["content_type"]
+    return aws.client("s3").generate_presigned_url(
+        "get_object", Params=params, ExpiresIn=PRESIGN_EXPIRY
+    )
+
+
+def _presign_artifacts(artifacts: dict) -> dict:
+    """Pre-signed URLs for every artifact pointer — no S3 round-trips needed."""
+    return {name: _presign(pointer) for name, pointer in artifacts.items()}
+
+
+def _target_response(task_id: str, artifacts: dict, target: str) -> dict:
+    """Return one target's record from a MULTI_TARGET job's manifest."""
+    if not target.isdigit():
+        return _response(400, {"error": "target must be a non-negative integer"})
+    manifest_pointer = (artifacts or {}).get("targets")
+    if not manifest_pointer:
+        return _response(404, {"error": "Task has no target manifest yet"})
+
+    obj = aws.client("s3").get_object(Bucket=S3_BUCKET, Key=manifest_pointer["key"])
+    targets = json.loads(obj["Body"].read()).get("targets", [])
+    index = int(target)
+    # A cancelled or timed-out job's manifest only lists the targets that finished
+    record = next((r for r in targets if r and r.get("index") == index), None)
+    if record is None:
+        return _response(404, {"error": f"Task {task_id} has no record for target {index}"})
+
+    record["outputs"] = _presign_artifacts(record.get("artifacts", {}))
+    return _response(200, {"task_id": task_id, **record})
 
 
 def _get_output_urls(task_id: str) -> dict:
     """Generate pre-signed URLs for task output files."""
     output_keys = [
+        ("results", f"tasks/{task_id}/results.json"),
+        ("page_text", f"tasks/{task_id}/page.txt"),
         ("screenshot", f"tasks/{task_id}/screenshot.png"),
         ("execution_log", f"tasks/{task_id}/execution.log"),
         ("error", f"tasks/{task_id}/error.json"),
         ("heartbeat", f"tasks/{task_id}/heartbeat.json"),
+        ("targets", f"tasks/{task_id}/targets/index.json"),
     ]
 
+    s3 = aws.client("s3")
     urls = {}
     for name, key in output_keys:
         try:
@@ -81,27 +213,3 @@ def _get_output_urls(task_id: str) -> dict:
             pass  # Object doesn't exist
 
     return urls
-
-
-def _sanitize_item(item: dict) -> dict:
-    """Convert DynamoDB Decimal types to int/float for JSON."""
-    sanitized = {}
-    for key, value in item.items():
-        if isinstance(value, decimal.Decimal):
-            sanitized[key] = int(value) if value == int(value) else float(value)
-        else:
-            sanitized[key] = value
-    return sanitized
-
-
-def _response(status_code: int, body: dict) -> dict:
-    return {
-        "statusCode": status_code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type,Authorization",
-            "Access-Control-Allow-Methods": "GET,POST,DELETE,OPTIONS",
-        },
-        "body": json.dumps(body),
-    }
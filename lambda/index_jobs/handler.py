@@ -0,0 +1,110 @@
+"""
+Lambda: Index Jobs
+Triggered by the tasks table's DynamoDB stream (filtered to terminal
+statuses) — adds each job that has just finished to its tenant's search
+index (see common.search), so GET /jobs?q= can find it long after it has
+been archived.
+
+Stream records can be delivered more than once. A job whose summary item
+already exists is skipped; postings are plain puts, so re-writing them is
+harmless. Only the df/docs counters could be counted twice, if a run dies
+between them and the summary, and they only feed the ranking.
+"""
+
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from common import aws, dynamo, search, tracing
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SEARCH_TABLE = os.environ["SEARCH_TABLE"]
+S3_BUCKET = os.environ["S3_BUCKET"]
+UPDATE_CONCURRENCY = 16
+
+TERMINAL_STATUSES = ("COMPLETED", "FAILED", "CANCELLED", "TIMED_OUT")
+
+aws.preload("s3", tables=(SEARCH_TABLE,))
+
+
+@tracing.traced
+def handler(event, context):
+    """Index the jobs in a stream batch that reached a terminal status."""
+    finished = {}
+    for record in event.get("Records", []):
+        job = _finished_job(record)
+        if job:
+            finished[job["task_id"]] = job
+
+    indexed = sum(1 for job in finished.values() if _index(job))
+    logger.info("Indexed %d of %d finished jobs", indexed, len(finished))
+    return {"indexed": indexed}
+
+
+def _finished_job(record: dict):
+    """The new image, as a plain dict, if this record moves a job into a terminal status."""
+    if record.get("eventName") not in ("INSERT", "MODIFY"):
+        return None
+    change = record.get("dynamodb", {})
+    new = dynamo.item(change.get("NewImage")) or {}
+    old = dynamo.item(change.get("OldImage")) or {}
+    if new.get("status") not in TERMINAL_STATUSES or old.get("status") in TERMINAL_STATUSES:
+        return None
+    if not new.get("tenant_id"):
+        return None
+    return new
+
+
+def _index(job: dict) -> bool:
+    """Write one job's postings, counters and summary; False if it was already indexed."""
+    table = aws.table(SEARCH_TABLE)
+    tenant_id, task_id = job["tenant_id"], job["task_id"]
+    summary_key = {"pk": search.job_key(tenant_id, task_id), "sk": search.HEADER_SK}
+    if "Item" in table.get_item(Key=summary_key, ProjectionExpression="pk"):
+        return False
+
+    if "results" not in job and job.get("results_count"):
+        job["results"] = _stored_results(job)
+    terms = search.document_terms(job)
+
+    sk = search.posting_sk(job["created_at"], task_id)
+    with table.batch_writer() as batch:
+        for term, weight in terms.items():
+            batch.put_item(Item={"pk": search.term_key(tenant_id, term), "sk": sk, "w": weight})
+
+    if terms:
+        with ThreadPoolExecutor(max_workers=min(UPDATE_CONCURRENCY, len(terms))) as pool:
+            list(pool.map(lambda term: _count(search.term_key(tenant_id, term), "df"), terms))
+
+    summary = {field: job[field] for field in search.SUMMARY_FIELDS if job.get(field) is not None}
+    table.put_item(Item={**summary_key, **summary})
+    _count(search.stats_key(tenant_id), "docs")
+    return True
+
+
+def _count(pk: str, counter: str):
+    aws.table(SEARCH_TABLE).update_item(
+        Key={"pk": pk, "sk": search.HEADER_SK},
+        UpdateExpression="ADD #c :one",
+        ExpressionAttributeNames={"#c": counter},
+        ExpressionAttributeValues={":one": 1},
+    )
+
+
+def _stored_results(job: dict) -> list:
+    """Results too large to live on the task item, read from their results.json blob."""
+    pointer = (job.get("artifacts") or {}).get("results")
+    if not pointer:
+        return []
+    try:
+        obj = aws.client("s3").get_object(Bucket=S3_BUCKET, Key=pointer["key"])
+        return json.loads(obj["Body"].read()).get("results", [])
+    except (ClientError, ValueError) as exc:
+        # Index the query alone rather than hold up the stream
+        logger.warning("Could not read results for %s: %s", job["task_id"], exc)
+        return []
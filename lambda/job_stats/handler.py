@@ -0,0 +1,127 @@
+"""
+Lambda: Job Stats
+Latency percentiles for the caller's tenant over a time window, merged from
+the hourly histograms in the stats table (see common.latency).
+
+GET /jobs/stats?hours=24            last N whole-or-partial hours (max 2160)
+GET /jobs/stats?start=...&end=...   ISO-8601 bounds, hour resolution
+               &metric=run          only one metric
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+
+from common import aws, dynamo, latency, tracing
+from common.api import response as _response, caller_tenant_id, query_params
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+STATS_TABLE = os.environ["STATS_TABLE"]
+
+DEFAULT_HOURS = 24
+MAX_HOURS = latency.RETENTION_DAYS * 24
+PERCENTILES = (50, 90, 95, 99)
+
+aws.preload("dynamodb")
+
+
+@tracing.traced
+def handler(event, context):
+    """GET /jobs/stats — job latency and target-site timing percentiles."""
+    tenant_id = caller_tenant_id(event)
+
+    if not tenant_id:
+        return _response(403, {"error": "No tenant associated with this user"})
+
+    params = query_params(event)
+    metric = params.get("metric")
+    if metric and metric not in latency.METRICS:
+        return _response(400, {"error": f"'metric' must be one of: {', '.join(latency.METRICS)}"})
+
+    try:
+        start, end = _window(params)
+    except ValueError as exc:
+        return _response(400, {"error": str(exc)})
+
+    merged = {
+        name: latency.merge(items)
+        for name, items in _hourly_items(tenant_id, start, end).items()
+        if not metric or name == metric
+    }
+
+    metrics = {}
+    for name in ([metric] if metric else latency.METRICS):
+        hist = merged.get(name, latency.merge([]))
+        summary = {
+            "count": hist["n"],
+            "mean_ms": round(hist["sum_ms"] / hist["n"]) if hist["n"] else None,
+        }
+        for q in PERCENTILES:
+            value = latency.percentile(hist["buckets"], q, latency.base_ms(name))
+            summary[f"p{q}_ms"] = round(value) if value is not None else None
+        metrics[name] = summary
+
+    return _response(200, {
+        "tenant_id": tenant_id,
+        "start": start.strftime("%Y-%m-%dT%H:00:00+00:00"),
+        "end": end.strftime("%Y-%m-%dT%H:59:59+00:00"),
+        "metrics": metrics,
+    })
+
+
+def _window(params):
+    """(first hour, last hour) of the requested window, both inclusive."""
+    now = datetime.now(timezone.utc)
+    if "start" in params or "end" in params:
+        try:
+            end = _parse_time(params["end"]) if "end" in params else now
+            start = _parse_time(params["start"]) if "start" in params else end - timedelta(hours=DEFAULT_HOURS - 1)
+        except ValueError:
+            raise ValueError("'start' and 'end' must be ISO-8601 timestamps")
+    else:
+        try:
+            hours = int(params.get("hours", DEFAULT_HOURS))
+        except ValueError:
+            raise ValueError("'hours' must be an integer")
+        if hours < 1:
+            raise ValueError("'hours' must be at least 1")
+        end = now
+        start = now - timedelta(hours=hours - 1)
+
+    if start > end:
+        raise ValueError("'start' must not be after 'end'")
+    if end - start > timedelta(hours=MAX_HOURS):
+        raise ValueError(f"The window may span at most {MAX_HOURS} hours")
+    return start, end
+
+
+def _parse_time(text: str) -> datetime:
+    parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _hourly_items(tenant_id, start, end) -> dict:
+    """The tenant's stats items in the window, grouped by metric."""
+    kwargs = {
+        "TableName": STATS_TABLE,
+        "KeyConditionExpression": "tenant_id = :tid AND #p BETWEEN :from AND :to",
+        "ExpressionAttributeNames": {"#p": "period"},
+        "ExpressionAttributeValues": {
+            ":tid": {"S": tenant_id},
+            ":from": {"S": f"{start:%Y-%m-%dT%H}"},
+            ":to": {"S": f"{end:%Y-%m-%dT%H}#~"},
+        },
+    }
+
+    ddb = aws.client("dynamodb")
+    grouped = {}
+    while True:
+        result = ddb.query(**kwargs)
+        for raw in result.get("Items", []):
+            item = dynamo.item(raw)
+            grouped.setdefault(item["period"].split("#", 1)[1], []).append(item)
+        if "LastEvaluatedKey" not in result:
+            return grouped
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
@@ -0,0 +1,13 @@
+"""
+Shared runtime core for the Lambda functions, deployed as a Lambda layer.
+
+  common.aws     — lazily built, tuned AWS clients and DynamoDB tables
+  common.api     — API Gateway responses, request parsing, JSON sanitizing
+  common.dynamo  — low-level DynamoDB attribute maps ↔ plain JSON-ready dicts
+  common.archive — key layout and readers for the cold task archive in S3
+  common.latency — per-tenant hourly latency histograms (record, merge, percentiles)
+  common.tenant_index — shard keys for the write-sharded tenant index on the tasks table
+  common.tracing — per-invocation AWS call metrics (latency, retries, bytes) as EMF
+  common.schedule — schedule-index keys and queue messages for deferred jobs
+  common.search  — term extraction, keys and BM25 scoring for the job search index
+"""
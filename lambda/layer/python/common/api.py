@@ -0,0 +1,64 @@
+"""
+Helpers for API Gateway proxy handlers: responses, request parsing,
+authorizer context and DynamoDB → JSON conversion.
+"""
+
+import json
+import decimal
+
+CORS_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Methods": "GET,POST,DELETE,OPTIONS",
+}
+
+
+def response(status_code: int, body: dict) -> dict:
+    """Build an API Gateway proxy response with CORS headers."""
+    return {
+        "statusCode": status_code,
+        "headers": CORS_HEADERS,
+        "body": json.dumps(body),
+    }
+
+
+def auth_context(event: dict) -> dict:
+    """Return the RBAC authorizer context (cognito_id, email, tenant_id, role)."""
+    return (event.get("requestContext") or {}).get("authorizer") or {}
+
+
+def caller_tenant_id(event: dict) -> str:
+    """Return the caller's tenant ID from the authorizer context, or ''."""
+    return auth_context(event).get("tenant_id", "")
+
+
+def path_param(event: dict, name: str):
+    """Return a path parameter, or None."""
+    return (event.get("pathParameters") or {}).get(name)
+
+
+def query_params(event: dict) -> dict:
+    """Return the query string parameters (never None)."""
+    return event.get("queryStringParameters") or {}
+
+
+def parse_body(event: dict):
+    """Parse the JSON request body. Returns None if it is not valid JSON."""
+    try:
+        return json.loads(event.get("body") or "{}")
+    except json.JSONDecodeError:
+        return None
+
+
+def sanitize(value):
+    """Convert DynamoDB Decimal types (at any depth) to int/float for JSON."""
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == int(value) else float(value)
+    if isinstance(value, dict):
+        return {k: sanitize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [sanitize(v) for v in value]
+    if isinstance(value, set):
+        return [sanitize(v) for v in sorted(value)]
+    return value
@@ -0,0 +1,89 @@
+"""
+Layout of the cold task archive bucket, shared by archive_tasks (writer) and
+list_jobs (reader).
+
+    tasks/{tenant_id}/index.json
+        {"days": [{"day": "2026-10-15", "key": "...", "count": 42}, ...]}   newest day first
+    tasks/{tenant_id}/{day}/{run_id}.jsonl.gz
+        one task per line, newest first — one file per tenant per day
+
+Re-archiving a day merges into a new file and repoints the index, so the
+index always lists exactly one file per day.
+
+Day files are tagged DAY_FILE_TAG, and only tagged objects are expired by the
+bucket's retention rule, so index.json never expires. archive_tasks drops
+index entries past the retention period, and readers skip a listed day file
+that has already expired.
+"""
+
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+PREFIX = "tasks"
+
+# Object tag the retention lifecycle rule filters on (terraform/s3.tf)
+DAY_FILE_TAG = ("archive-object", "day-file")
+
+# Day files are immutable (a re-archived day gets a new key), so they can be
+# cached for the life of the container
+_DAY_CACHE_MAX = 32
+_day_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def index_key(tenant_id: str) -> str:
+    return f"{PREFIX}/{tenant_id}/index.json"
+
+
+def day_key(tenant_id: str, day: str, run_id: str) -> str:
+    return f"{PREFIX}/{tenant_id}/{day}/{run_id}.jsonl.gz"
+
+
+def read_index(s3, bucket: str, tenant_id: str) -> dict:
+    """Return the tenant's archive index ({"days": []} if nothing is archived yet)."""
+    try:
+        obj = s3.get_object(Bucket=bucket, Key=index_key(tenant_id))
+    except s3.exceptions.NoSuchKey:
+        return {"days": []}
+    return json.loads(obj["Body"].read())
+
+
+def day_file_tagging() -> str:
+    """put_object `Tagging` value for a day file."""
+    return "=".join(DAY_FILE_TAG)
+
+
+def read_day(s3, bucket: str, key: str):
+    """Return the tasks in one day file, or None if it has expired."""
+    with _lock:
+        if key in _day_cache:
+            _day_cache.move_to_end(key)
+            return _day_cache[key]
+
+    try:
+        obj = s3.get_object(Bucket=bucket, Key=key)
+    except s3.exceptions.NoSuchKey:
+        return None
+    body = gzip.decompress(obj["Body"].read())
+    tasks = [json.loads(line) for line in body.splitlines() if line]
+
+    with _lock:
+        _day_cache[key] = tasks
+        while len(_day_cache) > _DAY_CACHE_MAX:
+            _day_cache.popitem(last=False)
+    return tasks
+
+
+def encode_index(days: list) -> bytes:
+    return json.dumps({"days": days, "updated_at": datetime.now(timezone.utc).isoformat()}).encode()
+
+
+def encode_day(tasks: list) -> bytes:
+    """Serialize tasks for a day file, newest first."""
+    ordered = sorted(tasks, key=lambda t: t.get("created_at", ""), reverse=True)
+    return gzip.compress(
+        "".join(json.dumps(t, separators=(",", ":")) + "\n" for t in ordered).encode()
+    )
@@ -0,0 +1,101 @@
+"""
+Cached AWS clients shared by every handler in a container.
+
+All clients come from one botocore session (so service models are loaded
+once) and use a tuned config: short connect/read timeouts, adaptive retries,
+TCP keep-alive and a larger connection pool. Each handler calls `preload`
+at module scope for the clients it knows it needs, so they are built during
+INIT, which runs with boosted CPU before the first billed request; later
+`client` / `table` calls return the cached objects.
+
+The session carries the common.tracing hooks, so every client and Table
+built here reports its calls.
+"""
+
+import os
+import threading
+
+import botocore.session
+from botocore.config import Config
+
+from common import tracing
+
+DEFAULT_CONFIG = Config(
+    connect_timeout=float(os.environ.get("AWS_CONNECT_TIMEOUT", "2")),
+    read_timeout=float(os.environ.get("AWS_READ_TIMEOUT", "10")),
+    retries={
+        "mode": "adaptive",
+        "total_max_attempts": int(os.environ.get("AWS_MAX_ATTEMPTS", "4")),
+    },
+    max_pool_connections=int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "32")),
+    tcp_keepalive=True,
+)
+
+_lock = threading.RLock()
+_session = None
+_dynamodb = None
+_clients = {}
+_tables = {}
+
+
+def session() -> botocore.session.Session:
+    """Return the process-wide botocore session."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = botocore.session.get_session()
+                tracing.register(_session)
+    return _session
+
+
+def client(service: str, endpoint_url: str = None, **config_overrides):
+    """Return a cached low-level client for `service`.
+
+    Keyword arguments are botocore Config options merged over DEFAULT_CONFIG
+    (e.g. `read_timeout=30`); each distinct endpoint / set of overrides gets
+    its own client.
+    """
+    key = (service, endpoint_url, repr(sorted(config_overrides.items())))
+    cached = _clients.get(key)
+    if cached is not None:
+        return cached
+    with _lock:
+        if key not in _clients:
+            config = DEFAULT_CONFIG
+            if config_overrides:
+                config = config.merge(Config(**config_overrides))
+            _clients[key] = session().create_client(
+                service, endpoint_url=endpoint_url, config=config
+            )
+        return _clients[key]
+
+
+def table(name: str):
+    """Return a cached DynamoDB Table resource."""
+    global _dynamodb
+    cached = _tables.get(name)
+    if cached is not None:
+        return cached
+    with _lock:
+        if name not in _tables:
+            if _dynamodb is None:
+                import boto3
+
+                boto3_session = boto3.session.Session(botocore_session=session())
+                _dynamodb = boto3_session.resource("dynamodb", config=DEFAULT_CONFIG)
+            _tables[name] = _dynamodb.Table(name)
+        return _tables[name]
+
+
+def preload(*services: str, tables: tuple = ()):
+    """Build default-config clients for `services` and Table resources for `tables` now.
+
+    Call it at module scope. Clients with config overrides or a custom
+    endpoint are preloaded with `client(...)` itself, using the same arguments
+    as the call sites so they share the cache entry.
+    """
+    for service in services:
+        client(service)
+    for name in tables:
+        table(name)
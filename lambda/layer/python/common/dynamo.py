@@ -0,0 +1,68 @@
+"""
+Single-pass conversion between DynamoDB low-level attribute maps and
+JSON-ready Python values.
+
+The boto3 Table API turns every number into a `decimal.Decimal`, which the
+handlers then walk again to turn back into int/float. Reading through the
+low-level client and calling `item()` produces the same output as
+`api.sanitize(table_item)` in one walk: integral numbers become int, others
+float, string/number sets become sorted lists.
+"""
+
+from decimal import Decimal
+
+
+def _number(text: str):
+    """Convert a DynamoDB N string the way sanitize(Decimal(text)) would."""
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    value = Decimal(text)
+    return int(value) if value == int(value) else float(value)
+
+
+def value(attr: dict):
+    """Convert one typed attribute value ({"S": ...}, {"N": ...}, ...)."""
+    (tag, raw), = attr.items()
+    if tag == "S":
+        return raw
+    if tag == "N":
+        return _number(raw)
+    if tag == "M":
+        return {k: value(v) for k, v in raw.items()}
+    if tag == "L":
+        return [value(v) for v in raw]
+    if tag == "BOOL":
+        return raw
+    if tag == "NULL":
+        return None
+    if tag == "SS":
+        return sorted(raw)
+    if tag == "NS":
+        return sorted(_number(n) for n in raw)
+    if tag == "B":
+        return raw
+    if tag == "BS":
+        return sorted(raw)
+    raise TypeError(f"Unknown DynamoDB attribute type: {tag}")
+
+
+def item(attrs: dict, omit=()) -> dict:
+    """Convert a low-level item (or key) to a plain dict, skipping `omit` attributes."""
+    if attrs is None:
+        return None
+    return {k: value(v) for k, v in attrs.items() if k not in omit}
+
+
+def key(plain: dict) -> dict:
+    """Convert a plain key dict (str/int/float values) to a low-level key."""
+    typed = {}
+    for name, val in plain.items():
+        if isinstance(val, str):
+            typed[name] = {"S": val}
+        elif isinstance(val, (int, float, Decimal)) and not isinstance(val, bool):
+            typed[name] = {"N": str(val)}
+        else:
+            raise TypeError(f"Unsupported key attribute type for {name}: {type(val).__name__}")
+    return typed
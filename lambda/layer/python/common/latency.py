@@ -0,0 +1,122 @@
+"""
+Per-tenant, per-hour job latency histograms in the stats table.
+
+Each (tenant, hour, metric) is one item keyed `tenant_id` + `period`
+("2026-10-19T05#run"). Durations land in fixed log-scale buckets — two per
+doubling from the metric's base, so every bucket is ~41% wider than the one
+before — and are counted with atomic ADDs, so any set of items can be merged
+by summing their counters:
+
+    b00        durations under base ms
+    bNN        [base·2^((NN-1)/2), base·2^(NN/2)) ms
+    n, sum_ms  sample count and total, for the mean
+
+Job phases start from BASE_MS (100 ms). Page timings are mostly well under
+that, so page_* metrics start from PAGE_BASE_MS (1 ms) and their open-ended
+last bucket begins at ~2 hours. See `base_ms`.
+
+The agent container keeps a copy of the bucket layout in agent/latency.py;
+the two must stay in step.
+"""
+
+import math
+import time
+from datetime import datetime, timezone
+
+METRICS = (
+    "queue_wait", "provisioning", "run", "total",
+    # Target-site timings from the agent's Performance API reads, one sample per page
+    "page_ttfb", "page_dom_ready", "page_fcp",
+)
+
+BASE_MS = 100
+PAGE_BASE_MS = 1
+BUCKETS_PER_DOUBLING = 2
+NUM_BUCKETS = 48  # the last bucket is open-ended, from ~8 days up (~2 hours for page_*)
+
+RETENTION_DAYS = 90
+
+
+def base_ms(metric: str) -> int:
+    """Upper edge of bucket 0 for a metric."""
+    return PAGE_BASE_MS if metric.startswith("page_") else BASE_MS
+
+
+def bucket_index(ms: float, base: int = BASE_MS) -> int:
+    if ms < base:
+        return 0
+    return min(NUM_BUCKETS - 1, 1 + int(math.log2(ms / base) * BUCKETS_PER_DOUBLING))
+
+
+def bucket_bounds(index: int, base: int = BASE_MS):
+    """(lower, upper) of a bucket in ms."""
+    if index == 0:
+        return 0.0, float(base)
+    return (
+        base * 2 ** ((index - 1) / BUCKETS_PER_DOUBLING),
+        base * 2 ** (index / BUCKETS_PER_DOUBLING),
+    )
+
+
+def bucket_attr(index: int) -> str:
+    return f"b{index:02d}"
+
+
+def period(metric: str, at: datetime = None) -> str:
+    at = at or datetime.now(timezone.utc)
+    return f"{at:%Y-%m-%dT%H}#{metric}"
+
+
+def elapsed_ms(since: str, until: datetime = None) -> float:
+    """Milliseconds from an ISO-8601 timestamp to `until` (default now)."""
+    until = until or datetime.now(timezone.utc)
+    return (until - datetime.fromisoformat(since)).total_seconds() * 1000
+
+
+def record(ddb, table_name: str, tenant_id: str, metric: str, ms: float):
+    """Add one sample to the tenant's histogram for the current hour."""
+    ms = max(ms, 0)
+    ddb.update_item(
+        TableName=table_name,
+        Key={"tenant_id": {"S": tenant_id}, "period": {"S": period(metric)}},
+        UpdateExpression="ADD #b :one, n :one, sum_ms :ms SET expires_at = if_not_exists(expires_at, :exp)",
+        ExpressionAttributeNames={"#b": bucket_attr(bucket_index(ms, base_ms(metric)))},
+        ExpressionAttributeValues={
+            ":one": {"N": "1"},
+            ":ms": {"N": str(int(ms))},
+            ":exp": {"N": str(int(time.time()) + RETENTION_DAYS * 86400)},
+        },
+    )
+
+
+def merge(items) -> dict:
+    """Sum plain stats items (any hours, one metric) into {"buckets", "n", "sum_ms"}."""
+    buckets = [0] * NUM_BUCKETS
+    n = total = 0
+    for item in items:
+        for index in range(NUM_BUCKETS):
+            buckets[index] += item.get(bucket_attr(index), 0)
+        n += item.get("n", 0)
+        total += item.get("sum_ms", 0)
+    return {"buckets": buckets, "n": n, "sum_ms": total}
+
+
+def percentile(buckets: list, q: float, base: int = BASE_MS) -> float:
+    """Estimate the q-th percentile (0-100) in ms, interpolating within the bucket.
+
+    `base` must be the one the samples were recorded with (`base_ms(metric)`).
+    """
+    n = sum(buckets)
+    if not n:
+        return None
+    rank = q / 100 * n
+    seen = 0
+    for index, count in enumerate(buckets):
+        if count and seen + count >= rank:
+            lower, upper = bucket_bounds(index, base)
+            fraction = (rank - seen) / count
+            if index == 0:
+                return lower + (upper - lower) * fraction
+            return lower * (upper / lower) ** fraction
+        seen += count
+    return bucket_bounds(NUM_BUCKETS - 1, base)[1]
@@ -0,0 +1,62 @@
+"""
+Deferred jobs: the schedule index on the tasks table.
+
+A job whose `run_at` is within MAX_DELAY_SECONDS is queued straight away with
+an SQS DelaySeconds. A later `run_at`, or "priority": "low" (run when idle),
+makes it SCHEDULED instead. While scheduled it carries `schedule_key`, which
+puts it in the sparse `schedule-index` GSI with `run_at` as the range key:
+
+    at#{n}    jobs waiting for their run_at
+    low#{n}   low-priority jobs, released only into spare capacity
+
+n is a hash of the task ID modulo SHARDS, so a bulk submission doesn't land
+on one index partition. The release_jobs Lambda queries each key for
+run_at <= now and queues what capacity allows. Releasing a job removes
+`schedule_key`, which takes it out of the index.
+"""
+
+import os
+import zlib
+from datetime import datetime, timezone
+
+INDEX_NAME = "schedule-index"
+SHARDS = int(os.environ.get("SCHEDULE_SHARDS", "4"))
+
+# SQS DelaySeconds limit; longer deferrals go through the schedule index
+MAX_DELAY_SECONDS = 900
+PRIORITIES = ("normal", "low")
+
+
+def schedule_key(priority: str, task_id: str) -> str:
+    prefix = "low" if priority == "low" else "at"
+    return f"{prefix}#{zlib.crc32(task_id.encode()) % SHARDS}"
+
+
+def schedule_keys(priority: str) -> list:
+    """Every shard of one priority class."""
+    prefix = "low" if priority == "low" else "at"
+    return [f"{prefix}#{shard}" for shard in range(SHARDS)]
+
+
+def queue_message(item: dict, created_at: str = None) -> dict:
+    """The job queue message for a task item.
+
+    `created_at` overrides the item's: latency is measured from release, so
+    time spent deferred doesn't count as queue wait.
+    """
+    message = {
+        "task_id": item["task_id"],
+        "query": item["query"],
+        "tenant_id": item["tenant_id"],
+        "job_type": item["job_type"],
+        "created_at": created_at or item["created_at"],
+    }
+    for optional in ("profile", "deadline_seconds"):
+        if item.get(optional):
+            message[optional] = item[optional]
+    return message
+
+
+def timestamp(at: datetime) -> str:
+    """run_at as stored: UTC, whole seconds, so strings sort in time order."""
+    return at.astimezone(timezone.utc).isoformat(timespec="seconds")
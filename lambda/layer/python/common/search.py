@@ -0,0 +1,105 @@
+"""
+Per-tenant inverted index over finished jobs, in the job-search table.
+
+index_jobs adds a job when it reaches a terminal status; list_jobs answers
+GET /jobs?q= from it. Items are keyed `pk` + `sk`:
+
+    {tenant}#t:{term}   ~                        df — jobs containing the term
+    {tenant}#t:{term}   {created_at}#{task_id}   w  — the term's weight in that job
+    {tenant}#j:{task_id} ~                       the job summary search returns
+    {tenant}#stats      ~                        docs — jobs indexed
+
+A job's terms come from its query (or target list) and, when the agent
+extracted any, its result titles and snippets, weighted by FIELD_WEIGHTS.
+Postings sort by created_at under their term, so one descending Query per
+query term reads the term's header and its newest MAX_POSTINGS postings:
+the cost of a search depends on the number of query terms, not on the
+tenant's history. Jobs are ranked with BM25 over those postings.
+"""
+
+import os
+import re
+import math
+
+MAX_POSTINGS = int(os.environ.get("SEARCH_MAX_POSTINGS", "1000"))
+MAX_TERMS_PER_JOB = 128
+MAX_QUERY_TERMS = 8
+MAX_TERM_LENGTH = 40
+
+# "~" sorts after every timestamp, so a descending Query returns it first
+HEADER_SK = "~"
+
+FIELD_WEIGHTS = {"query": 3, "title": 2, "snippet": 1}
+
+# What a search result carries about each job
+SUMMARY_FIELDS = (
+    "task_id", "query", "job_type", "status", "created_at", "completed_at",
+    "results_count", "targets_total",
+)
+
+# BM25 term-frequency saturation
+K1 = 1.2
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or that the this to was what when where which who why with"
+    .split()
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercased alphanumeric words, without stopwords and single characters."""
+    return [
+        token[:MAX_TERM_LENGTH] for token in _TOKEN.findall((text or "").lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def document_terms(job: dict) -> dict:
+    """{term: weight} for a job, keeping its MAX_TERMS_PER_JOB heaviest terms."""
+    fields = [("query", job.get("query"))]
+    fields += [("query", target) for target in job.get("targets") or []]
+    for result in job.get("results") or []:
+        fields.append(("title", result.get("title")))
+        fields.append(("snippet", result.get("snippet")))
+
+    weights = {}
+    for field, text in fields:
+        for term in tokenize(text):
+            weights[term] = weights.get(term, 0) + FIELD_WEIGHTS[field]
+    heaviest = sorted(weights.items(), key=lambda entry: (-entry[1], entry[0]))[:MAX_TERMS_PER_JOB]
+    return dict(heaviest)
+
+
+def query_terms(q: str) -> list:
+    """Distinct terms of a search string, in order, at most MAX_QUERY_TERMS."""
+    return list(dict.fromkeys(tokenize(q)))[:MAX_QUERY_TERMS]
+
+
+def term_key(tenant_id: str, term: str) -> str:
+    return f"{tenant_id}#t:{term}"
+
+
+def job_key(tenant_id: str, task_id: str) -> str:
+    return f"{tenant_id}#j:{task_id}"
+
+
+def stats_key(tenant_id: str) -> str:
+    return f"{tenant_id}#stats"
+
+
+def posting_sk(created_at: str, task_id: str) -> str:
+    return f"{created_at}#{task_id}"
+
+
+def parse_posting_sk(sk: str) -> tuple:
+    """(created_at, task_id) of a posting."""
+    created_at, task_id = sk.rsplit("#", 1)
+    return created_at, task_id
+
+
+def score(weight: float, df: int, docs: int) -> float:
+    """BM25 contribution of one term to one job (no length normalization)."""
+    idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+    return idf * weight * (K1 + 1) / (weight + K1)
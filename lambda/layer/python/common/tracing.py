@@ -0,0 +1,163 @@
+"""
+Per-invocation AWS call metrics, printed as CloudWatch Embedded Metric Format.
+
+Hooks on the shared botocore session (see common.aws) time every API call
+made through any client or Table. Each call records its service, operation,
+latency, retries, request/response bytes and whether it failed. A handler
+wrapped in @traced prints one EMF document per (service, operation) when a
+sampled invocation ends. CloudWatch turns those documents into metrics in
+TRACE_NAMESPACE, dimensioned by function, service and operation. Latency is
+sent as raw values, so its p99 can be broken down by operation.
+
+TRACE_SAMPLE_RATE (0-1, default 0.1) is the share of invocations reported.
+Calls in the others only cost a flag check.
+"""
+
+import os
+import json
+import time
+import random
+import functools
+import threading
+
+NAMESPACE = os.environ.get("TRACE_NAMESPACE", "InfraDemo/AwsCalls")
+SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0.1"))
+FUNCTION_NAME = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+
+# EMF accepts at most 100 values per metric in one document
+EMF_MAX_VALUES = 100
+
+_lock = threading.Lock()
+_calls = []
+_sampled = False
+
+METRICS = (
+    ("Latency", "Milliseconds"),
+    ("Calls", "Count"),
+    ("Retries", "Count"),
+    ("Errors", "Count"),
+    ("BytesSent", "Bytes"),
+    ("BytesReceived", "Bytes"),
+)
+
+
+def register(events):
+    """Attach the call hooks to a botocore event emitter (the session's)."""
+    events.register("before-call", _before_call)
+    events.register("after-call", _after_call)
+    events.register("after-call-error", _after_call_error)
+
+
+def _body_size(body) -> int:
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    return 0  # file-like and streaming bodies aren't measured
+
+
+def _before_call(model, params, context, **kwargs):
+    if not _sampled:
+        return
+    context["trace"] = {
+        "service": model.service_model.service_id.hyphenize(),
+        "operation": model.name,
+        "started": time.perf_counter(),
+        "sent": _body_size(params.get("body")),
+    }
+
+
+def _after_call(http_response, parsed, context, **kwargs):
+    trace = context.pop("trace", None)
+    if trace is None:
+        return
+    _record(
+        trace,
+        retries=parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0),
+        received=int(http_response.headers.get("content-length") or 0),
+        error=http_response.status_code >= 300,
+    )
+
+
+def _after_call_error(context, **kwargs):
+    # Connection errors and timeouts that outlived botocore's own retries
+    trace = context.pop("trace", None)
+    if trace is not None:
+        _record(trace, retries=0, received=0, error=True)
+
+
+def _record(trace, retries, received, error):
+    call = {
+        "service": trace["service"],
+        "operation": trace["operation"],
+        "ms": (time.perf_counter() - trace["started"]) * 1000,
+        "retries": retries,
+        "sent": trace["sent"],
+        "received": received,
+        "error": error,
+    }
+    with _lock:
+        _calls.append(call)
+
+
+def start():
+    """Begin an invocation: decide whether it is sampled and forget earlier calls."""
+    global _sampled
+    with _lock:
+        _calls.clear()
+    _sampled = random.random() < SAMPLE_RATE
+
+
+def flush(request_id: str = ""):
+    """Print the sampled invocation's per-operation summaries as EMF documents."""
+    global _sampled
+    if not _sampled:
+        return
+    _sampled = False
+    with _lock:
+        calls, _calls[:] = list(_calls), []
+
+    groups = {}
+    for call in calls:
+        groups.setdefault((call["service"], call["operation"]), []).append(call)
+
+    timestamp = int(time.time() * 1000)
+    for (service, operation), group in groups.items():
+        latencies = [round(call["ms"], 2) for call in group]
+        for offset in range(0, len(latencies), EMF_MAX_VALUES):
+            # Counters go in the first document only; the rest carry more latency values
+            metrics = METRICS if offset == 0 else METRICS[:1]
+            document = {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": NAMESPACE,
+                        "Dimensions": [["FunctionName", "Service", "Operation"]],
+                        "Metrics": [{"Name": name, "Unit": unit} for name, unit in metrics],
+                    }],
+                },
+                "FunctionName": FUNCTION_NAME,
+                "Service": service,
+                "Operation": operation,
+                "RequestId": request_id,
+                "Latency": latencies[offset:offset + EMF_MAX_VALUES],
+            }
+            if offset == 0:
+                document.update({
+                    "Calls": len(group),
+                    "Retries": sum(call["retries"] for call in group),
+                    "Errors": sum(1 for call in group if call["error"]),
+                    "BytesSent": sum(call["sent"] for call in group),
+                    "BytesReceived": sum(call["received"] for call in group),
+                })
+            print(json.dumps(document))
+
+
+def traced(handler):
+    """Wrap a Lambda handler so its sampled invocations report their AWS calls."""
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        start()
+        try:
+            return handler(event, context)
+        finally:
+            flush(getattr(context, "aws_request_id", ""))
+    return wrapper
@@ -1,88 +1,316 @@
 """
 Lambda: List Jobs
 Returns paginated list of jobs for the caller's tenant.
+
+Recent and in-flight jobs come from the tasks table; once its pages run out,
+paging continues through the tenant's archive (see archive_tasks), newest day
+first.
+
+The table's tenant index is write-sharded (see common.tenant_index), so a page
+queries every shard in parallel and k-way merges them on created_at. Table
+tokens are {"shards": [...]}: per shard, the index key to resume after, {} to
+start from the top, or null once the shard is exhausted. Archive tokens are
+{"archive": {"day": ..., "offset": ...}}.
+
+Until the tenant_shard backfill has run (see backfill_tenant_shard),
+LEGACY_TENANT_INDEX keeps reads on the unsharded `tenant-index`, whose
+tokens are plain index keys.
+
+GET /jobs?q=... searches the tenant's finished jobs instead (see
+common.search): one Query per search term, in parallel, ranked so jobs
+matching every term come first, then by BM25 score, then newest first.
+Search tokens are {"search": {"offset": ...}} into that ranking.
 """
 
 import json
 import os
+import time
+import heapq
+import base64
 import logging
-import decimal
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
+from common import aws, dynamo, archive, search, tenant_index, tracing
+from common.api import response as _response, caller_tenant_id, query_params
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
-
 TABLE_NAME = os.environ["DYNAMODB_TABLE"]
+ARCHIVE_BUCKET = os.environ.get("ARCHIVE_BUCKET")
+SEARCH_TABLE = os.environ["SEARCH_TABLE"]
+LEGACY_TENANT_INDEX = os.environ.get("LEGACY_TENANT_INDEX", "false") == "true"
+LEGACY_INDEX_NAME = "tenant-index"
+BATCH_GET_ATTEMPTS = 5
+
+# Bulky attributes that only the single-job view needs
+LIST_OMIT = frozenset({"targets", "results", "artifacts", "tenant_shard", "page_metrics"})
 
-table = dynamodb.Table(TABLE_NAME)
+aws.preload("dynamodb", "s3")
 
 
+@tracing.traced
 def handler(event, context):
     """GET /jobs — list all jobs for the caller's tenant."""
-    auth_context = event.get("requestContext", {}).get("authorizer", {})
-    tenant_id = auth_context.get("tenant_id", "")
+    tenant_id = caller_tenant_id(event)
 
     if not tenant_id:
         return _response(403, {"error": "No tenant associated with this user"})
 
-    query_params = event.get("queryStringParameters") or {}
-    limit = min(int(query_params.get("limit", "20")), 100)
-    next_token = query_params.get("next_token")
+    params = query_params(event)
+    limit = min(int(params.get("limit", "20")), 100)
+    next_token = params.get("next_token")
+    try:
+        token = json.loads(base64.b64decode(next_token).decode()) if next_token else None
+    except ValueError:
+        return _response(400, {"error": "Invalid next_token"})
+    if token is not None and not isinstance(token, dict):
+        return _response(400, {"error": "Invalid next_token"})
+
+    if params.get("q") is not None:
+        return _search(tenant_id, params["q"], limit, int((token or {}).get("search", {}).get("offset", 0)))
+
+    if token and "archive" in token:
+        position = token["archive"]
+        items, archive_cursor = _archive_page(tenant_id, limit, position.get("day"), int(position.get("offset", 0)))
+        cursor = {"archive": archive_cursor} if archive_cursor else None
+    else:
+        if LEGACY_TENANT_INDEX:
+            items, cursor = _legacy_table_page(tenant_id, limit, token if token and "shards" not in token else None)
+        else:
+            # A plain index key was issued from the old tenant-index; it can't be resumed here
+            if token and "shards" not in token:
+                return _response(400, {"error": "Invalid next_token"})
+            items, positions = _table_page(tenant_id, limit, (token or {}).get("shards"))
+            cursor = {"shards": positions} if positions else None
+        if cursor is None and ARCHIVE_BUCKET:
+            more, archive_cursor = _archive_page(tenant_id, limit - len(items))
+            items.extend(more)
+            if archive_cursor:
+                cursor = {"archive": archive_cursor}
+
+    response_body = {
+        "tenant_id": tenant_id,
+        "jobs": items,
+        "count": len(items),
+    }
+
+    if cursor:
+        response_body["next_token"] = base64.b64encode(json.dumps(cursor).encode()).decode()
+
+    return _response(200, response_body)
+
+
+def _table_page(tenant_id, limit, positions=None):
+    """One page merged across the tenant's index shards, newest first.
+
+    Returns (jobs, next shard positions), or (jobs, None) once every shard is exhausted.
+    """
+    shards = tenant_index.shard_keys(tenant_id)
+    positions = list(positions or [])
+    positions += [{}] * (len(shards) - len(positions))
+
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        pages = list(pool.map(lambda args: _shard_page(*args, limit), zip(shards, positions)))
+
+    streams = [[(item["created_at"], shard, index) for index, item in enumerate(items)]
+               for shard, (items, _) in enumerate(pages)]
+    taken = list(heapq.merge(*streams, key=lambda entry: entry[0], reverse=True))[:limit]
+
+    consumed = [0] * len(shards)
+    for _, shard, index in taken:
+        consumed[shard] = index + 1
+
+    next_positions = []
+    for shard, (items, last_key) in enumerate(pages):
+        if consumed[shard] < len(items):
+            # Part of this shard's page is left over: resume right after what was used
+            next_positions.append(
+                _index_key(shards[shard], items[consumed[shard] - 1]) if consumed[shard] else positions[shard]
+            )
+        else:
+            next_positions.append(last_key)
+
+    jobs = [pages[shard][0][index] for _, shard, index in taken]
+    return jobs, next_positions if any(p is not None for p in next_positions) else None
+
+
+def _shard_page(shard, start_key, limit):
+    """Up to `limit` of one shard's jobs after `start_key`; returns (jobs, next key or None)."""
+    if start_key is None:
+        return [], None  # exhausted on an earlier page
 
     kwargs = {
-        "IndexName": "tenant-index",
+        "TableName": TABLE_NAME,
+        "IndexName": tenant_index.INDEX_NAME,
+        "KeyConditionExpression": "tenant_shard = :shard",
+        "ExpressionAttributeValues": {":shard": {"S": shard}},
+        "ScanIndexForward": False,  # newest first
+        "Limit": limit,
+    }
+
+    if start_key:
+        kwargs["ExclusiveStartKey"] = dynamo.key(start_key)
+
+    result = aws.client("dynamodb").query(**kwargs)
+
+    items = [dynamo.item(item, omit=LIST_OMIT) for item in result.get("Items", [])]
+    return items, dynamo.item(result.get("LastEvaluatedKey"))
+
+
+def _legacy_table_page(tenant_id, limit, start_key=None):
+    """One page from the unsharded tenant-index, newest first; returns (jobs, next key or None)."""
+    kwargs = {
+        "TableName": TABLE_NAME,
+        "IndexName": LEGACY_INDEX_NAME,
         "KeyConditionExpression": "tenant_id = :tid",
-        "ExpressionAttributeValues": {":tid": tenant_id},
+        "ExpressionAttributeValues": {":tid": {"S": tenant_id}},
         "ScanIndexForward": False,  # newest first
         "Limit": limit,
     }
 
-    if next_token:
-        import base64
-        kwargs["ExclusiveStartKey"] = json.loads(
-            base64.b64decode(next_token).decode()
+    if start_key:
+        kwargs["ExclusiveStartKey"] = dynamo.key(start_key)
+
+    result = aws.client("dynamodb").query(**kwargs)
+
+    items = [dynamo.item(item, omit=LIST_OMIT) for item in result.get("Items", [])]
+    return items, dynamo.item(result.get("LastEvaluatedKey"))
+
+
+def _index_key(shard, item):
+    """The index key to resume a shard's query after `item`."""
+    return {"task_id": item["task_id"], "tenant_shard": shard, "created_at": item["created_at"]}
+
+
+def _archive_page(tenant_id, limit, day=None, offset=0):
+    """Up to `limit` archived jobs from (day, offset) on; returns (jobs, archive cursor or None)."""
+    s3 = aws.client("s3")
+    index = archive.read_index(s3, ARCHIVE_BUCKET, tenant_id)
+
+    items = []
+    for entry in index.get("days", []):
+        if day is not None and entry["day"] > day:
+            continue
+        start = offset if entry["day"] == day else 0
+        if start >= entry["count"]:
+            continue
+        if len(items) >= limit:
+            return items, {"day": entry["day"], "offset": start}
+
+        tasks = archive.read_day(s3, ARCHIVE_BUCKET, entry["key"])
+        if tasks is None:
+            # Expired by the retention rule before archive_tasks pruned the index
+            continue
+        room = limit - len(items)
+        items.extend(
+            {k: v for k, v in task.items() if k not in LIST_OMIT}
+            for task in tasks[start:start + room]
         )
+        if start + room < len(tasks):
+            return items, {"day": entry["day"], "offset": start + room}
 
-    result = table.query(**kwargs)
+    return items, None
 
-    items = [_sanitize(item) for item in result.get("Items", [])]
+
+def _search(tenant_id, q, limit, offset=0):
+    """GET /jobs?q= — one page of the tenant's finished jobs ranked against `q`."""
+    terms = search.query_terms(q)
+    if not terms:
+        return _response(400, {"error": "'q' must contain at least one word to search for"})
+
+    with ThreadPoolExecutor(max_workers=len(terms) + 1) as pool:
+        docs = pool.submit(_indexed_jobs, tenant_id)
+        postings = list(pool.map(lambda term: _term_postings(tenant_id, term), terms))
+        docs = docs.result()
+
+    scores, matched, created = {}, {}, {}
+    for df, term_postings in postings:
+        for task_id, created_at, weight in term_postings:
+            scores[task_id] = scores.get(task_id, 0) + search.score(weight, df, max(docs, df))
+            matched[task_id] = matched.get(task_id, 0) + 1
+            created[task_id] = created_at
+
+    ranked = sorted(scores, key=lambda task_id: created[task_id], reverse=True)
+    ranked.sort(key=lambda task_id: (-matched[task_id], -scores[task_id]))
+    page = ranked[offset:offset + limit]
+
+    summaries = _job_summaries(tenant_id, page)
+    jobs = [
+        {**summaries[task_id], "score": round(scores[task_id], 3), "matched_terms": matched[task_id]}
+        for task_id in page if task_id in summaries
+    ]
 
     response_body = {
         "tenant_id": tenant_id,
-        "jobs": items,
-        "count": len(items),
+        "q": q,
+        "terms": terms,
+        "jobs": jobs,
+        "count": len(jobs),
+        "total": len(ranked),
     }
+    if offset + limit < len(ranked):
+        cursor = {"search": {"offset": offset + limit}}
+        response_body["next_token"] = base64.b64encode(json.dumps(cursor).encode()).decode()
+    return _response(200, response_body)
 
-    if "LastEvaluatedKey" in result:
-        import base64
-        response_body["next_token"] = base64.b64encode(
-            json.dumps(result["LastEvaluatedKey"]).encode()
-        ).decode()
 
-    return _response(200, response_body)
+def _term_postings(tenant_id, term):
+    """(df, [(task_id, created_at, weight), ...]) for a term, newest postings first."""
+    kwargs = {
+        "TableName": SEARCH_TABLE,
+        "KeyConditionExpression": "pk = :pk",
+        "ExpressionAttributeValues": {":pk": {"S": search.term_key(tenant_id, term)}},
+        "ScanIndexForward": False,  # header ("~") first, then newest first
+        "Limit": search.MAX_POSTINGS + 1,
+    }
+    ddb = aws.client("dynamodb")
+    df, postings = 0, []
+    while len(postings) < search.MAX_POSTINGS:
+        result = ddb.query(**kwargs)
+        for raw in result.get("Items", []):
+            item = dynamo.item(raw)
+            if item["sk"] == search.HEADER_SK:
+                df = item.get("df", 0)
+            else:
+                created_at, task_id = search.parse_posting_sk(item["sk"])
+                postings.append((task_id, created_at, item["w"]))
+        if "LastEvaluatedKey" not in result:
+            break
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+    return max(df, len(postings)), postings[:search.MAX_POSTINGS]
 
 
-def _sanitize(item: dict) -> dict:
-    sanitized = {}
-    for key, value in item.items():
-        if isinstance(value, decimal.Decimal):
-            sanitized[key] = int(value) if value == int(value) else float(value)
-        else:
-            sanitized[key] = value
-    return sanitized
-
-
-def _response(status_code: int, body: dict) -> dict:
-    return {
-        "statusCode": status_code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type,Authorization",
-            "Access-Control-Allow-Methods": "GET,POST,DELETE,OPTIONS",
-        },
-        "body": json.dumps(body),
+def _indexed_jobs(tenant_id):
+    """How many of the tenant's jobs are in the search index."""
+    result = aws.client("dynamodb").get_item(
+        TableName=SEARCH_TABLE,
+        Key={"pk": {"S": search.stats_key(tenant_id)}, "sk": {"S": search.HEADER_SK}},
+    )
+    return (dynamo.item(result.get("Item")) or {}).get("docs", 0)
+
+
+def _job_summaries(tenant_id, task_ids):
+    """{task_id: summary} from the search index, retrying unprocessed keys."""
+    if not task_ids:
+        return {}
+    request = {
+        "Keys": [
+            {"pk": {"S": search.job_key(tenant_id, task_id)}, "sk": {"S": search.HEADER_SK}}
+            for task_id in task_ids
+        ],
     }
+
+    ddb = aws.client("dynamodb")
+    found = {}
+    for attempt in range(BATCH_GET_ATTEMPTS):
+        result = ddb.batch_get_item(RequestItems={SEARCH_TABLE: request})
+        for raw in result.get("Responses", {}).get(SEARCH_TABLE, []):
+            item = dynamo.item(raw, omit=("pk", "sk"))
+            found[item["task_id"]] = item
+        remaining = result.get("UnprocessedKeys", {}).get(SEARCH_TABLE)
+        if not remaining:
+            break
+        request = remaining
+        time.sleep(min(0.05 * 2 ** attempt, 1))
+    return found
@@ -2,36 +2,47 @@
 Lambda: Manage Users
 ADMIN-only endpoints to add, remove, and list users in a tenant.
 Routes based on HTTP method:
-  POST   /tenants/users            → invite user (creates pending invitation)
+  POST   /tenants/users            → invite user (creates pending invitation),
+                                     or many with {"invites": [{email, role}, ...]}
   DELETE /tenants/users/{cognito_id} → remove user
-  GET    /tenants/users            → list users
+  GET    /tenants/users            → list users (paginated: limit, next_token)
 """
 
-import json
 import os
+import json
+import time
 import uuid
+import base64
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
-import boto3
-from botocore.exceptions import ClientError
+from common import aws, dynamo, tracing
+from common.api import response as _response, auth_context as _auth_context, parse_body, path_param, query_params
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
-
 USERS_TABLE = os.environ["USERS_TABLE"]
 
-users_table = dynamodb.Table(USERS_TABLE)
-
 VALID_ROLES = {"ADMIN", "DOCTOR", "READ_ONLY"}
 
+MAX_BULK_INVITES = 500
+LOOKUP_CONCURRENCY = 16
+BATCH_WRITE_SIZE = 25  # DynamoDB BatchWriteItem limit
+BATCH_WRITE_ATTEMPTS = 5
+
+# Attributes returned by GET /tenants/users
+LIST_PROJECTION = ("cognito_id", "email", "role", "status", "created_at")
 
+aws.preload("dynamodb", tables=(USERS_TABLE,))
+
+
+@tracing.traced
 def handler(event, context):
     """Route to the appropriate handler based on HTTP method."""
     http_method = event.get("httpMethod", "")
-    auth_context = event.get("requestContext", {}).get("authorizer", {})
+    auth_context = _auth_context(event)
     caller_role = auth_context.get("role", "")
     caller_tenant_id = auth_context.get("tenant_id", "")
 
@@ -42,11 +53,14 @@ def handler(event, context):
         return _response(403, {"error": "No tenant associated with this user"})
 
     if http_method == "POST":
+        body = parse_body(event)
+        if isinstance(body, dict) and "invites" in body:
+            return _bulk_invite(event, body["invites"], caller_tenant_id)
         return _add_user(event, caller_tenant_id)
     elif http_method == "DELETE":
         return _remove_user(event, caller_tenant_id)
     elif http_method == "GET":
-        return _list_users(caller_tenant_id)
+        return _list_users(event, caller_tenant_id)
     else:
         return _response(405, {"error": f"Method {http_method} not allowed"})
 
@@ -59,9 +73,8 @@ def _add_user(event, tenant_id):
     the register_tenant Lambda will find this invitation and assign them
     to this tenant instead of creating a new one.
     """
-    try:
-        body = json.loads(event.get("body") or "{}")
-    except json.JSONDecodeError:
+    body = parse_body(event)
+    if body is None:
         return _response(400, {"error": "Invalid JSON body"})
 
     email = body.get("email")
@@ -73,6 +86,8 @@ def _add_user(event, tenant_id):
     if role not in VALID_ROLES:
         return _response(400, {"error": f"Invalid role. Must be one of: {', '.join(VALID_ROLES)}"})
 
+    users_table = aws.table(USERS_TABLE)
+
     # Check if this email already has a record (pending or active)
     existing_records = users_table.query(
         IndexName="email-index",
@@ -97,7 +112,7 @@ def _add_user(event, tenant_id):
         "role": role,
         "status": "PENDING",
         "created_at": now,
-        "invited_by": event.get("requestContext", {}).get("authorizer", {}).get("cognito_id", ""),
+        "invited_by": _auth_context(event).get("cognito_id", ""),
     })
 
     logger.info("Created invitation for %s to tenant %s as %s", email, tenant_id, role)
@@ -113,12 +128,13 @@ def _add_user(event, tenant_id):
 
 def _remove_user(event, tenant_id):
     """Remove a user from the tenant."""
-    path_params = event.get("pathParameters") or {}
-    target_cognito_id = path_params.get("cognito_id")
+    target_cognito_id = path_param(event, "cognito_id")
 
     if not target_cognito_id:
         return _response(400, {"error": "cognito_id path parameter is required"})
 
+    users_table = aws.table(USERS_TABLE)
+
     # Check the target user exists and belongs to this tenant
     result = users_table.get_item(Key={"cognito_id": target_cognito_id})
     target_user = result.get("Item")
@@ -130,7 +146,7 @@ def _remove_user(event, tenant_id):
         return _response(403, {"error": "User does not belong to your tenant"})
 
     # Prevent removing yourself
-    caller_id = event.get("requestContext", {}).get("authorizer", {}).get("cognito_id", "")
+    caller_id = _auth_context(event).get("cognito_id", "")
     if target_cognito_id == caller_id:
         return _response(400, {"error": "You cannot remove yourself from the tenant"})
 
@@ -144,39 +160,150 @@ def _remove_user(event, tenant_id):
     })
 
 
-def _list_users(tenant_id):
-    """List all users in the tenant (including pending invitations)."""
-    result = users_table.query(
-        IndexName="tenant-index",
-        KeyConditionExpression="tenant_id = :tid",
-        ExpressionAttributeValues={":tid": tenant_id},
+def _bulk_invite(event, invites, tenant_id):
+    """Invite many users in one call and report the outcome per email.
+
+    Conflict lookups on email-index run concurrently and the invitations are
+    written with BatchWriteItem, so N invites cost N parallel queries plus
+    N/25 parallel writes instead of 2N sequential calls.
+    """
+    if not isinstance(invites, list) or not invites:
+        return _response(400, {"error": "'invites' must be a non-empty list"})
+    if len(invites) > MAX_BULK_INVITES:
+        return _response(400, {"error": f"At most {MAX_BULK_INVITES} invites per request"})
+
+    results = []
+    pending = {}  # email → result entry still to be looked up
+    for invite in invites:
+        email = invite.get("email") if isinstance(invite, dict) else None
+        role = invite.get("role", "READ_ONLY") if isinstance(invite, dict) else None
+        entry = {"email": email, "role": role}
+        results.append(entry)
+        if not email or not isinstance(email, str):
+            entry.update(status="INVALID", error="'email' must be a non-empty string")
+        elif not isinstance(role, str) or role not in VALID_ROLES:
+            entry.update(status="INVALID", error=f"Invalid role. Must be one of: {', '.join(VALID_ROLES)}")
+        elif email in pending:
+            entry.update(status="DUPLICATE", error="Email appears more than once in this request")
+        else:
+            pending[email] = entry
+
+    ddb = aws.client("dynamodb")
+    emails = list(pending)
+    if emails:
+        with ThreadPoolExecutor(max_workers=min(LOOKUP_CONCURRENCY, len(emails))) as pool:
+            owners = list(pool.map(lambda email: _email_tenant(ddb, email), emails))
+        for email, owner in zip(emails, owners):
+            if owner == tenant_id:
+                pending.pop(email).update(status="CONFLICT", error="User is already a member of (or invited to) this tenant")
+            elif owner:
+                pending.pop(email).update(status="CONFLICT", error="User already belongs to another tenant")
+
+    now = datetime.now(timezone.utc).isoformat()
+    invited_by = _auth_context(event).get("cognito_id", "")
+    requests = {}
+    for email, entry in pending.items():
+        requests[email] = {"PutRequest": {"Item": {
+            "cognito_id": {"S": f"invite_{uuid.uuid4()}"},
+            "email": {"S": email},
+            "tenant_id": {"S": tenant_id},
+            "role": {"S": entry["role"]},
+            "status": {"S": "PENDING"},
+            "created_at": {"S": now},
+            "invited_by": {"S": invited_by},
+        }}}
+
+    batches = [list(requests.items())[i:i + BATCH_WRITE_SIZE] for i in range(0, len(requests), BATCH_WRITE_SIZE)]
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(LOOKUP_CONCURRENCY, len(batches))) as pool:
+            failures = list(pool.map(lambda batch: _batch_write(ddb, [request for _, request in batch]), batches))
+    for batch, failed in zip(batches, failures if batches else []):
+        for email, request in batch:
+            if id(request) in failed:
+                pending[email].update(status="FAILED", error="Could not write invitation, retry later")
+            else:
+                pending[email]["status"] = "PENDING"
+
+    counts = {}
+    for entry in results:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+
+    logger.info("Bulk invite for tenant %s: %s", tenant_id, counts)
+
+    return _response(200, {
+        "tenant_id": tenant_id,
+        "results": results,
+        "counts": counts,
+    })
+
+
+def _email_tenant(ddb, email):
+    """Return the tenant an email already has a record in, or None."""
+    result = ddb.query(
+        TableName=USERS_TABLE,
+        IndexName="email-index",
+        KeyConditionExpression="email = :email",
+        ExpressionAttributeValues={":email": {"S": email}},
+        ProjectionExpression="tenant_id",
+        Limit=1,
     )
+    items = result.get("Items", [])
+    return items[0].get("tenant_id", {}).get("S", "") if items else None
+
+
+def _batch_write(ddb, requests):
+    """Write up to 25 put requests, retrying unprocessed ones with backoff.
+
+    Returns the ids of requests that were still unprocessed after the last attempt.
+    """
+    remaining = requests
+    for attempt in range(BATCH_WRITE_ATTEMPTS):
+        result = ddb.batch_write_item(RequestItems={USERS_TABLE: remaining})
+        unprocessed = result.get("UnprocessedItems", {}).get(USERS_TABLE, [])
+        if not unprocessed:
+            return set()
+        # Unprocessed entries come back as equal dicts; map them to our originals
+        remaining = [request for request in remaining if request in unprocessed]
+        time.sleep(min(0.05 * 2 ** attempt, 1))
+    return {id(request) for request in remaining}
+
+
+def _list_users(event, tenant_id):
+    """List users in the tenant (including pending invitations), one page at a time."""
+    params = query_params(event)
+    limit = min(int(params.get("limit", "100")), 500)
+    next_token = params.get("next_token")
+
+    kwargs = {
+        "TableName": USERS_TABLE,
+        "IndexName": "tenant-index",
+        "KeyConditionExpression": "tenant_id = :tid",
+        "ExpressionAttributeValues": {":tid": {"S": tenant_id}},
+        "ProjectionExpression": ", ".join(f"#{name}" for name in LIST_PROJECTION),
+        "ExpressionAttributeNames": {f"#{name}": name for name in LIST_PROJECTION},
+        "Limit": limit,
+    }
+    if next_token:
+        kwargs["ExclusiveStartKey"] = dynamo.key(json.loads(
+            base64.b64decode(next_token).decode()
+        ))
+
+    result = aws.client("dynamodb").query(**kwargs)
 
     users = []
     for item in result.get("Items", []):
-        users.append({
-            "cognito_id": item.get("cognito_id"),
-            "email": item.get("email"),
-            "role": item.get("role"),
-            "status": item.get("status", "ACTIVE"),
-            "created_at": item.get("created_at"),
-        })
+        user = dynamo.item(item)
+        user.setdefault("status", "ACTIVE")
+        users.append({name: user.get(name) for name in LIST_PROJECTION})
 
-    return _response(200, {
+    response_body = {
         "tenant_id": tenant_id,
         "users": users,
         "count": len(users),
-    })
-
-
-def _response(status_code: int, body: dict) -> dict:
-    return {
-        "statusCode": status_code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type,Authorization",
-            "Access-Control-Allow-Methods": "GET,POST,DELETE,OPTIONS",
-        },
-        "body": json.dumps(body),
     }
+    if "LastEvaluatedKey" in result:
+        response_body["next_token"] = base64.b64encode(
+            json.dumps(dynamo.item(result["LastEvaluatedKey"])).encode()
+        ).decode()
+
+    return _response(200, response_body)
@@ -0,0 +1,128 @@
+"""
+ECS RunTask dispatcher used by the process_job Lambda.
+Rate-limits launches with a token bucket sized to the RunTask API limits,
+classifies failures as transient or permanent, and computes jittered
+retry delays for transient ones. A failure with no response from ECS
+(connection reset, read timeout) is also `uncertain`: the task may have
+started anyway, so the retry must reuse the same client token.
+"""
+
+import time
+import random
+import logging
+import threading
+
+from botocore.exceptions import ClientError, BotoCoreError
+
+logger = logging.getLogger()
+
+STARTED = "STARTED"
+TRANSIENT = "TRANSIENT"
+PERMANENT = "PERMANENT"
+
+# API errors worth retrying — throttling and server-side trouble
+TRANSIENT_ERROR_CODES = {
+    "ThrottlingException",
+    "Throttling",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+    "LimitExceededException",
+    "ServerException",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+    "InternalFailure",
+}
+
+# RunTask `failures[].reason` values that clear up on their own
+TRANSIENT_FAILURE_PREFIXES = ("RESOURCE:", "AGENT")
+TRANSIENT_FAILURE_MARKERS = (
+    "capacity is unavailable",
+    "try again",
+    "limit on the number of tasks",
+    "timeout waiting for network interface",
+    "throttl",
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/second, up to `burst` banked."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(rate, 0.001)
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self, max_wait: float) -> bool:
+        """Take one token, sleeping up to `max_wait` seconds. False if none came."""
+        deadline = time.monotonic() + max(max_wait, 0.0)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class DispatchResult:
+    """Outcome of one RunTask attempt."""
+
+    def __init__(self, outcome: str, task_arn: str = None, reason: str = "", uncertain: bool = False):
+        self.outcome = outcome
+        self.task_arn = task_arn
+        self.reason = reason
+        self.uncertain = uncertain
+
+    def __repr__(self):
+        return f"DispatchResult({self.outcome}, {self.task_arn or self.reason!r})"
+
+
+def is_transient_failure(reason: str) -> bool:
+    """Classify a RunTask `failures[].reason` string."""
+    if reason.startswith(TRANSIENT_FAILURE_PREFIXES):
+        return True
+    lowered = reason.lower()
+    return any(marker in lowered for marker in TRANSIENT_FAILURE_MARKERS)
+
+
+def run_task(ecs_client, bucket: TokenBucket, max_wait: float, **run_task_kwargs) -> DispatchResult:
+    """Call ecs.run_task behind the token bucket and classify the outcome."""
+    if not bucket.acquire(max_wait):
+        return DispatchResult(TRANSIENT, reason="Local RunTask rate limit reached")
+
+    try:
+        response = ecs_client.run_task(**run_task_kwargs)
+    except ClientError as exc:
+        code = exc.response.get("Error", {}).get("Code", "")
+        outcome = TRANSIENT if code in TRANSIENT_ERROR_CODES else PERMANENT
+        return DispatchResult(outcome, reason=f"{code}: {exc}")
+    except BotoCoreError as exc:
+        # Connection resets, read timeouts, etc.
+        return DispatchResult(TRANSIENT, reason=str(exc), uncertain=True)
+
+    tasks = response.get("tasks", [])
+    if tasks:
+        return DispatchResult(STARTED, task_arn=tasks[0]["taskArn"])
+
+    failures = response.get("failures", [])
+    reasons = [f.get("reason", "Unknown") for f in failures] or ["No task returned"]
+    reason = "; ".join(reasons)
+    outcome = TRANSIENT if all(is_transient_failure(r) for r in reasons) else PERMANENT
+    return DispatchResult(outcome, reason=reason)
+
+
+def retry_delay(receive_count: int, base: float, cap: float) -> int:
+    """Full-jitter exponential backoff, in whole seconds for ChangeMessageVisibility."""
+    ceiling = min(cap, base * (2 ** max(receive_count - 1, 0)))
+    return int(max(1, random.uniform(base / 2, ceiling)))
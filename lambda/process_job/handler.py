@@ -1,6 +1,20 @@
 """
 Lambda: Process Job
 Triggered by SQS — provisions an ECS Fargate task to run the agent.
+Launches go through the rate-limited dispatcher; transient RunTask failures
+are retried via ChangeMessageVisibility, permanent ones mark the task FAILED.
+Status writes never overwrite CANCELLED (see cancel_job): a cancelled task's
+message is dropped, and a container started just as it was cancelled is stopped.
+
+Dispatch is idempotent under SQS redelivery. A message only launches a
+container after claiming its task with a conditional PENDING → PROVISIONING
+write, so a duplicate delivery of a task that is already provisioned (or
+further along) is dropped. Each claim is one dispatch attempt, and RunTask is
+called with a client token derived from the task ID and the attempt number.
+If an invocation dies between RunTask and recording the ECS task, its claim
+goes stale. The redelivered message then takes the claim over under the same
+attempt number, and ECS returns the task it already started instead of
+launching another.
 """
 
 import json
@@ -8,101 +22,324 @@ import os
 import logging
 from datetime import datetime, timezone
 
-import boto3
+from botocore.exceptions import ClientError
+
+from common import aws, dynamo, latency, tracing
+
+import dispatcher
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ecs = boto3.client("ecs")
-dynamodb = boto3.resource("dynamodb")
-
 TABLE_NAME = os.environ["DYNAMODB_TABLE"]
 ECS_CLUSTER = os.environ["ECS_CLUSTER"]
 TASK_DEFINITION = os.environ["TASK_DEFINITION"]
 SUBNETS = os.environ["SUBNETS"].split(",")
 SECURITY_GROUP = os.environ["SECURITY_GROUP"]
 S3_BUCKET = os.environ["S3_BUCKET"]
+QUEUE_URL = os.environ["SQS_QUEUE_URL"]
 CONTAINER_NAME = os.environ.get("CONTAINER_NAME", "agent")
-PROXY_URL = os.environ.get("PROXY_URL", "")
+ASSET_CACHE_URL = os.environ.get("ASSET_CACHE_URL", "")
+STATS_TABLE = os.environ.get("STATS_TABLE", "")
+
+# Per-container share of the account's RunTask budget (see lambda.tf)
+RUN_TASK_RATE = float(os.environ.get("RUN_TASK_RATE", "4"))
+RUN_TASK_BURST = float(os.environ.get("RUN_TASK_BURST", "20"))
+# Must match the queue's redrive maxReceiveCount
+MAX_RECEIVE_COUNT = int(os.environ.get("MAX_RECEIVE_COUNT", "10"))
+RETRY_BASE_SECONDS = float(os.environ.get("RETRY_BASE_SECONDS", "10"))
+RETRY_MAX_SECONDS = float(os.environ.get("RETRY_MAX_SECONDS", "300"))
+# A PROVISIONING claim older than this was left by a dead invocation (the Lambda timeout)
+CLAIM_TIMEOUT_SECONDS = int(os.environ.get("CLAIM_TIMEOUT_SECONDS", "60"))
+
+# RunTask can take a few seconds; throttling is handled by the dispatcher,
+# so botocore only retries once before we classify the error ourselves
+ECS_CLIENT_OPTIONS = {"read_timeout": 30, "retries": {"mode": "standard", "total_max_attempts": 2}}
 
-table = dynamodb.Table(TABLE_NAME)
+# Shared across invocations of a warm container
+run_task_bucket = dispatcher.TokenBucket(RUN_TASK_RATE, RUN_TASK_BURST)
 
+aws.preload("dynamodb", "sqs", tables=(TABLE_NAME,))
+aws.client("ecs", **ECS_CLIENT_OPTIONS)
 
+
+@tracing.traced
 def handler(event, context):
-    """Process SQS messages — each message triggers one ECS Fargate task."""
+    """Process SQS messages — each message triggers one ECS Fargate task.
+
+    Returns a partial batch response so only messages that hit a transient
+    failure are redelivered.
+    """
+    batch_item_failures = []
+
     for record in event.get("Records", []):
         body = json.loads(record["body"])
         task_id = body["task_id"]
         query = body.get("query", "hello world")
         tenant_id = body.get("tenant_id", "default")
+        job_type = body.get("job_type", "SEARCH_QUERY")
+        profile = body.get("profile", "")
+        created_at = body.get("created_at", "")
+        deadline_seconds = body.get("deadline_seconds")
+        receive_count = int(record.get("attributes", {}).get("ApproximateReceiveCount", "1"))
 
-        logger.info("Processing job: task_id=%s query=%s", task_id, query)
+        logger.info("Processing job: task_id=%s query=%s attempt=%d", task_id, query, receive_count)
 
-        # Update status to PROVISIONING
-        _update_status(task_id, "PROVISIONING")
+        try:
+            attempt, status = _claim(task_id)
+        except Exception as exc:
+            logger.error("Failed to claim task %s: %s", task_id, exc)
+            batch_item_failures.append({"itemIdentifier": record["messageId"]})
+            continue
+        if not attempt:
+            if status == "PROVISIONING":
+                # Another delivery of this message is dispatching it right now
+                logger.info("Task %s is being dispatched elsewhere — checking back later", task_id)
+                _hide(record, task_id, CLAIM_TIMEOUT_SECONDS)
+                batch_item_failures.append({"itemIdentifier": record["messageId"]})
+            else:
+                logger.info("Task %s is %s — dropping its message", task_id, status or "gone")
+            continue
 
         try:
-            # Run ECS Fargate task
-            response = ecs.run_task(
-                cluster=ECS_CLUSTER,
-                taskDefinition=TASK_DEFINITION,
-                launchType="FARGATE",
-                count=1,
-                networkConfiguration={
-                    "awsvpcConfiguration": {
-                        "subnets": SUBNETS,
-                        "securityGroups": [SECURITY_GROUP],
-                        "assignPublicIp": "DISABLED",
-                    }
-                },
-                overrides={
-                    "containerOverrides": [
-                        {
-                            "name": CONTAINER_NAME,
-                            "environment": [
-                                {"name": "TASK_ID", "value": task_id},
-                                {"name": "SEARCH_QUERY", "value": query},
-                                {"name": "S3_BUCKET", "value": S3_BUCKET},
-                                {"name": "DYNAMODB_TABLE", "value": TABLE_NAME},
-                                # {"name": "PROXY_URL", "value": PROXY_URL},
-                                {"name": "TENANT_ID", "value": tenant_id},
-                            ],
-                        }
-                    ]
-                },
-                tags=[
-                    {"key": "TaskId", "value": task_id},
-                    {"key": "TenantId", "value": tenant_id},
-                    {"key": "Project", "value": "infra-demo"},
-                ],
-            )
+            dispatched_at = datetime.now(timezone.utc)
 
-            # Check for failures
-            failures = response.get("failures", [])
-            if failures:
-                error_msg = "; ".join(f.get("reason", "Unknown") for f in failures)
-                logger.error("ECS RunTask failures: %s", error_msg)
-                _update_status(task_id, "FAILED", error=f"ECS provisioning failed: {error_msg}")
-                continue
+            # Leave a little of the invocation for bookkeeping after the wait
+            max_wait = max(context.get_remaining_time_in_millis() / 1000 - 10, 0) if context else 0
+            result = dispatcher.run_task(
+                aws.client("ecs", **ECS_CLIENT_OPTIONS),
+                run_task_bucket,
+                max_wait,
+                **_run_task_kwargs(
+                    task_id, query, tenant_id, job_type, profile, created_at, dispatched_at.isoformat(),
+                    deadline_seconds, client_token=f"{task_id}-{attempt}",
+                ),
+            )
+        except Exception as exc:
+            logger.error("Failed to dispatch ECS task for %s: %s", task_id, exc)
+            result = dispatcher.DispatchResult(dispatcher.TRANSIENT, reason=str(exc), uncertain=True)
 
-            ecs_task_arn = response["tasks"][0]["taskArn"]
+        if result.outcome == dispatcher.STARTED:
+            ecs_task_arn = result.task_arn
             # Extract short task ID from ARN (last segment after /)
             ecs_task_id = ecs_task_arn.split("/")[-1]
             logger.info("ECS task started: %s (id: %s)", ecs_task_arn, ecs_task_id)
-            _update_status(task_id, "PROVISIONED", ecs_task_arn=ecs_task_arn, ecs_task_id=ecs_task_id)
+            try:
+                # Not PROVISIONING any more: cancelled, or the agent already reported RUNNING
+                if not (_update_status(task_id, "PROVISIONED", ecs_task_arn=ecs_task_arn, ecs_task_id=ecs_task_id)
+                        or _record_ecs_task(task_id, ecs_task_arn, ecs_task_id)):
+                    logger.info("Task %s was cancelled during RunTask — stopping %s", task_id, ecs_task_id)
+                    _stop_task(task_id, ecs_task_arn)
+                    continue
+            except Exception as exc:
+                # The container is already running — don't redeliver and launch another
+                logger.error("Failed to record ECS task for %s: %s", task_id, exc)
+            if created_at:
+                # Submit → start of the dispatch attempt that launched the container
+                _record_latency(tenant_id, "queue_wait", latency.elapsed_ms(created_at, dispatched_at))
+            continue
 
-        except Exception as exc:
-            logger.error("Failed to run ECS task for %s: %s", task_id, exc)
-            _update_status(task_id, "FAILED", error=str(exc))
-            raise  # Let SQS retry
+        if result.outcome == dispatcher.TRANSIENT and receive_count < MAX_RECEIVE_COUNT:
+            delay = dispatcher.retry_delay(receive_count, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS)
+            logger.warning(
+                "Transient RunTask failure for %s (attempt %d), retrying in %ds: %s",
+                task_id, receive_count, delay, result.reason,
+            )
+            if result.uncertain:
+                # The task may have started: keep the claim, so the retry takes it
+                # over once stale and repeats RunTask with the same client token
+                _hide(record, task_id, max(delay, CLAIM_TIMEOUT_SECONDS))
+                batch_item_failures.append({"itemIdentifier": record["messageId"]})
+            elif _defer(record, task_id, delay, result.reason):
+                batch_item_failures.append({"itemIdentifier": record["messageId"]})
+            continue
+
+        if result.outcome == dispatcher.TRANSIENT:
+            error_msg = f"ECS provisioning gave up after {receive_count} attempts: {result.reason}"
+        else:
+            error_msg = f"ECS provisioning failed: {result.reason}"
+        logger.error("ECS RunTask failed for %s: %s", task_id, error_msg)
+        _update_status(task_id, "FAILED", error=error_msg)
+
+    return {"batchItemFailures": batch_item_failures}
 
 
-def _update_status(task_id: str, status: str, error: str = None, ecs_task_arn: str = None, ecs_task_id: str = None):
-    """Update task status in DynamoDB."""
+def _run_task_kwargs(task_id: str, query: str, tenant_id: str, job_type: str, profile: str = "",
+                     created_at: str = "", dispatched_at: str = "", deadline_seconds: int = None,
+                     client_token: str = None) -> dict:
+    """Build the RunTask request for one job.
+
+    MULTI_TARGET jobs read their target list from DynamoDB — it can be far
+    larger than the 8 KB container override limit. CREATED_AT/DISPATCHED_AT
+    let the agent record provisioning and end-to-end latency; DEADLINE_SECONDS,
+    when the job set one, overrides the task definition's default deadline.
+    """
+    kwargs = {
+        "cluster": ECS_CLUSTER,
+        "taskDefinition": TASK_DEFINITION,
+        "launchType": "FARGATE",
+        "count": 1,
+        "networkConfiguration": {
+            "awsvpcConfiguration": {
+                "subnets": SUBNETS,
+                "securityGroups": [SECURITY_GROUP],
+                "assignPublicIp": "DISABLED",
+            }
+        },
+        "overrides": {
+            "containerOverrides": [
+                {
+                    "name": CONTAINER_NAME,
+                    "environment": [
+                        {"name": "TASK_ID", "value": task_id},
+                        {"name": "SEARCH_QUERY", "value": query},
+                        {"name": "JOB_TYPE", "value": job_type},
+                        {"name": "S3_BUCKET", "value": S3_BUCKET},
+                        {"name": "DYNAMODB_TABLE", "value": TABLE_NAME},
+                        {"name": "TENANT_ID", "value": tenant_id},
+                        {"name": "CREATED_AT", "value": created_at},
+                        {"name": "DISPATCHED_AT", "value": dispatched_at},
+                    ]
+                    + ([{"name": "ASSET_CACHE_URL", "value": ASSET_CACHE_URL}] if ASSET_CACHE_URL else [])
+                    + ([{"name": "PROFILE", "value": profile}] if profile else [])
+                    + ([{"name": "DEADLINE_SECONDS", "value": str(deadline_seconds)}] if deadline_seconds else []),
+                }
+            ]
+        },
+        "tags": [
+            {"key": "TaskId", "value": task_id},
+            {"key": "TenantId", "value": tenant_id},
+            {"key": "Project", "value": "infra-demo"},
+        ],
+    }
+    if client_token:
+        kwargs["clientToken"] = client_token
+    return kwargs
+
+
+def _defer(record: dict, task_id: str, delay: int, reason: str) -> bool:
+    """Put the task back to PENDING and hide its message for `delay` seconds.
+
+    Returns False if the task was cancelled meanwhile (its message can go).
+    """
+    try:
+        if not _update_status(task_id, "PENDING", dispatch_error=reason):
+            return False
+    except Exception as exc:
+        # Still claimed; the redelivered message takes the claim over once it goes stale
+        logger.error("Failed to release claim on %s: %s", task_id, exc)
+    _hide(record, task_id, delay)
+    return True
+
+
+def _hide(record: dict, task_id: str, delay: int):
+    """Hide the message for `delay` seconds before it is redelivered."""
+    try:
+        aws.client("sqs").change_message_visibility(
+            QueueUrl=QUEUE_URL,
+            ReceiptHandle=record["receiptHandle"],
+            VisibilityTimeout=delay,
+        )
+    except Exception as exc:
+        # The message still comes back after the queue's visibility timeout
+        logger.error("Failed to defer retry for %s: %s", task_id, exc)
+
+
+def _claim(task_id: str) -> tuple:
+    """Claim the task for dispatch (PENDING → PROVISIONING), or take over a stale claim.
+
+    Returns (attempt, "") once claimed, or (0, status) with the status that
+    stopped it — "" if the task no longer exists.
+    """
+    table = aws.table(TABLE_NAME)
+    now = datetime.now(timezone.utc)
+    try:
+        result = table.update_item(
+            Key={"task_id": task_id},
+            UpdateExpression="SET #s = :provisioning, updated_at = :u ADD dispatch_attempt :one",
+            ConditionExpression="#s = :pending AND attribute_not_exists(ecs_task_arn)",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={
+                ":provisioning": "PROVISIONING",
+                ":pending": "PENDING",
+                ":u": now.isoformat(),
+                ":one": 1,
+            },
+            ReturnValues="UPDATED_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+        return int(result["Attributes"]["dispatch_attempt"]), ""
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        old = dynamo.item(exc.response.get("Item")) or {}
+
+    status = old.get("status", "")
+    claimed_at = old.get("updated_at")
+    if status != "PROVISIONING" or old.get("ecs_task_arn") or not claimed_at:
+        return 0, status
+    if (now - datetime.fromisoformat(claimed_at)).total_seconds() < CLAIM_TIMEOUT_SECONDS:
+        return 0, status
+
+    # Same attempt, same client token: a RunTask that did go through is returned, not repeated
+    attempt = old.get("dispatch_attempt") or 1
+    try:
+        table.update_item(
+            Key={"task_id": task_id},
+            UpdateExpression="SET updated_at = :u, dispatch_attempt = :attempt",
+            ConditionExpression="#s = :provisioning AND updated_at = :claimed",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={
+                ":provisioning": "PROVISIONING",
+                ":u": now.isoformat(),
+                ":claimed": claimed_at,
+                ":attempt": attempt,
+            },
+        )
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        return 0, "PROVISIONING"
+    logger.warning("Took over a stale dispatch claim on %s (attempt %d)", task_id, attempt)
+    return attempt, ""
+
+
+def _stop_task(task_id: str, ecs_task_arn: str):
+    try:
+        aws.client("ecs", **ECS_CLIENT_OPTIONS).stop_task(
+            cluster=ECS_CLUSTER, task=ecs_task_arn, reason="Cancelled by user",
+        )
+    except Exception as exc:
+        logger.error("Failed to stop ECS task for cancelled task %s: %s", task_id, exc)
+
+
+def _record_latency(tenant_id: str, metric: str, ms: float):
+    """Add a sample to the tenant's latency histogram; stats never fail a job."""
+    if not STATS_TABLE:
+        return
+    try:
+        latency.record(aws.client("dynamodb"), STATS_TABLE, tenant_id, metric, ms)
+    except Exception as exc:
+        logger.warning("Failed to record %s latency for tenant %s: %s", metric, tenant_id, exc)
+
+
+def _update_status(
+    task_id: str,
+    status: str,
+    error: str = None,
+    ecs_task_arn: str = None,
+    ecs_task_id: str = None,
+    dispatch_error: str = None,
+) -> bool:
+    """Move a claimed (PROVISIONING) task on; returns False if it isn't claimed any more.
+
+    That is usually because it was cancelled.
+    """
     update_expr = "SET #s = :s, updated_at = :u"
     expr_values = {
         ":s": status,
         ":u": datetime.now(timezone.utc).isoformat(),
+        ":provisioning": "PROVISIONING",
     }
     expr_names = {"#s": "status"}
 
@@ -115,10 +352,37 @@ def _update_status(task_id: str, status: str, error: str = None, ecs_task_arn: s
     if ecs_task_id:
         update_expr += ", ecs_task_id = :tid"
         expr_values[":tid"] = ecs_task_id
+    if dispatch_error:
+        update_expr += ", last_dispatch_error = :de"
+        expr_values[":de"] = dispatch_error
+
+    try:
+        aws.table(TABLE_NAME).update_item(
+            Key={"task_id": task_id},
+            UpdateExpression=update_expr,
+            ConditionExpression="#s = :provisioning",
+            ExpressionAttributeValues=expr_values,
+            ExpressionAttributeNames=expr_names,
+        )
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
 
-    table.update_item(
-        Key={"task_id": task_id},
-        UpdateExpression=update_expr,
-        ExpressionAttributeValues=expr_values,
-        ExpressionAttributeNames=expr_names,
-    )
+def _record_ecs_task(task_id: str, ecs_task_arn: str, ecs_task_id: str) -> bool:
+    """Record the container without touching the status; False if the task was cancelled."""
+    try:
+        aws.table(TABLE_NAME).update_item(
+            Key={"task_id": task_id},
+            UpdateExpression="SET ecs_task_arn = :arn, ecs_task_id = :tid",
+            ConditionExpression="#s <> :cancelled",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":arn": ecs_task_arn, ":tid": ecs_task_id, ":cancelled": "CANCELLED"},
+        )
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
@@ -0,0 +1,130 @@
+"""
+Lambda: Publish Status
+Triggered by the tasks table's DynamoDB stream — pushes job status changes to
+the tenant's open WebSocket connections so the frontend doesn't have to poll.
+Publishing is best-effort: a client that misses a message re-fetches on reconnect.
+"""
+
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError, BotoCoreError
+
+from common import aws, dynamo, tracing
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+CONNECTIONS_TABLE = os.environ["CONNECTIONS_TABLE"]
+WEBSOCKET_ENDPOINT = os.environ["WEBSOCKET_ENDPOINT"]
+POST_CONCURRENCY = int(os.environ.get("POST_CONCURRENCY", "16"))
+
+# A change to any of these is worth telling clients about (updated_at alone is not)
+PUBLISHED_FIELDS = (
+    "status",
+    "ecs_task_id",
+    "targets_completed",
+    "targets_failed",
+    "error",
+    "errorLog",
+)
+
+# Same attributes list_jobs leaves out
+OMIT_FIELDS = frozenset({"targets", "results", "artifacts", "page_metrics"})
+
+aws.preload("dynamodb")
+aws.client("apigatewaymanagementapi", endpoint_url=WEBSOCKET_ENDPOINT)
+
+
+@tracing.traced
+def handler(event, context):
+    """Fan stream records out to WebSocket connections, grouped by tenant."""
+    # Latest image per task — several updates in one batch collapse to one message
+    latest = {}
+    for record in event.get("Records", []):
+        image = _changed_image(record)
+        if image:
+            latest[image["task_id"]["S"]] = image
+
+    by_tenant = {}
+    for image in latest.values():
+        tenant_id = image.get("tenant_id", {}).get("S")
+        if tenant_id:
+            job = dynamo.item(image, omit=OMIT_FIELDS)
+            by_tenant.setdefault(tenant_id, []).append(json.dumps({"type": "job", "job": job}))
+
+    posts = [
+        (connection_id, message)
+        for tenant_id, messages in by_tenant.items()
+        for connection_id in _tenant_connections(tenant_id)
+        for message in messages
+    ]
+    if not posts:
+        return {"published": 0}
+
+    with ThreadPoolExecutor(max_workers=min(POST_CONCURRENCY, len(posts))) as pool:
+        delivered = sum(pool.map(lambda post: _post(*post), posts))
+
+    logger.info("Published %d/%d messages for %d tasks", delivered, len(posts), len(latest))
+    return {"published": delivered}
+
+
+def _changed_image(record: dict):
+    """Return the new image if the record changes something clients display."""
+    if record.get("eventName") not in ("INSERT", "MODIFY"):
+        return None
+    change = record.get("dynamodb", {})
+    new_image = change.get("NewImage")
+    if not new_image:
+        return None
+    if record["eventName"] == "INSERT":
+        return new_image
+    old_image = change.get("OldImage", {})
+    if any(new_image.get(f) != old_image.get(f) for f in PUBLISHED_FIELDS):
+        return new_image
+    return None
+
+
+def _tenant_connections(tenant_id: str) -> list:
+    """Return the connection IDs currently open for a tenant."""
+    ddb = aws.client("dynamodb")
+    kwargs = {
+        "TableName": CONNECTIONS_TABLE,
+        "IndexName": "tenant-index",
+        "KeyConditionExpression": "tenant_id = :tid",
+        "ExpressionAttributeValues": {":tid": {"S": tenant_id}},
+    }
+    connection_ids = []
+    while True:
+        result = ddb.query(**kwargs)
+        connection_ids.extend(item["connection_id"]["S"] for item in result.get("Items", []))
+        if "LastEvaluatedKey" not in result:
+            return connection_ids
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+
+
+def _post(connection_id: str, message: str) -> bool:
+    """Send one message; drop the connection if the client has gone away."""
+    try:
+        aws.client("apigatewaymanagementapi", endpoint_url=WEBSOCKET_ENDPOINT).post_to_connection(
+            ConnectionId=connection_id, Data=message.encode()
+        )
+        return True
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") != "GoneException":
+            logger.warning("Failed to post to %s: %s", connection_id, exc)
+            return False
+    except BotoCoreError as exc:
+        logger.warning("Failed to post to %s: %s", connection_id, exc)
+        return False
+
+    try:
+        aws.client("dynamodb").delete_item(
+            TableName=CONNECTIONS_TABLE,
+            Key={"connection_id": {"S": connection_id}},
+        )
+    except (ClientError, BotoCoreError) as exc:
+        logger.warning("Failed to remove stale connection %s: %s", connection_id, exc)
+    return False
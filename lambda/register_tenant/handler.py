@@ -2,131 +2,182 @@
 Lambda: Register Tenant
 Called after Cognito sign-in. If the user has a pending invitation,
 claims it. Otherwise creates a new tenant and registers user as ADMIN.
+
+Every response carries `user` — the same {cognito_id, email, tenant_id,
+role} the authorizer puts in its request context — so the client can use
+it as-is instead of making a second call to learn its tenant and role.
+`just_registered` tells the client that any authorizer result cached for
+its current token still says UNREGISTERED, so it should refresh the token.
 """
 
-import json
 import os
 import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
-import boto3
-from botocore.exceptions import ClientError
+from common import aws, dynamo, tracing
+from common.api import response as _response, auth_context as _auth_context, parse_body
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
-
 USERS_TABLE = os.environ["USERS_TABLE"]
 
-users_table = dynamodb.Table(USERS_TABLE)
+# Attributes read for an existing record / projected into email-index
+USER_FIELDS = ("cognito_id", "email", "tenant_id", "role", "status", "created_at")
+PROJECTION = {
+    "ProjectionExpression": ", ".join(f"#{name}" for name in USER_FIELDS),
+    "ExpressionAttributeNames": {f"#{name}": name for name in USER_FIELDS},
+}
+
+aws.preload("dynamodb")
 
 
+@tracing.traced
 def handler(event, context):
     """POST /tenants/register — register current user + create or join tenant."""
-    auth_context = event.get("requestContext", {}).get("authorizer", {})
+    auth_context = _auth_context(event)
     cognito_id = auth_context.get("cognito_id", "")
     email = auth_context.get("email", "")
 
     if not cognito_id:
         return _response(401, {"error": "Unauthorized"})
 
-    # 1. Check if user already has an active record (by cognito_id)
-    result = users_table.get_item(Key={"cognito_id": cognito_id})
-    existing_user = result.get("Item")
+    ddb = aws.client("dynamodb")
 
-    if existing_user:
-        return _response(200, {
-            "message": "User already registered",
-            "tenant_id": existing_user.get("tenant_id"),
-            "role": existing_user.get("role"),
-            "email": existing_user.get("email"),
-        })
-
-    # 2. Check if there's a pending invitation for this email
-    if email:
-        invite_result = users_table.query(
-            IndexName="email-index",
-            KeyConditionExpression="email = :email",
-            ExpressionAttributeValues={":email": email},
-        )
+    # 1 + 2. Look up an existing record and pending invitations at the same time
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        existing_future = pool.submit(_get_user, ddb, cognito_id)
+        invites_future = pool.submit(_pending_invites, ddb, email) if email else None
+        existing_user = existing_future.result()
+        invites = invites_future.result() if invites_future else []
 
-        for invite in invite_result.get("Items", []):
-            if invite.get("status") == "PENDING":
-                # Found a pending invitation — claim it!
-                old_id = invite["cognito_id"]
-                tenant_id = invite["tenant_id"]
-                role = invite.get("role", "READ_ONLY")
-                now = datetime.now(timezone.utc).isoformat()
-
-                # Delete the placeholder record
-                users_table.delete_item(Key={"cognito_id": old_id})
-
-                # Create the real record with this user's cognito_id
-                users_table.put_item(Item={
-                    "cognito_id": cognito_id,
-                    "email": email,
-                    "tenant_id": tenant_id,
-                    "role": role,
-                    "status": "ACTIVE",
-                    "created_at": now,
-                    "invited_at": invite.get("created_at", ""),
-                })
-
-                logger.info(
-                    "User %s claimed invitation to tenant %s as %s",
-                    cognito_id, tenant_id, role,
-                )
-
-                return _response(200, {
-                    "message": "Joined tenant via invitation",
-                    "tenant_id": tenant_id,
-                    "role": role,
-                    "email": email,
-                })
+    if existing_user:
+        return _registered(200, "User already registered", existing_user)
+
+    for invite in invites:
+        claimed = _claim_invitation(ddb, invite, cognito_id, email)
+        if claimed == "claimed":
+            logger.info(
+                "User %s claimed invitation to tenant %s as %s",
+                cognito_id, invite["tenant_id"], invite.get("role", "READ_ONLY"),
+            )
+            return _registered(200, "Joined tenant via invitation", {
+                "cognito_id": cognito_id,
+                "email": email,
+                "tenant_id": invite["tenant_id"],
+                "role": invite.get("role", "READ_ONLY"),
+            }, just_registered=True)
+        if claimed == "registered":
+            # A concurrent request registered this user first
+            return _registered(200, "User already registered", _get_user(ddb, cognito_id))
+        # "gone": invitation was revoked or claimed meanwhile — try the next one
 
     # 3. No invitation found — create a brand-new tenant
-    try:
-        body = json.loads(event.get("body") or "{}")
-    except json.JSONDecodeError:
-        body = {}
+    body = parse_body(event) or {}
 
     tenant_name = body.get("tenant_name", f"{email}'s team")
     tenant_id = str(uuid.uuid4())
     now = datetime.now(timezone.utc).isoformat()
 
-    users_table.put_item(
-        Item={
-            "cognito_id": cognito_id,
-            "email": email,
-            "tenant_id": tenant_id,
-            "tenant_name": tenant_name,
-            "role": "ADMIN",
-            "status": "ACTIVE",
-            "created_at": now,
-        },
-        ConditionExpression="attribute_not_exists(cognito_id)",
-    )
+    try:
+        ddb.put_item(
+            TableName=USERS_TABLE,
+            Item={
+                "cognito_id": {"S": cognito_id},
+                "email": {"S": email},
+                "tenant_id": {"S": tenant_id},
+                "tenant_name": {"S": tenant_name},
+                "role": {"S": "ADMIN"},
+                "status": {"S": "ACTIVE"},
+                "created_at": {"S": now},
+            },
+            ConditionExpression="attribute_not_exists(cognito_id)",
+        )
+    except ddb.exceptions.ConditionalCheckFailedException:
+        return _registered(200, "User already registered", _get_user(ddb, cognito_id))
 
     logger.info("Created tenant %s for user %s", tenant_id, cognito_id)
 
-    return _response(201, {
-        "message": "Tenant created successfully",
+    return _registered(201, "Tenant created successfully", {
+        "cognito_id": cognito_id,
+        "email": email,
         "tenant_id": tenant_id,
         "role": "ADMIN",
-        "tenant_name": tenant_name,
-    })
+    }, tenant_name=tenant_name, just_registered=True)
+
+
+def _get_user(ddb, cognito_id: str):
+    result = ddb.get_item(
+        TableName=USERS_TABLE,
+        Key={"cognito_id": {"S": cognito_id}},
+        **PROJECTION,
+    )
+    return dynamo.item(result.get("Item"))
+
+
+def _pending_invites(ddb, email: str) -> list:
+    """Return pending invitations for an email from email-index alone."""
+    result = ddb.query(
+        TableName=USERS_TABLE,
+        IndexName="email-index",
+        KeyConditionExpression="#email = :email",
+        FilterExpression="#status = :pending",
+        ExpressionAttributeValues={":email": {"S": email}, ":pending": {"S": "PENDING"}},
+        **PROJECTION,
+    )
+    return [dynamo.item(item) for item in result.get("Items", [])]
 
 
-def _response(status_code: int, body: dict) -> dict:
-    return {
-        "statusCode": status_code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type,Authorization",
-            "Access-Control-Allow-Methods": "GET,POST,DELETE,OPTIONS",
-        },
-        "body": json.dumps(body),
-    }
+def _claim_invitation(ddb, invite: dict, cognito_id: str, email: str) -> str:
+    """Swap the placeholder record for the real one in a single transaction.
+
+    Returns "claimed", "gone" (placeholder no longer pending) or
+    "registered" (a record for cognito_id already exists).
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    try:
+        ddb.transact_write_items(TransactItems=[
+            {"Delete": {
+                "TableName": USERS_TABLE,
+                "Key": {"cognito_id": {"S": invite["cognito_id"]}},
+                "ConditionExpression": "#status = :pending AND #email = :email",
+                "ExpressionAttributeNames": {"#status": "status", "#email": "email"},
+                "ExpressionAttributeValues": {":pending": {"S": "PENDING"}, ":email": {"S": email}},
+            }},
+            {"Put": {
+                "TableName": USERS_TABLE,
+                "Item": {
+                    "cognito_id": {"S": cognito_id},
+                    "email": {"S": email},
+                    "tenant_id": {"S": invite["tenant_id"]},
+                    "role": {"S": invite.get("role", "READ_ONLY")},
+                    "status": {"S": "ACTIVE"},
+                    "created_at": {"S": now},
+                    "invited_at": {"S": invite.get("created_at", "")},
+                },
+                "ConditionExpression": "attribute_not_exists(cognito_id)",
+            }},
+        ])
+        return "claimed"
+    except ddb.exceptions.TransactionCanceledException as exc:
+        reasons = [r.get("Code") for r in exc.response.get("CancellationReasons", [])]
+        if len(reasons) > 1 and reasons[1] == "ConditionalCheckFailed":
+            return "registered"
+        if reasons and reasons[0] == "ConditionalCheckFailed":
+            return "gone"
+        raise
+
+
+def _registered(status_code: int, message: str, user: dict, **extra) -> dict:
+    """Build the register response around the caller's user record."""
+    user = {name: (user or {}).get(name) for name in ("cognito_id", "email", "tenant_id", "role")}
+    return _response(status_code, {
+        "message": message,
+        "tenant_id": user["tenant_id"],
+        "role": user["role"],
+        "email": user["email"],
+        **extra,
+        "user": user,
+    })
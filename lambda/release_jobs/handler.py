@@ -0,0 +1,180 @@
+"""
+Lambda: Release Jobs
+Runs every minute on an EventBridge schedule and moves deferred jobs (see
+common.schedule) onto the job queue when there is room for them, so bulk
+work fills the troughs instead of competing with interactive submissions.
+
+  1. Room = MAX_ACTIVE_JOBS minus the jobs already queued (visible, in flight
+     or delayed in SQS) and the agent tasks ECS is running.
+  2. Due `run_at` jobs are released first, oldest first, then low-priority
+     jobs. At most RELEASE_BATCH_MAX go per run.
+  3. Each job is flipped SCHEDULED → PENDING with a conditional write, which
+     also drops it from the schedule index, and then sent with
+     SendMessageBatch. A job whose message couldn't be sent is put back.
+"""
+
+import os
+import json
+import heapq
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from common import aws, dynamo, schedule, tracing
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+TABLE_NAME = os.environ["DYNAMODB_TABLE"]
+QUEUE_URL = os.environ["SQS_QUEUE_URL"]
+ECS_CLUSTER = os.environ["ECS_CLUSTER"]
+AGENT_TASK_FAMILY = os.environ["AGENT_TASK_FAMILY"]
+
+MAX_ACTIVE_JOBS = int(os.environ.get("MAX_ACTIVE_JOBS", "100"))
+RELEASE_BATCH_MAX = int(os.environ.get("RELEASE_BATCH_MAX", "500"))
+SEND_BATCH_SIZE = 10  # SQS SendMessageBatch limit
+RELEASE_CONCURRENCY = 8
+
+QUEUE_DEPTH_ATTRIBUTES = (
+    "ApproximateNumberOfMessages",
+    "ApproximateNumberOfMessagesNotVisible",
+    "ApproximateNumberOfMessagesDelayed",
+)
+
+aws.preload("dynamodb", "ecs", "sqs")
+
+
+@tracing.traced
+def handler(event, context):
+    """Queue as many due deferred jobs as there is room for; returns a summary."""
+    active = _queued_jobs() + _running_agents()
+    room = min(max(MAX_ACTIVE_JOBS - active, 0), RELEASE_BATCH_MAX)
+    now = schedule.timestamp(datetime.now(timezone.utc))
+
+    released = {}
+    for priority in ("normal", "low"):
+        if room <= 0:
+            break
+        jobs = _due_jobs(priority, now, room)
+        released[priority] = _release(jobs, now)
+        room -= released[priority]
+
+    summary = {"active": active, "released": released}
+    logger.info("Release run: %s", json.dumps(summary))
+    return summary
+
+
+def _queued_jobs() -> int:
+    attributes = aws.client("sqs").get_queue_attributes(
+        QueueUrl=QUEUE_URL, AttributeNames=list(QUEUE_DEPTH_ATTRIBUTES),
+    )["Attributes"]
+    return sum(int(attributes.get(name, 0)) for name in QUEUE_DEPTH_ATTRIBUTES)
+
+
+def _running_agents() -> int:
+    ecs = aws.client("ecs")
+    kwargs = {"cluster": ECS_CLUSTER, "family": AGENT_TASK_FAMILY, "desiredStatus": "RUNNING"}
+    count = 0
+    while True:
+        result = ecs.list_tasks(**kwargs)
+        count += len(result.get("taskArns", []))
+        if not result.get("nextToken"):
+            return count
+        kwargs["nextToken"] = result["nextToken"]
+
+
+def _due_jobs(priority: str, now: str, limit: int) -> list:
+    """Up to `limit` due jobs of one priority class, oldest run_at first, across shards."""
+    keys = schedule.schedule_keys(priority)
+    with ThreadPoolExecutor(max_workers=len(keys)) as pool:
+        shards = list(pool.map(lambda key: _query_shard(key, now, limit), keys))
+    return list(heapq.merge(*shards, key=lambda job: job["run_at"]))[:limit]
+
+
+def _query_shard(key: str, now: str, limit: int) -> list:
+    kwargs = {
+        "TableName": TABLE_NAME,
+        "IndexName": schedule.INDEX_NAME,
+        "KeyConditionExpression": "schedule_key = :key AND run_at <= :now",
+        "ExpressionAttributeValues": {":key": {"S": key}, ":now": {"S": now}},
+        "Limit": limit,
+    }
+    ddb = aws.client("dynamodb")
+    jobs = []
+    while len(jobs) < limit:
+        result = ddb.query(**kwargs)
+        jobs.extend(dynamo.item(item) for item in result.get("Items", []))
+        if "LastEvaluatedKey" not in result:
+            break
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+    return jobs[:limit]
+
+
+def _release(jobs: list, now: str) -> int:
+    """Claim and queue `jobs`; returns how many went onto the queue."""
+    with ThreadPoolExecutor(max_workers=RELEASE_CONCURRENCY) as pool:
+        claimed = [job for job, ok in zip(jobs, pool.map(lambda job: _claim(job, now), jobs)) if ok]
+
+    sqs = aws.client("sqs")
+    sent = 0
+    for start in range(0, len(claimed), SEND_BATCH_SIZE):
+        batch = claimed[start:start + SEND_BATCH_SIZE]
+        entries = [
+            {"Id": str(index), "MessageBody": json.dumps(schedule.queue_message(job, now))}
+            for index, job in enumerate(batch)
+        ]
+        try:
+            result = sqs.send_message_batch(QueueUrl=QUEUE_URL, Entries=entries)
+            failed = {int(f["Id"]) for f in result.get("Failed", [])}
+        except ClientError as exc:
+            logger.error("SendMessageBatch failed: %s", exc)
+            failed = set(range(len(batch)))
+        for index, job in enumerate(batch):
+            if index in failed:
+                _unclaim(job)
+            else:
+                sent += 1
+    return sent
+
+
+def _claim(job: dict, now: str) -> bool:
+    """SCHEDULED → PENDING, out of the schedule index; False if it was cancelled meanwhile."""
+    try:
+        aws.client("dynamodb").update_item(
+            TableName=TABLE_NAME,
+            Key={"task_id": {"S": job["task_id"]}},
+            UpdateExpression="SET #s = :pending, updated_at = :now, released_at = :now REMOVE schedule_key",
+            ConditionExpression="#s = :scheduled",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={
+                ":pending": {"S": "PENDING"},
+                ":scheduled": {"S": "SCHEDULED"},
+                ":now": {"S": now},
+            },
+        )
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+def _unclaim(job: dict):
+    """Put a job whose message wasn't sent back in the schedule index for the next run."""
+    try:
+        aws.client("dynamodb").update_item(
+            TableName=TABLE_NAME,
+            Key={"task_id": {"S": job["task_id"]}},
+            UpdateExpression="SET #s = :scheduled, schedule_key = :key",
+            ConditionExpression="#s = :pending",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={
+                ":pending": {"S": "PENDING"},
+                ":scheduled": {"S": "SCHEDULED"},
+                ":key": {"S": job["schedule_key"]},
+            },
+        )
+    except ClientError as exc:
+        logger.error("Could not put %s back on the schedule: %s", job["task_id"], exc)
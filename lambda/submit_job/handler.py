@@ -2,78 +2,173 @@
 Lambda: Submit Job
 Accepts a job request via API Gateway, writes metadata to DynamoDB, and queues the job in SQS.
 Tenant ID is read from the authorizer context (not request body).
+
+Two job types are accepted:
+  SEARCH_QUERY  — {"query": "..."}: one search in one container
+  MULTI_TARGET  — {"targets": ["...", "https://..."]}: a list of queries/URLs
+                  run over a pool of concurrent pages in one container
+
+Either may name a browser profile ({"profile": "checkout-bot"}): the agent
+starts from the tenant's stored cookies/localStorage under that name and
+refreshes them afterwards.
+
+Either may also set {"deadline_seconds": 300}: the agent's job-level deadline,
+after which it saves what it has and marks the task TIMED_OUT.
+
+Jobs can be deferred (see common.schedule): {"run_at": "<ISO-8601>"} holds a
+job until then, and {"priority": "low"} runs it only when there's spare
+capacity. Delays up to 15 minutes ride on SQS DelaySeconds; anything longer,
+and every low-priority job, is stored as SCHEDULED for release_jobs to queue.
 """
 
 import json
 import os
+import re
 import uuid
 import time
-from datetime import datetime, timezone
-
-import boto3
+from datetime import datetime, timedelta, timezone
 
-dynamodb = boto3.resource("dynamodb")
-sqs = boto3.client("sqs")
+from common import aws, schedule, tenant_index, tracing
+from common.api import response as _response, auth_context as _auth_context, parse_body
 
 TABLE_NAME = os.environ["DYNAMODB_TABLE"]
 QUEUE_URL = os.environ["SQS_QUEUE_URL"]
 
-table = dynamodb.Table(TABLE_NAME)
+# Targets live on the task item (400 KB DynamoDB item limit)
+MAX_TARGETS = int(os.environ.get("MAX_TARGETS", "500"))
+MAX_TARGET_LENGTH = 2048
+MAX_TARGETS_BYTES = 300 * 1024
+
+PROFILE_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
 
+# Must leave the agent's salvage grace period under the entrypoint's
+# AGENT_TIMEOUT_SECONDS (1500), which kills the container outright
+MIN_DEADLINE_SECONDS = 30
+MAX_DEADLINE_SECONDS = int(os.environ.get("MAX_DEADLINE_SECONDS", "1440"))
 
+MAX_SCHEDULE_DAYS = int(os.environ.get("MAX_SCHEDULE_DAYS", "7"))
+TASK_TTL_SECONDS = 7 * 24 * 3600
+
+aws.preload("sqs", tables=(TABLE_NAME,))
+
+
+@tracing.traced
 def handler(event, context):
     """POST /jobs — submit a new computer-use job."""
     # Get tenant_id from the RBAC authorizer
-    auth_context = event.get("requestContext", {}).get("authorizer", {})
+    auth_context = _auth_context(event)
     tenant_id = auth_context.get("tenant_id", "")
 
     if not tenant_id:
         return _response(403, {"error": "No tenant associated with this user"})
 
-    try:
-        body = json.loads(event.get("body") or "{}")
-    except json.JSONDecodeError:
+    body = parse_body(event)
+    if body is None:
         return _response(400, {"error": "Invalid JSON body"})
 
     query = body.get("query")
-
-    if not query:
-        return _response(400, {"error": "'query' is required"})
+    targets = body.get("targets")
+
+    if targets is not None:
+        error = _validate_targets(targets)
+        if error:
+            return _response(400, {"error": error})
+        job_type = "MULTI_TARGET"
+        query = query or f"{len(targets)} targets"
+    elif not query:
+        return _response(400, {"error": "'query' or 'targets' is required"})
+    else:
+        job_type = "SEARCH_QUERY"
+
+    profile = body.get("profile")
+    if profile is not None and (not isinstance(profile, str) or not PROFILE_NAME.match(profile)):
+        return _response(400, {"error": "'profile' must be 1-64 characters of letters, digits, '.', '_' or '-'"})
+
+    deadline_seconds = body.get("deadline_seconds")
+    if deadline_seconds is not None and (
+        not isinstance(deadline_seconds, int) or isinstance(deadline_seconds, bool)
+        or not MIN_DEADLINE_SECONDS <= deadline_seconds <= MAX_DEADLINE_SECONDS
+    ):
+        return _response(400, {
+            "error": f"'deadline_seconds' must be an integer from {MIN_DEADLINE_SECONDS} to {MAX_DEADLINE_SECONDS}",
+        })
+
+    priority = body.get("priority", "normal")
+    if priority not in schedule.PRIORITIES:
+        return _response(400, {"error": f"'priority' must be one of: {', '.join(schedule.PRIORITIES)}"})
+
+    submitted = datetime.now(timezone.utc)
+    run_at = body.get("run_at")
+    if run_at is not None:
+        try:
+            run_at = datetime.fromisoformat(run_at.replace("Z", "+00:00"))
+        except (AttributeError, ValueError):
+            return _response(400, {"error": "'run_at' must be an ISO-8601 timestamp"})
+        run_at = max(run_at if run_at.tzinfo else run_at.replace(tzinfo=timezone.utc), submitted)
+        if run_at > submitted + timedelta(days=MAX_SCHEDULE_DAYS):
+            return _response(400, {"error": f"'run_at' may be at most {MAX_SCHEDULE_DAYS} days ahead"})
+    delay = int((run_at - submitted).total_seconds()) if run_at else 0
+    deferred = priority == "low" or delay > schedule.MAX_DELAY_SECONDS
 
     task_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
-    ttl = int(time.time()) + 7 * 24 * 3600  # 7 days
+    now = submitted.isoformat()
+    # Kept for 7 days after it is due to run
+    ttl = int(time.time()) + delay + TASK_TTL_SECONDS
 
     # Write to DynamoDB
     item = {
         "task_id": task_id,
         "tenant_id": tenant_id,
+        "tenant_shard": tenant_index.shard_for(tenant_id, task_id),
         "submitted_by": auth_context.get("cognito_id", ""),
         "query": query,
-        "status": "PENDING",
+        "job_type": job_type,
+        "status": "SCHEDULED" if deferred else "PENDING",
         "created_at": now,
         "updated_at": now,
         "ttl": ttl,
     }
-    table.put_item(Item=item)
-
-    # Queue in SQS
-    sqs.send_message(
-        QueueUrl=QUEUE_URL,
-        MessageBody=json.dumps({"task_id": task_id, "query": query, "tenant_id": tenant_id}),
-    )
-
-    return _response(202, {"task_id": task_id, "status": "PENDING"})
-
-
-def _response(status_code: int, body: dict) -> dict:
-    return {
-        "statusCode": status_code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type,Authorization",
-            "Access-Control-Allow-Methods": "GET,POST,DELETE,OPTIONS",
-        },
-        "body": json.dumps(body),
-    }
+    if job_type == "MULTI_TARGET":
+        item["targets"] = targets
+        item["targets_total"] = len(targets)
+        item["targets_completed"] = 0
+        item["targets_failed"] = 0
+    if profile:
+        item["profile"] = profile
+    if deadline_seconds:
+        item["deadline_seconds"] = deadline_seconds
+    if run_at or deferred:
+        item["run_at"] = schedule.timestamp(run_at or submitted)
+    if deferred:
+        # Into the schedule index until release_jobs queues it
+        item["priority"] = priority
+        item["schedule_key"] = schedule.schedule_key(priority, task_id)
+    aws.table(TABLE_NAME).put_item(Item=item)
+
+    if not deferred:
+        # Queue in SQS
+        send = {"QueueUrl": QUEUE_URL, "MessageBody": json.dumps(schedule.queue_message(item, item.get("run_at")))}
+        if delay:
+            send["DelaySeconds"] = delay
+        aws.client("sqs").send_message(**send)
+
+    response_body = {"task_id": task_id, "status": item["status"], "job_type": job_type}
+    if "run_at" in item:
+        response_body["run_at"] = item["run_at"]
+    return _response(202, response_body)
+
+
+def _validate_targets(targets) -> str:
+    """Return an error message, or '' if `targets` is a usable target list."""
+    if not isinstance(targets, list) or not targets:
+        return "'targets' must be a non-empty list of strings"
+    if len(targets) > MAX_TARGETS:
+        return f"At most {MAX_TARGETS} targets per job"
+    for target in targets:
+        if not isinstance(target, str) or not target.strip():
+            return "'targets' must be a non-empty list of strings"
+        if len(target) > MAX_TARGET_LENGTH:
+            return f"Targets must be at most {MAX_TARGET_LENGTH} characters"
+    if sum(len(t.encode()) for t in targets) > MAX_TARGETS_BYTES:
+        return f"'targets' must be at most {MAX_TARGETS_BYTES // 1024} KB in total"
+    return ""
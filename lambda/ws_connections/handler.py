@@ -0,0 +1,72 @@
+"""
+Lambda: WebSocket Connections
+Handles $connect / $disconnect / $default for the job status WebSocket API.
+Connections are recorded per tenant so publish_status can fan updates out.
+Tenant ID is read from the authorizer context (token passed as ?token=...).
+"""
+
+import os
+import time
+import logging
+from datetime import datetime, timezone
+
+from common import aws, tracing
+from common.api import auth_context as _auth_context
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+CONNECTIONS_TABLE = os.environ["CONNECTIONS_TABLE"]
+
+# API Gateway closes WebSocket connections after 2 hours at most
+CONNECTION_TTL_SECONDS = 2 * 3600 + 300
+
+aws.preload("dynamodb")
+
+
+@tracing.traced
+def handler(event, context):
+    """Route WebSocket lifecycle events."""
+    request_context = event.get("requestContext") or {}
+    route = request_context.get("routeKey")
+    connection_id = request_context.get("connectionId")
+
+    if route == "$connect":
+        return _connect(event, connection_id)
+    if route == "$disconnect":
+        return _disconnect(connection_id)
+
+    # $default — client keep-alive pings; nothing to do
+    return {"statusCode": 200}
+
+
+def _connect(event: dict, connection_id: str) -> dict:
+    """Record the connection under the caller's tenant."""
+    auth_context = _auth_context(event)
+    tenant_id = auth_context.get("tenant_id", "")
+
+    if not tenant_id:
+        return {"statusCode": 403}
+
+    aws.client("dynamodb").put_item(
+        TableName=CONNECTIONS_TABLE,
+        Item={
+            "connection_id": {"S": connection_id},
+            "tenant_id": {"S": tenant_id},
+            "cognito_id": {"S": auth_context.get("cognito_id", "")},
+            "connected_at": {"S": datetime.now(timezone.utc).isoformat()},
+            "ttl": {"N": str(int(time.time()) + CONNECTION_TTL_SECONDS)},
+        },
+    )
+    logger.info("Connected %s for tenant %s", connection_id, tenant_id)
+    return {"statusCode": 200}
+
+
+def _disconnect(connection_id: str) -> dict:
+    """Forget the connection."""
+    aws.client("dynamodb").delete_item(
+        TableName=CONNECTIONS_TABLE,
+        Key={"connection_id": {"S": connection_id}},
+    )
+    logger.info("Disconnected %s", connection_id)
+    return {"statusCode": 200}
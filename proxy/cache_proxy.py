@@ -0,0 +1,530 @@
+"""
+Caching forward proxy for agent browser traffic.
+
+Agents send static sub-resources through this proxy (ASSET_CACHE_URL); their
+pages connect directly. It serves two kinds of request:
+
+  CONNECT host:443                 → plain TCP tunnel (HTTPS pages, XHR — not cached)
+  GET http(s)://host/path HTTP/1.1 → fetched upstream by the proxy and cached
+
+The agent sends static sub-resources (stylesheets, scripts, fonts, images)
+to the proxy as absolute-form GETs over plain HTTP, even for https:// URLs.
+The proxy makes the TLS connection upstream, so it can cache those
+responses without intercepting TLS.
+
+The cache is an in-memory LRU bounded by total bytes. Freshness comes
+from Cache-Control / Expires, with per-host policies that can disable
+caching, set a default TTL for responses that don't say, or cap the TTL:
+
+    CACHE_HOST_POLICIES='{"*.gstatic.com": {"default_ttl": 86400},
+                          "*.internal.example": {"cache": false}}'
+
+Concurrent misses for the same URL are coalesced into one upstream fetch.
+Counters are served as JSON on GET /__stats and logged every
+STATS_LOG_SECONDS.
+
+Runs locally with no dependencies beyond the standard library:
+
+    python proxy/cache_proxy.py --port 3128
+    curl -x http://localhost:3128 http://example.com/ -D - -o /dev/null   # X-Cache: MISS, then HIT
+    curl http://localhost:3128/__stats
+"""
+
+import os
+import ssl
+import json
+import time
+import asyncio
+import fnmatch
+import logging
+import argparse
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+)
+logger = logging.getLogger("cache-proxy")
+
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+CACHE_MAX_OBJECT_BYTES = int(os.environ.get("CACHE_MAX_OBJECT_BYTES", str(8 * 1024 * 1024)))
+# TTL for static content types that carry no freshness information at all
+DEFAULT_STATIC_TTL = int(os.environ.get("DEFAULT_STATIC_TTL", "3600"))
+UPSTREAM_TIMEOUT_SECONDS = float(os.environ.get("UPSTREAM_TIMEOUT_SECONDS", "30"))
+STATS_LOG_SECONDS = int(os.environ.get("STATS_LOG_SECONDS", "60"))
+
+CACHEABLE_STATUS = {200, 203, 301, 410}
+STATIC_CONTENT_TYPES = ("text/css", "javascript", "font/", "image/", "application/font", "application/wasm")
+
+# Not forwarded in either direction (RFC 9110 §7.6.1), plus proxy credentials
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade",
+}
+
+MAX_HEADER_BYTES = 64 * 1024
+
+
+class HostPolicies:
+    """First-match-wins host glob → policy dict ({cache, default_ttl, max_ttl})."""
+
+    def __init__(self, rules: dict):
+        self.rules = list(rules.items())
+
+    def for_host(self, host: str) -> dict:
+        for pattern, policy in self.rules:
+            if fnmatch.fnmatch(host, pattern):
+                return policy
+        return {}
+
+
+class Entry:
+    """A complete cached response."""
+
+    __slots__ = ("status", "reason", "headers", "body", "expires", "etag")
+
+    def __init__(self, status: int, reason: str, headers: list, body: bytes, expires: float):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+        self.etag = _header(headers, "etag")
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+
+class LRUCache:
+    """Byte-bounded LRU of Entry objects."""
+
+    def __init__(self, max_bytes: int, max_object_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= time.time():
+            self._remove(key)
+            self.expired += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: Entry):
+        if entry.size > self.max_object_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        while self.entries and self.size + entry.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+        self.entries[key] = entry
+        self.size += entry.size
+
+    def _remove(self, key: str):
+        self.size -= self.entries.pop(key).size
+
+
+class CacheProxy:
+    """asyncio forward proxy with a shared response cache."""
+
+    def __init__(self, cache: LRUCache, policies: HostPolicies):
+        self.cache = cache
+        self.policies = policies
+        self.inflight = {}  # cache key → Future[Entry | None] for coalescing
+        self.ssl_context = ssl.create_default_context()
+        self.started = time.time()
+        self.counters = dict.fromkeys(
+            ("hits", "misses", "coalesced", "bypassed", "revalidated", "tunnels", "errors",
+             "bytes_from_cache", "bytes_from_origin"), 0,
+        )
+        self.host_counters = {}
+
+    # -- client side ---------------------------------------------------------
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await _read_head(reader)
+                if request is None:
+                    break
+                method, target, version, headers = request
+
+                if method == "CONNECT":
+                    await self._tunnel(target, reader, writer)
+                    return
+                if target.startswith("/"):
+                    await self._serve_local(target, writer)
+                else:
+                    body = await _read_request_body(reader, headers)
+                    await self._proxy(method, target, headers, body, writer)
+
+                if version == "HTTP/1.0" or "close" in _header(headers, "connection", "").lower():
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as exc:
+            logger.debug("Client connection ended: %s", exc)
+        finally:
+            writer.close()
+
+    async def _serve_local(self, path: str, writer):
+        """Requests addressed to the proxy itself."""
+        if path == "/__stats":
+            await _write_response(writer, 200, "OK", [("Content-Type", "application/json")],
+                                  json.dumps(self.stats(), indent=2).encode())
+        elif path == "/__health":
+            await _write_response(writer, 200, "OK", [("Content-Type", "text/plain")], b"ok")
+        else:
+            await _write_response(writer, 400, "Bad Request", [("Content-Type", "text/plain")],
+                                  b"Absolute-form request URI required")
+
+    async def _tunnel(self, target: str, reader, writer):
+        """CONNECT: splice the client to the upstream host."""
+        host, _, port = target.rpartition(":")
+        self.counters["tunnels"] += 1
+        try:
+            up_reader, up_writer = await asyncio.wait_for(
+                asyncio.open_connection(host, int(port)), UPSTREAM_TIMEOUT_SECONDS
+            )
+        except (OSError, ValueError, asyncio.TimeoutError) as exc:
+            self.counters["errors"] += 1
+            logger.warning("CONNECT %s failed: %s", target, exc)
+            await _write_response(writer, 502, "Bad Gateway", [], b"")
+            return
+
+        writer.write(b"HTTP/1.1 200 Connection Established\r\n\r\n")
+        await writer.drain()
+        await asyncio.gather(_pipe(reader, up_writer), _pipe(up_reader, writer))
+
+    async def _proxy(self, method: str, url: str, headers: list, body: bytes, writer):
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        policy = self.policies.for_host(host)
+        cacheable_request = (
+            method == "GET"
+            and policy.get("cache", True)
+            and not _header(headers, "authorization")
+            and "no-store" not in _header(headers, "cache-control", "")
+        )
+        if not cacheable_request:
+            self.counters["bypassed"] += 1
+            await self._fetch(method, url, headers, body, writer, key=None, policy=policy)
+            return
+
+        key = f"{url} {_header(headers, 'accept-encoding', '')}"
+        entry = self.cache.get(key)
+        if entry is None and key in self.inflight:
+            entry = await asyncio.shield(self.inflight[key])
+            if entry is not None:
+                self.counters["coalesced"] += 1
+        if entry is not None:
+            await self._serve_entry(entry, headers, writer, host)
+            return
+
+        self._count_host(host, "misses")
+        self.counters["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            stored = await self._fetch(method, url, headers, body, writer, key=key, policy=policy)
+            future.set_result(stored)
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            self.inflight.pop(key, None)
+
+    async def _serve_entry(self, entry: Entry, headers: list, writer, host: str):
+        self.counters["hits"] += 1
+        self._count_host(host, "hits")
+        if entry.etag and _header(headers, "if-none-match") == entry.etag:
+            self.counters["revalidated"] += 1
+            await _write_response(writer, 304, "Not Modified", [("ETag", entry.etag), ("X-Cache", "HIT")], b"")
+            return
+        self.counters["bytes_from_cache"] += len(entry.body)
+        await _write_response(writer, entry.status, entry.reason, entry.headers + [("X-Cache", "HIT")], entry.body)
+
+    # -- upstream side -------------------------------------------------------
+
+    async def _fetch(self, method, url, headers, body, writer, key, policy):
+        """Fetch from origin, stream to the client, and cache if allowed.
+
+        Returns the stored Entry, or None if the response wasn't cached.
+        """
+        parts = urlsplit(url)
+        secure = parts.scheme == "https"
+        port = parts.port or (443 if secure else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        try:
+            up_reader, up_writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    parts.hostname, port,
+                    ssl=self.ssl_context if secure else None,
+                    server_hostname=parts.hostname if secure else None,
+                ),
+                UPSTREAM_TIMEOUT_SECONDS,
+            )
+        except (OSError, asyncio.TimeoutError) as exc:
+            self.counters["errors"] += 1
+            logger.warning("Upstream connect to %s failed: %s", parts.netloc, exc)
+            await _write_response(writer, 502, "Bad Gateway", [], b"")
+            return None
+
+        try:
+            out = [f"{method} {path} HTTP/1.1", f"Host: {parts.netloc}", "Connection: close"]
+            out += [f"{k}: {v}" for k, v in headers if k.lower() not in HOP_BY_HOP and k.lower() != "host"]
+            if body:
+                out = [line for line in out if not line.lower().startswith("content-length:")]
+                out.append(f"Content-Length: {len(body)}")
+            up_writer.write(("\r\n".join(out) + "\r\n\r\n").encode("latin-1") + body)
+            await up_writer.drain()
+
+            head = await asyncio.wait_for(_read_status(up_reader), UPSTREAM_TIMEOUT_SECONDS)
+            status, reason, resp_headers = head
+            ttl = _ttl(status, resp_headers, policy) if key else None
+            forward = [(k, v) for k, v in resp_headers if k.lower() not in HOP_BY_HOP]
+            length = _header(resp_headers, "content-length")
+            no_body = method == "HEAD" or status in (204, 304) or 100 <= status < 200
+
+            # Length-less bodies are re-chunked (upstream framing is hop-by-hop)
+            chunked_out = not no_body and length is None
+            extra = [("X-Cache", "MISS" if key else "BYPASS")]
+            if chunked_out:
+                extra.append(("Transfer-Encoding", "chunked"))
+            writer.write(_status_head(status, reason, forward + extra))
+
+            kept = [] if ttl else None
+            kept_size = 0
+            if not no_body:
+                async for chunk in _iter_body(up_reader, resp_headers):
+                    self.counters["bytes_from_origin"] += len(chunk)
+                    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk) if chunked_out else chunk)
+                    await writer.drain()
+                    if kept is not None:
+                        kept_size += len(chunk)
+                        if kept_size > self.cache.max_object_bytes:
+                            kept = None
+                        else:
+                            kept.append(chunk)
+                if chunked_out:
+                    writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as exc:
+            self.counters["errors"] += 1
+            logger.warning("Upstream fetch of %s failed: %s", url, exc)
+            writer.close()
+            return None
+        finally:
+            up_writer.close()
+
+        if kept is None:
+            return None
+        body = b"".join(kept)
+        entry = Entry(status, reason, [(k, v) for k, v in forward if k.lower() != "content-length"]
+                      + [("Content-Length", str(len(body)))], body, time.time() + ttl)
+        self.cache.put(key, entry)
+        return entry
+
+    # -- stats ---------------------------------------------------------------
+
+    def _count_host(self, host: str, field: str):
+        counters = self.host_counters.setdefault(host, {"hits": 0, "misses": 0})
+        counters[field] += 1
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        top_hosts = sorted(self.host_counters.items(), key=lambda kv: -(kv[1]["hits"] + kv[1]["misses"]))[:20]
+        return {
+            **self.counters,
+            "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self.cache.entries),
+            "bytes_cached": self.cache.size,
+            "max_bytes": self.cache.max_bytes,
+            "evictions": self.cache.evictions,
+            "expired": self.cache.expired,
+            "uptime_seconds": int(time.time() - self.started),
+            "hosts": dict(top_hosts),
+        }
+
+    async def log_stats(self):
+        while True:
+            await asyncio.sleep(STATS_LOG_SECONDS)
+            logger.info("Cache stats: %s", json.dumps({k: v for k, v in self.stats().items() if k != "hosts"}))
+
+
+# -- HTTP helpers -------------------------------------------------------------
+
+def _header(headers: list, name: str, default=None):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return default
+
+
+def _parse_headers(lines: list) -> list:
+    headers = []
+    for line in lines:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers.append((key.strip(), value.strip()))
+    return headers
+
+
+async def _read_head(reader):
+    """Read a request head; None on clean EOF between requests."""
+    try:
+        raw = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as exc:
+        if not exc.partial:
+            return None
+        raise
+    except asyncio.LimitOverrunError:
+        raise ValueError("Request head too large")
+    lines = raw.decode("latin-1").split("\r\n")
+    method, target, version = lines[0].split(" ", 2)
+    return method.upper(), target, version, _parse_headers(lines[1:])
+
+
+async def _read_request_body(reader, headers: list) -> bytes:
+    length = _header(headers, "content-length")
+    if length:
+        return await reader.readexactly(int(length))
+    if "chunked" in _header(headers, "transfer-encoding", "").lower():
+        return b"".join([chunk async for chunk in _iter_chunked(reader)])
+    return b""
+
+
+async def _read_status(reader):
+    raw = await reader.readuntil(b"\r\n\r\n")
+    lines = raw.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ", 2)
+    return int(parts[1]), parts[2] if len(parts) > 2 else "", _parse_headers(lines[1:])
+
+
+async def _iter_body(reader, headers: list):
+    """Yield the (de-chunked) response body."""
+    if "chunked" in _header(headers, "transfer-encoding", "").lower():
+        async for chunk in _iter_chunked(reader):
+            yield chunk
+        return
+    length = _header(headers, "content-length")
+    remaining = int(length) if length is not None else None
+    while remaining is None or remaining > 0:
+        chunk = await reader.read(65536 if remaining is None else min(65536, remaining))
+        if not chunk:
+            if remaining:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            return
+        if remaining is not None:
+            remaining -= len(chunk)
+        yield chunk
+
+
+async def _iter_chunked(reader):
+    while True:
+        size_line = await reader.readuntil(b"\r\n")
+        size = int(size_line.split(b";", 1)[0].strip(), 16)
+        if size == 0:
+            # Skip trailers
+            while (await reader.readuntil(b"\r\n")) != b"\r\n":
+                pass
+            return
+        chunk = await reader.readexactly(size)
+        await reader.readexactly(2)
+        yield chunk
+
+
+def _status_head(status: int, reason: str, headers: list) -> bytes:
+    lines = [f"HTTP/1.1 {status} {reason}"] + [f"{k}: {v}" for k, v in headers]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def _write_response(writer, status: int, reason: str, headers: list, body: bytes):
+    headers = [(k, v) for k, v in headers if k.lower() != "content-length"]
+    writer.write(_status_head(status, reason, headers + [("Content-Length", str(len(body)))]) + body)
+    await writer.drain()
+
+
+async def _pipe(reader, writer):
+    try:
+        while chunk := await reader.read(65536):
+            writer.write(chunk)
+            await writer.drain()
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        writer.close()
+
+
+def _ttl(status: int, headers: list, policy: dict):
+    """Seconds a response may be served from cache, or None if it must not be cached."""
+    if status not in CACHEABLE_STATUS or _header(headers, "set-cookie"):
+        return None
+    vary = _header(headers, "vary", "")
+    if any(v.strip().lower() not in ("", "accept-encoding") for v in vary.split(",")):
+        return None
+
+    directives = {}
+    for part in _header(headers, "cache-control", "").lower().split(","):
+        name, _, value = part.strip().partition("=")
+        directives[name] = value.strip('"')
+    if {"no-store", "no-cache", "private"} & directives.keys():
+        return None
+
+    ttl = None
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name, "").isdigit():
+            ttl = int(directives[name])
+            break
+    if ttl is None and _header(headers, "expires"):
+        try:
+            expires = parsedate_to_datetime(_header(headers, "expires")).timestamp()
+            date_header = _header(headers, "date")
+            now = parsedate_to_datetime(date_header).timestamp() if date_header else time.time()
+            ttl = int(expires - now)
+        except (TypeError, ValueError):
+            ttl = 0
+    if ttl is None:
+        ttl = policy.get("default_ttl")
+    if ttl is None and _header(headers, "content-type", "").lower().startswith(STATIC_CONTENT_TYPES):
+        ttl = DEFAULT_STATIC_TTL
+    if ttl is None:
+        return None
+    if "max_ttl" in policy:
+        ttl = min(ttl, policy["max_ttl"])
+    return ttl if ttl > 0 else None
+
+
+async def serve(host: str, port: int, policies: HostPolicies):
+    proxy = CacheProxy(LRUCache(CACHE_MAX_BYTES, CACHE_MAX_OBJECT_BYTES), policies)
+    server = await asyncio.start_server(proxy.handle_client, host, port, limit=MAX_HEADER_BYTES)
+    logger.info("Cache proxy listening on %s:%d (cache %d MB)", host, port, CACHE_MAX_BYTES // (1024 * 1024))
+    asyncio.get_running_loop().create_task(proxy.log_stats())
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caching forward proxy for agent browser traffic")
+    parser.add_argument("--host", default=os.environ.get("PROXY_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PROXY_PORT", "3128")))
+    args = parser.parse_args()
+
+    policies = HostPolicies(json.loads(os.environ.get("CACHE_HOST_POLICIES", "{}")))
+    asyncio.run(serve(args.host, args.port, policies))
+
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,7 @@ resource "aws_amplify_app" "frontend" {
 
   environment_variables = {
     VITE_API_URL           = aws_api_gateway_stage.v1.invoke_url
+    VITE_WS_URL            = aws_apigatewayv2_stage.status_v1.invoke_url
     VITE_COGNITO_POOL_ID   = aws_cognito_user_pool.main.id
     VITE_COGNITO_CLIENT_ID = aws_cognito_user_pool_client.frontend.id
     VITE_AWS_REGION        = var.aws_region
@@ -25,7 +25,7 @@ resource "aws_api_gateway_authorizer" "rbac" {
   authorizer_uri                   = aws_lambda_function.authorizer.invoke_arn
   authorizer_credentials           = aws_iam_role.api_gw_authorizer.arn
   identity_source                  = "method.request.header.Authorization"
-  authorizer_result_ttl_in_seconds = 0
+  authorizer_result_ttl_in_seconds = var.authorizer_cache_ttl_seconds
 }
 
 # IAM role for API Gateway to invoke the authorizer Lambda
@@ -177,6 +177,222 @@ resource "aws_api_gateway_integration_response" "options_jobs" {
   }
 }
 
+# ============================================================================
+# /jobs/cancel
+# ============================================================================
+resource "aws_api_gateway_resource" "jobs_cancel" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  parent_id   = aws_api_gateway_resource.jobs.id
+  path_part   = "cancel"
+}
+
+# POST /jobs/cancel → cancel_job (bulk)
+resource "aws_api_gateway_method" "post_jobs_cancel" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.jobs_cancel.id
+  http_method   = "POST"
+  authorization = "CUSTOM"
+  authorizer_id = aws_api_gateway_authorizer.rbac.id
+}
+
+resource "aws_api_gateway_integration" "post_jobs_cancel" {
+  rest_api_id             = aws_api_gateway_rest_api.main.id
+  resource_id             = aws_api_gateway_resource.jobs_cancel.id
+  http_method             = aws_api_gateway_method.post_jobs_cancel.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.cancel_job.invoke_arn
+}
+
+# OPTIONS /jobs/cancel
+resource "aws_api_gateway_method" "options_jobs_cancel" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.jobs_cancel.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_jobs_cancel" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.jobs_cancel.id
+  http_method = aws_api_gateway_method.options_jobs_cancel.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_jobs_cancel" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.jobs_cancel.id
+  http_method = aws_api_gateway_method.options_jobs_cancel.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_jobs_cancel" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.jobs_cancel.id
+  http_method = aws_api_gateway_method.options_jobs_cancel.http_method
+  status_code = aws_api_gateway_method_response.options_jobs_cancel.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,Authorization'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+}
+
+# ============================================================================
+# /jobs/status
+# ============================================================================
+resource "aws_api_gateway_resource" "jobs_status" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  parent_id   = aws_api_gateway_resource.jobs.id
+  path_part   = "status"
+}
+
+# POST /jobs/status → get_status (batch)
+resource "aws_api_gateway_method" "post_jobs_status" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.jobs_status.id
+  http_method   = "POST"
+  authorization = "CUSTOM"
+  authorizer_id = aws_api_gateway_authorizer.rbac.id
+}
+
+resource "aws_api_gateway_integration" "post_jobs_status" {
+  rest_api_id             = aws_api_gateway_rest_api.main.id
+  resource_id             = aws_api_gateway_resource.jobs_status.id
+  http_method             = aws_api_gateway_method.post_jobs_status.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.get_status.invoke_arn
+}
+
+# OPTIONS /jobs/status
+resource "aws_api_gateway_method" "options_jobs_status" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.jobs_status.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_jobs_status" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.jobs_status.id
+  http_method = aws_api_gateway_method.options_jobs_status.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_jobs_status" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.jobs_status.id
+  http_method = aws_api_gateway_method.options_jobs_status.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_jobs_status" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.jobs_status.id
+  http_method = aws_api_gateway_method.options_jobs_status.http_method
+  status_code = aws_api_gateway_method_response.options_jobs_status.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,Authorization'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+}
+
+# ============================================================================
+# /jobs/stats
+# ============================================================================
+resource "aws_api_gateway_resource" "job_stats" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  parent_id   = aws_api_gateway_resource.jobs.id
+  path_part   = "stats"
+}
+
+# GET /jobs/stats → job_stats
+resource "aws_api_gateway_method" "get_job_stats" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.job_stats.id
+  http_method   = "GET"
+  authorization = "CUSTOM"
+  authorizer_id = aws_api_gateway_authorizer.rbac.id
+}
+
+resource "aws_api_gateway_integration" "get_job_stats" {
+  rest_api_id             = aws_api_gateway_rest_api.main.id
+  resource_id             = aws_api_gateway_resource.job_stats.id
+  http_method             = aws_api_gateway_method.get_job_stats.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.job_stats.invoke_arn
+}
+
+# OPTIONS /jobs/stats
+resource "aws_api_gateway_method" "options_job_stats" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.job_stats.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_job_stats" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.job_stats.id
+  http_method = aws_api_gateway_method.options_job_stats.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_job_stats" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.job_stats.id
+  http_method = aws_api_gateway_method.options_job_stats.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_job_stats" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.job_stats.id
+  http_method = aws_api_gateway_method.options_job_stats.http_method
+  status_code = aws_api_gateway_method_response.options_job_stats.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,Authorization'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+}
+
 # ============================================================================
 # /jobs/{task_id}
 # ============================================================================
@@ -208,6 +424,28 @@ resource "aws_api_gateway_integration" "get_job" {
   uri                     = aws_lambda_function.get_status.invoke_arn
 }
 
+# DELETE /jobs/{task_id} → cancel_job
+resource "aws_api_gateway_method" "delete_job" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.job_by_id.id
+  http_method   = "DELETE"
+  authorization = "CUSTOM"
+  authorizer_id = aws_api_gateway_authorizer.rbac.id
+
+  request_parameters = {
+    "method.request.path.task_id" = true
+  }
+}
+
+resource "aws_api_gateway_integration" "delete_job" {
+  rest_api_id             = aws_api_gateway_rest_api.main.id
+  resource_id             = aws_api_gateway_resource.job_by_id.id
+  http_method             = aws_api_gateway_method.delete_job.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.cancel_job.invoke_arn
+}
+
 # OPTIONS /jobs/{task_id}
 resource "aws_api_gateway_method" "options_job_by_id" {
   rest_api_id   = aws_api_gateway_rest_api.main.id
@@ -248,7 +486,7 @@ resource "aws_api_gateway_integration_response" "options_job_by_id" {
 
   response_parameters = {
     "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,Authorization'"
-    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,DELETE,OPTIONS'"
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
   }
 }
@@ -582,6 +820,9 @@ resource "aws_api_gateway_deployment" "main" {
       aws_api_gateway_resource.jobs.id,
       aws_api_gateway_resource.job_by_id.id,
       aws_api_gateway_resource.job_logs.id,
+      aws_api_gateway_resource.job_stats.id,
+      aws_api_gateway_resource.jobs_cancel.id,
+      aws_api_gateway_resource.jobs_status.id,
       aws_api_gateway_resource.tenants.id,
       aws_api_gateway_resource.tenants_register.id,
       aws_api_gateway_resource.tenants_users.id,
@@ -590,6 +831,10 @@ resource "aws_api_gateway_deployment" "main" {
       aws_api_gateway_method.post_jobs.id,
       aws_api_gateway_method.get_job.id,
       aws_api_gateway_method.get_logs.id,
+      aws_api_gateway_method.get_job_stats.id,
+      aws_api_gateway_method.delete_job.id,
+      aws_api_gateway_method.post_jobs_cancel.id,
+      aws_api_gateway_method.post_jobs_status.id,
       aws_api_gateway_method.post_register.id,
       aws_api_gateway_method.get_users.id,
       aws_api_gateway_method.post_users.id,
@@ -598,6 +843,10 @@ resource "aws_api_gateway_deployment" "main" {
       aws_api_gateway_integration.post_jobs.id,
       aws_api_gateway_integration.get_job.id,
       aws_api_gateway_integration.get_logs.id,
+      aws_api_gateway_integration.get_job_stats.id,
+      aws_api_gateway_integration.delete_job.id,
+      aws_api_gateway_integration.post_jobs_cancel.id,
+      aws_api_gateway_integration.post_jobs_status.id,
       aws_api_gateway_integration.post_register.id,
       aws_api_gateway_integration.get_users.id,
       aws_api_gateway_integration.post_users.id,
@@ -14,6 +14,15 @@ resource "aws_cloudwatch_log_group" "ecs_agent" {
   }
 }
 
+resource "aws_cloudwatch_log_group" "ecs_proxy" {
+  name              = "/ecs/${local.name_prefix}-proxy"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${local.name_prefix}-ecs-proxy-logs"
+  }
+}
+
 resource "aws_cloudwatch_log_group" "lambda_submit" {
   name              = "/aws/lambda/${local.name_prefix}-submit-job"
   retention_in_days = 7
@@ -86,6 +95,78 @@ resource "aws_cloudwatch_log_group" "lambda_manage_users" {
   }
 }
 
+resource "aws_cloudwatch_log_group" "lambda_ws_connections" {
+  name              = "/aws/lambda/${local.name_prefix}-ws-connections"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${local.name_prefix}-lambda-ws-connections-logs"
+  }
+}
+
+resource "aws_cloudwatch_log_group" "lambda_cancel_job" {
+  name              = "/aws/lambda/${local.name_prefix}-cancel-job"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${local.name_prefix}-lambda-cancel-job-logs"
+  }
+}
+
+resource "aws_cloudwatch_log_group" "lambda_job_stats" {
+  name              = "/aws/lambda/${local.name_prefix}-job-stats"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${local.name_prefix}-lambda-job-stats-logs"
+  }
+}
+
+resource "aws_cloudwatch_log_group" "lambda_publish_status" {
+  name              = "/aws/lambda/${local.name_prefix}-publish-status"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${local.name_prefix}-lambda-publish-status-logs"
+  }
+}
+
+resource "aws_cloudwatch_log_group" "lambda_index_jobs" {
+  name              = "/aws/lambda/${local.name_prefix}-index-jobs"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${local.name_prefix}-lambda-index-jobs-logs"
+  }
+}
+
+resource "aws_cloudwatch_log_group" "lambda_backfill_tenant_shard" {
+  name              = "/aws/lambda/${local.name_prefix}-backfill-tenant-shard"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${local.name_prefix}-lambda-backfill-tenant-shard-logs"
+  }
+}
+
+resource "aws_cloudwatch_log_group" "lambda_archive_tasks" {
+  name              = "/aws/lambda/${local.name_prefix}-archive-tasks"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${local.name_prefix}-lambda-archive-tasks-logs"
+  }
+}
+
+resource "aws_cloudwatch_log_group" "lambda_release_jobs" {
+  name              = "/aws/lambda/${local.name_prefix}-release-jobs"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${local.name_prefix}-lambda-release-jobs-logs"
+  }
+}
+
 
 # ---------------------------------------------------------------------------
 # Alarms — SQS DLQ messages (jobs failing repeatedly)
@@ -7,6 +7,10 @@ resource "aws_dynamodb_table" "tasks" {
   billing_mode = "PAY_PER_REQUEST"
   hash_key     = "task_id"
 
+  # Change feed for pushing status updates to WebSocket clients
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
   attribute {
     name = "task_id"
     type = "S"
@@ -17,12 +21,28 @@ resource "aws_dynamodb_table" "tasks" {
     type = "S"
   }
 
+  attribute {
+    name = "tenant_shard"
+    type = "S"
+  }
+
   attribute {
     name = "created_at"
     type = "S"
   }
 
-  # GSI for per-tenant queries
+  attribute {
+    name = "schedule_key"
+    type = "S"
+  }
+
+  attribute {
+    name = "run_at"
+    type = "S"
+  }
+
+  # Unsharded GSI list_jobs reads until the tenant_shard backfill is done
+  # (var.tenant_shard_backfill_complete); remove it in a later apply
   global_secondary_index {
     name            = "tenant-index"
     hash_key        = "tenant_id"
@@ -30,6 +50,25 @@ resource "aws_dynamodb_table" "tasks" {
     projection_type = "ALL"
   }
 
+  # GSI for per-tenant queries, write-sharded ("{tenant_id}#{n}") so one busy
+  # tenant isn't limited to a single partition (see common/tenant_index.py)
+  global_secondary_index {
+    name            = "tenant-shard-index"
+    hash_key        = "tenant_shard"
+    range_key       = "created_at"
+    projection_type = "ALL"
+  }
+
+  # Sparse GSI of SCHEDULED jobs by release time; only items carrying
+  # schedule_key appear in it (see common/schedule.py)
+  global_secondary_index {
+    name               = "schedule-index"
+    hash_key           = "schedule_key"
+    range_key          = "run_at"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["tenant_id", "query", "job_type", "created_at", "profile", "deadline_seconds"]
+  }
+
   # Auto-cleanup old records
   ttl {
     attribute_name = "ttl"
@@ -76,11 +115,13 @@ resource "aws_dynamodb_table" "users" {
     projection_type = "ALL"
   }
 
-  # GSI for looking up pending invitations by email
+  # GSI for looking up pending invitations by email — carries just what
+  # claiming an invitation needs, so no follow-up read of the base table
   global_secondary_index {
-    name            = "email-index"
-    hash_key        = "email"
-    projection_type = "ALL"
+    name               = "email-index"
+    hash_key           = "email"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["tenant_id", "role", "status", "created_at"]
   }
 
   point_in_time_recovery {
@@ -91,3 +132,103 @@ resource "aws_dynamodb_table" "users" {
     Name = "${local.name_prefix}-users"
   }
 }
+
+# ============================================================================
+# DynamoDB — WebSocket Connections
+# ============================================================================
+
+resource "aws_dynamodb_table" "ws_connections" {
+  name         = "${local.name_prefix}-ws-connections"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "connection_id"
+
+  attribute {
+    name = "connection_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "tenant_id"
+    type = "S"
+  }
+
+  # GSI for fanning a tenant's updates out to its connections
+  global_secondary_index {
+    name            = "tenant-index"
+    hash_key        = "tenant_id"
+    projection_type = "KEYS_ONLY"
+  }
+
+  # Connections that never sent $disconnect
+  ttl {
+    attribute_name = "ttl"
+    enabled        = true
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-ws-connections"
+  }
+}
+
+# ============================================================================
+# DynamoDB — Job Search Index
+# ============================================================================
+# Per-tenant inverted index over finished jobs, written by index_jobs and read
+# by GET /jobs?q= (common/search.py). Kept after tasks are archived.
+
+resource "aws_dynamodb_table" "job_search" {
+  name         = "${local.name_prefix}-job-search"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+  range_key    = "sk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "sk"
+    type = "S"
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-job-search"
+  }
+}
+
+# ============================================================================
+# DynamoDB — Job Latency Histograms
+# ============================================================================
+# One item per tenant, hour and metric ("2026-10-19T05#run"), with log-scale
+# bucket counters updated by process_job and the agent (common/latency.py)
+
+resource "aws_dynamodb_table" "job_stats" {
+  name         = "${local.name_prefix}-job-stats"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "tenant_id"
+  range_key    = "period"
+
+  attribute {
+    name = "tenant_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "period"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-job-stats"
+  }
+}
@@ -48,14 +48,30 @@ resource "aws_ecs_task_definition" "agent" {
           name  = "DYNAMODB_TABLE"
           value = aws_dynamodb_table.tasks.name
         },
+        {
+          name  = "STATS_TABLE"
+          value = aws_dynamodb_table.job_stats.name
+        },
         {
           name  = "AGENT_TIMEOUT_SECONDS"
           value = "1500"
+        },
+        {
+          name  = "DEADLINE_SECONDS"
+          value = tostring(var.agent_deadline_seconds)
+        },
+        {
+          name  = "TARGET_CONCURRENCY"
+          value = tostring(var.agent_target_concurrency)
+        },
+        {
+          name  = "BLOB_REFRESH_DAYS"
+          value = tostring(local.blob_refresh_days)
         }
       ]
 
       # These will be overridden per-task by Lambda
-      # TASK_ID, SEARCH_QUERY are injected via containerOverrides
+      # TASK_ID, SEARCH_QUERY, JOB_TYPE are injected via containerOverrides
 
       logConfiguration = {
         logDriver = "awslogs"
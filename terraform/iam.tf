@@ -74,14 +74,30 @@ resource "aws_iam_role_policy" "ecs_task" {
   policy = jsonencode({
     Version = "2012-10-17"
     Statement = [
-      # S3: upload task outputs
+      # S3: upload task outputs (content-addressed blobs + per-task markers)
+      # and read/refresh browser profiles
       {
         Effect = "Allow"
         Action = [
           "s3:PutObject",
           "s3:GetObject"
         ]
-        Resource = "${aws_s3_bucket.outputs.arn}/tasks/*"
+        Resource = [
+          "${aws_s3_bucket.outputs.arn}/tasks/*",
+          "${aws_s3_bucket.outputs.arn}/blobs/*",
+          "${aws_s3_bucket.outputs.arn}/profiles/*"
+        ]
+      },
+      # S3: HEAD/GET on a missing blob or profile returns 404 (not 403) only with ListBucket
+      {
+        Effect   = "Allow"
+        Action   = "s3:ListBucket"
+        Resource = aws_s3_bucket.outputs.arn
+        Condition = {
+          StringLike = {
+            "s3:prefix" = ["blobs/*", "profiles/*"]
+          }
+        }
       },
       # DynamoDB: update task status
       {
@@ -92,6 +108,12 @@ resource "aws_iam_role_policy" "ecs_task" {
         ]
         Resource = aws_dynamodb_table.tasks.arn
       },
+      # DynamoDB: provisioning/run/total latency histograms
+      {
+        Effect   = "Allow"
+        Action   = "dynamodb:UpdateItem"
+        Resource = aws_dynamodb_table.job_stats.arn
+      },
       # SSM: read credentials
       {
         Effect = "Allow"
@@ -235,6 +257,12 @@ resource "aws_iam_role_policy" "lambda_process" {
           "arn:aws:ecs:${var.aws_region}:${local.account_id}:task/${aws_ecs_cluster.main.name}/*"
         ]
       },
+      # Stops a container whose job was cancelled while RunTask was in flight
+      {
+        Effect   = "Allow"
+        Action   = "ecs:StopTask"
+        Resource = "arn:aws:ecs:${var.aws_region}:${local.account_id}:task/${aws_ecs_cluster.main.name}/*"
+      },
       {
         Effect = "Allow"
         Action = [
@@ -250,13 +278,17 @@ resource "aws_iam_role_policy" "lambda_process" {
         Action = [
           "dynamodb:UpdateItem"
         ]
-        Resource = aws_dynamodb_table.tasks.arn
+        Resource = [
+          aws_dynamodb_table.tasks.arn,
+          aws_dynamodb_table.job_stats.arn
+        ]
       },
       {
         Effect = "Allow"
         Action = [
           "sqs:ReceiveMessage",
           "sqs:DeleteMessage",
+          "sqs:ChangeMessageVisibility",
           "sqs:GetQueueAttributes"
         ]
         Resource = aws_sqs_queue.job_queue.arn
@@ -301,6 +333,7 @@ resource "aws_iam_role_policy" "lambda_status" {
         Effect = "Allow"
         Action = [
           "dynamodb:GetItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:Query"
         ]
         Resource = [
@@ -314,7 +347,10 @@ resource "aws_iam_role_policy" "lambda_status" {
           "s3:GetObject",
           "s3:HeadObject"
         ]
-        Resource = "${aws_s3_bucket.outputs.arn}/tasks/*"
+        Resource = [
+          "${aws_s3_bucket.outputs.arn}/tasks/*",
+          "${aws_s3_bucket.outputs.arn}/blobs/*"
+        ]
       }
     ]
   })
@@ -363,9 +399,29 @@ resource "aws_iam_role_policy" "lambda_logs" {
         Effect = "Allow"
         Action = [
           "logs:GetLogEvents",
-          "logs:DescribeLogStreams"
+          "logs:DescribeLogStreams",
+          "logs:FilterLogEvents"
         ]
-        Resource = "${aws_cloudwatch_log_group.ecs_agent.arn}:*"
+        Resource = [
+          aws_cloudwatch_log_group.ecs_agent.arn,
+          "${aws_cloudwatch_log_group.ecs_agent.arn}:*"
+        ]
+      },
+      {
+        Effect   = "Allow"
+        Action   = "s3:GetObject"
+        Resource = "${aws_s3_bucket.outputs.arn}/tasks/*"
+      },
+      # Lets a missing log index come back as NoSuchKey rather than AccessDenied
+      {
+        Effect   = "Allow"
+        Action   = "s3:ListBucket"
+        Resource = aws_s3_bucket.outputs.arn
+        Condition = {
+          StringLike = {
+            "s3:prefix" = ["tasks/*"]
+          }
+        }
       }
     ]
   })
@@ -412,6 +468,122 @@ resource "aws_iam_role_policy" "lambda_list_jobs" {
           aws_dynamodb_table.tasks.arn,
           "${aws_dynamodb_table.tasks.arn}/index/*"
         ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:Query",
+          "dynamodb:GetItem",
+          "dynamodb:BatchGetItem"
+        ]
+        Resource = aws_dynamodb_table.job_search.arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = "s3:GetObject"
+        Resource = "${aws_s3_bucket.archive.arn}/tasks/*"
+      },
+      # Lets a tenant with nothing archived come back as NoSuchKey rather than AccessDenied
+      {
+        Effect   = "Allow"
+        Action   = "s3:ListBucket"
+        Resource = aws_s3_bucket.archive.arn
+        Condition = {
+          StringLike = {
+            "s3:prefix" = ["tasks/*"]
+          }
+        }
+      }
+    ]
+  })
+}
+
+# ---------------------------------------------------------------------------
+# Lambda: Cancel Job Role
+# ---------------------------------------------------------------------------
+resource "aws_iam_role" "lambda_cancel_job" {
+  name = "${local.name_prefix}-lambda-cancel-job"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_cancel_job_basic" {
+  role       = aws_iam_role.lambda_cancel_job.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy" "lambda_cancel_job" {
+  name = "cancel-job-permissions"
+  role = aws_iam_role.lambda_cancel_job.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:UpdateItem"
+        ]
+        Resource = aws_dynamodb_table.tasks.arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = "ecs:StopTask"
+        Resource = "arn:aws:ecs:${var.aws_region}:${local.account_id}:task/${aws_ecs_cluster.main.name}/*"
+      }
+    ]
+  })
+}
+
+# ---------------------------------------------------------------------------
+# Lambda: Job Stats Role
+# ---------------------------------------------------------------------------
+resource "aws_iam_role" "lambda_job_stats" {
+  name = "${local.name_prefix}-lambda-job-stats"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_job_stats_basic" {
+  role       = aws_iam_role.lambda_job_stats.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy" "lambda_job_stats" {
+  name = "job-stats-permissions"
+  role = aws_iam_role.lambda_job_stats.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:Query"
+        ]
+        Resource = aws_dynamodb_table.job_stats.arn
       }
     ]
   })
@@ -502,6 +674,7 @@ resource "aws_iam_role_policy" "lambda_manage_users" {
         Effect = "Allow"
         Action = [
           "dynamodb:PutItem",
+          "dynamodb:BatchWriteItem",
           "dynamodb:GetItem",
           "dynamodb:DeleteItem",
           "dynamodb:Query"
@@ -514,3 +687,343 @@ resource "aws_iam_role_policy" "lambda_manage_users" {
     ]
   })
 }
+
+# ---------------------------------------------------------------------------
+# Lambda: WebSocket Connections Role
+# ---------------------------------------------------------------------------
+resource "aws_iam_role" "lambda_ws_connections" {
+  name = "${local.name_prefix}-lambda-ws-connections"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_ws_connections_basic" {
+  role       = aws_iam_role.lambda_ws_connections.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy" "lambda_ws_connections" {
+  name = "ws-connections-permissions"
+  role = aws_iam_role.lambda_ws_connections.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = aws_dynamodb_table.ws_connections.arn
+      }
+    ]
+  })
+}
+
+# ---------------------------------------------------------------------------
+# Lambda: Publish Status Role
+# ---------------------------------------------------------------------------
+resource "aws_iam_role" "lambda_publish_status" {
+  name = "${local.name_prefix}-lambda-publish-status"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_publish_status_basic" {
+  role       = aws_iam_role.lambda_publish_status.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy" "lambda_publish_status" {
+  name = "publish-status-permissions"
+  role = aws_iam_role.lambda_publish_status.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ]
+        Resource = aws_dynamodb_table.tasks.stream_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:Query",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = [
+          aws_dynamodb_table.ws_connections.arn,
+          "${aws_dynamodb_table.ws_connections.arn}/index/*"
+        ]
+      },
+      {
+        Effect   = "Allow"
+        Action   = "execute-api:ManageConnections"
+        Resource = "${aws_apigatewayv2_api.status.execution_arn}/*"
+      }
+    ]
+  })
+}
+
+# ---------------------------------------------------------------------------
+# Lambda: Index Jobs Role
+# ---------------------------------------------------------------------------
+resource "aws_iam_role" "lambda_index_jobs" {
+  name = "${local.name_prefix}-lambda-index-jobs"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_index_jobs_basic" {
+  role       = aws_iam_role.lambda_index_jobs.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy" "lambda_index_jobs" {
+  name = "index-jobs-permissions"
+  role = aws_iam_role.lambda_index_jobs.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ]
+        Resource = aws_dynamodb_table.tasks.stream_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:BatchWriteItem"
+        ]
+        Resource = aws_dynamodb_table.job_search.arn
+      },
+      # Result sets too large to be inline on the task item
+      {
+        Effect   = "Allow"
+        Action   = "s3:GetObject"
+        Resource = "${aws_s3_bucket.outputs.arn}/blobs/*"
+      }
+    ]
+  })
+}
+
+# ---------------------------------------------------------------------------
+# Lambda: Archive Tasks Role
+# ---------------------------------------------------------------------------
+resource "aws_iam_role" "lambda_archive_tasks" {
+  name = "${local.name_prefix}-lambda-archive-tasks"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_archive_tasks_basic" {
+  role       = aws_iam_role.lambda_archive_tasks.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy" "lambda_archive_tasks" {
+  name = "archive-tasks-permissions"
+  role = aws_iam_role.lambda_archive_tasks.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:Scan",
+          "dynamodb:BatchWriteItem"
+        ]
+        Resource = aws_dynamodb_table.tasks.arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject",
+          "s3:PutObjectTagging",
+          "s3:DeleteObject"
+        ]
+        Resource = "${aws_s3_bucket.archive.arn}/tasks/*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = "s3:ListBucket"
+        Resource = aws_s3_bucket.archive.arn
+        Condition = {
+          StringLike = {
+            "s3:prefix" = ["tasks/*"]
+          }
+        }
+      }
+    ]
+  })
+}
+
+# ---------------------------------------------------------------------------
+# Lambda: Release Jobs Role
+# ---------------------------------------------------------------------------
+resource "aws_iam_role" "lambda_release_jobs" {
+  name = "${local.name_prefix}-lambda-release-jobs"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_release_jobs_basic" {
+  role       = aws_iam_role.lambda_release_jobs.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy" "lambda_release_jobs" {
+  name = "release-jobs-permissions"
+  role = aws_iam_role.lambda_release_jobs.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = "dynamodb:Query"
+        Resource = "${aws_dynamodb_table.tasks.arn}/index/schedule-index"
+      },
+      {
+        Effect   = "Allow"
+        Action   = "dynamodb:UpdateItem"
+        Resource = aws_dynamodb_table.tasks.arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:GetQueueAttributes",
+          "sqs:SendMessage"
+        ]
+        Resource = aws_sqs_queue.job_queue.arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = "ecs:ListTasks"
+        Resource = "*"
+        Condition = {
+          ArnEquals = {
+            "ecs:cluster" = aws_ecs_cluster.main.arn
+          }
+        }
+      }
+    ]
+  })
+}
+
+# ---------------------------------------------------------------------------
+# Lambda: Backfill Tenant Shard Role
+# ---------------------------------------------------------------------------
+resource "aws_iam_role" "lambda_backfill_tenant_shard" {
+  name = "${local.name_prefix}-lambda-backfill-tenant-shard"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action = "sts:AssumeRole"
+        Effect = "Allow"
+        Principal = {
+          Service = "lambda.amazonaws.com"
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_backfill_tenant_shard_basic" {
+  role       = aws_iam_role.lambda_backfill_tenant_shard.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy" "lambda_backfill_tenant_shard" {
+  name = "backfill-tenant-shard-permissions"
+  role = aws_iam_role.lambda_backfill_tenant_shard.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:Scan",
+          "dynamodb:UpdateItem"
+        ]
+        Resource = aws_dynamodb_table.tasks.arn
+      }
+    ]
+  })
+}
@@ -2,6 +2,24 @@
 # Lambda Functions
 # ============================================================================
 
+# ---------------------------------------------------------------------------
+# Shared runtime layer (lambda/layer/python/common → importable as `common`)
+# ---------------------------------------------------------------------------
+data "archive_file" "common_layer" {
+  type        = "zip"
+  source_dir  = "${path.module}/../lambda/layer"
+  output_path = "${path.module}/.build/common_layer.zip"
+  excludes    = ["**/__pycache__/**"]
+}
+
+resource "aws_lambda_layer_version" "common" {
+  layer_name          = "${local.name_prefix}-common"
+  description         = "Shared AWS clients and API helpers for all functions"
+  filename            = data.archive_file.common_layer.output_path
+  source_code_hash    = data.archive_file.common_layer.output_base64sha256
+  compatible_runtimes = ["python3.12"]
+}
+
 # ---------------------------------------------------------------------------
 # Package Lambda code as zip archives
 # ---------------------------------------------------------------------------
@@ -29,6 +47,18 @@ data "archive_file" "get_logs" {
   output_path = "${path.module}/.build/get_logs.zip"
 }
 
+data "archive_file" "cancel_job" {
+  type        = "zip"
+  source_dir  = "${path.module}/../lambda/cancel_job"
+  output_path = "${path.module}/.build/cancel_job.zip"
+}
+
+data "archive_file" "job_stats" {
+  type        = "zip"
+  source_dir  = "${path.module}/../lambda/job_stats"
+  output_path = "${path.module}/.build/job_stats.zip"
+}
+
 data "archive_file" "list_jobs" {
   type        = "zip"
   source_dir  = "${path.module}/../lambda/list_jobs"
@@ -47,6 +77,42 @@ data "archive_file" "manage_users" {
   output_path = "${path.module}/.build/manage_users.zip"
 }
 
+data "archive_file" "ws_connections" {
+  type        = "zip"
+  source_dir  = "${path.module}/../lambda/ws_connections"
+  output_path = "${path.module}/.build/ws_connections.zip"
+}
+
+data "archive_file" "publish_status" {
+  type        = "zip"
+  source_dir  = "${path.module}/../lambda/publish_status"
+  output_path = "${path.module}/.build/publish_status.zip"
+}
+
+data "archive_file" "archive_tasks" {
+  type        = "zip"
+  source_dir  = "${path.module}/../lambda/archive_tasks"
+  output_path = "${path.module}/.build/archive_tasks.zip"
+}
+
+data "archive_file" "release_jobs" {
+  type        = "zip"
+  source_dir  = "${path.module}/../lambda/release_jobs"
+  output_path = "${path.module}/.build/release_jobs.zip"
+}
+
+data "archive_file" "backfill_tenant_shard" {
+  type        = "zip"
+  source_dir  = "${path.module}/../lambda/backfill_tenant_shard"
+  output_path = "${path.module}/.build/backfill_tenant_shard.zip"
+}
+
+data "archive_file" "index_jobs" {
+  type        = "zip"
+  source_dir  = "${path.module}/../lambda/index_jobs"
+  output_path = "${path.module}/.build/index_jobs.zip"
+}
+
 # ---------------------------------------------------------------------------
 # Authorizer Lambda — packaged with pip dependencies
 # ---------------------------------------------------------------------------
@@ -91,12 +157,15 @@ resource "aws_lambda_function" "authorizer" {
   memory_size      = 128
   filename         = data.archive_file.authorizer.output_path
   source_code_hash = data.archive_file.authorizer.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
 
   environment {
     variables = {
       USERS_TABLE   = aws_dynamodb_table.users.name
       USER_POOL_ID  = aws_cognito_user_pool.main.id
       APP_CLIENT_ID = aws_cognito_user_pool_client.frontend.id
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
     }
   }
 
@@ -117,11 +186,15 @@ resource "aws_lambda_function" "submit_job" {
   memory_size      = 128
   filename         = data.archive_file.submit_job.output_path
   source_code_hash = data.archive_file.submit_job.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
 
   environment {
     variables = {
-      DYNAMODB_TABLE = aws_dynamodb_table.tasks.name
-      SQS_QUEUE_URL  = aws_sqs_queue.job_queue.url
+      DYNAMODB_TABLE      = aws_dynamodb_table.tasks.name
+      SQS_QUEUE_URL       = aws_sqs_queue.job_queue.url
+      TENANT_INDEX_SHARDS = tostring(var.tenant_index_shards)
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
     }
   }
 
@@ -150,6 +223,7 @@ resource "aws_lambda_function" "process_job" {
   memory_size      = 256
   filename         = data.archive_file.process_job.output_path
   source_code_hash = data.archive_file.process_job.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
 
   environment {
     variables = {
@@ -159,7 +233,22 @@ resource "aws_lambda_function" "process_job" {
       SUBNETS         = join(",", aws_subnet.private[*].id)
       SECURITY_GROUP  = aws_security_group.agent.id
       S3_BUCKET       = aws_s3_bucket.outputs.id
+      STATS_TABLE     = aws_dynamodb_table.job_stats.name
+      SQS_QUEUE_URL   = aws_sqs_queue.job_queue.url
       CONTAINER_NAME  = "agent"
+      ASSET_CACHE_URL = var.enable_asset_proxy ? local.asset_proxy_url : ""
+
+      # Each concurrent container gets an equal share of the RunTask budget
+      RUN_TASK_RATE      = tostring(var.ecs_run_task_rate / var.process_job_max_concurrency)
+      RUN_TASK_BURST     = tostring(max(1, floor(var.ecs_run_task_burst / var.process_job_max_concurrency)))
+      MAX_RECEIVE_COUNT  = tostring(var.job_max_receive_count)
+      RETRY_BASE_SECONDS = "10"
+      RETRY_MAX_SECONDS  = "300"
+
+      # A dispatch claim is stale once the invocation holding it has timed out
+      CLAIM_TIMEOUT_SECONDS = "60"
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
     }
   }
 
@@ -171,9 +260,17 @@ resource "aws_lambda_function" "process_job" {
 resource "aws_lambda_event_source_mapping" "process_job_sqs" {
   event_source_arn                   = aws_sqs_queue.job_queue.arn
   function_name                      = aws_lambda_function.process_job.arn
-  batch_size                         = 1
+  batch_size                         = var.process_job_batch_size
   maximum_batching_window_in_seconds = 0
   enabled                            = true
+
+  # Only messages with transient RunTask failures are redelivered
+  function_response_types = ["ReportBatchItemFailures"]
+
+  # Bounds the number of containers sharing the RunTask budget
+  scaling_config {
+    maximum_concurrency = var.process_job_max_concurrency
+  }
 }
 
 # ---------------------------------------------------------------------------
@@ -188,12 +285,15 @@ resource "aws_lambda_function" "get_status" {
   memory_size      = 128
   filename         = data.archive_file.get_status.output_path
   source_code_hash = data.archive_file.get_status.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
 
   environment {
     variables = {
       DYNAMODB_TABLE = aws_dynamodb_table.tasks.name
       S3_BUCKET      = aws_s3_bucket.outputs.id
       PRESIGN_EXPIRY = "3600"
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
     }
   }
 
@@ -222,6 +322,7 @@ resource "aws_lambda_function" "get_logs" {
   memory_size      = 128
   filename         = data.archive_file.get_logs.output_path
   source_code_hash = data.archive_file.get_logs.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
 
   environment {
     variables = {
@@ -229,6 +330,9 @@ resource "aws_lambda_function" "get_logs" {
       LOG_GROUP         = aws_cloudwatch_log_group.ecs_agent.name
       LOG_STREAM_PREFIX = "agent"
       CONTAINER_NAME    = "agent"
+      S3_BUCKET         = aws_s3_bucket.outputs.id
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
     }
   }
 
@@ -245,6 +349,77 @@ resource "aws_lambda_permission" "get_logs_apigw" {
   source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
 }
 
+# ---------------------------------------------------------------------------
+# Cancel Job Lambda
+# ---------------------------------------------------------------------------
+resource "aws_lambda_function" "cancel_job" {
+  function_name    = "${local.name_prefix}-cancel-job"
+  role             = aws_iam_role.lambda_cancel_job.arn
+  handler          = "handler.handler"
+  runtime          = "python3.12"
+  timeout          = 60
+  memory_size      = 256
+  filename         = data.archive_file.cancel_job.output_path
+  source_code_hash = data.archive_file.cancel_job.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
+
+  environment {
+    variables = {
+      DYNAMODB_TABLE = aws_dynamodb_table.tasks.name
+      ECS_CLUSTER    = aws_ecs_cluster.main.arn
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
+    }
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-cancel-job"
+  }
+}
+
+resource "aws_lambda_permission" "cancel_job_apigw" {
+  statement_id  = "AllowAPIGatewayInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.cancel_job.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
+}
+
+# ---------------------------------------------------------------------------
+# Job Stats Lambda
+# ---------------------------------------------------------------------------
+resource "aws_lambda_function" "job_stats" {
+  function_name    = "${local.name_prefix}-job-stats"
+  role             = aws_iam_role.lambda_job_stats.arn
+  handler          = "handler.handler"
+  runtime          = "python3.12"
+  timeout          = 30
+  memory_size      = 128
+  filename         = data.archive_file.job_stats.output_path
+  source_code_hash = data.archive_file.job_stats.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
+
+  environment {
+    variables = {
+      STATS_TABLE = aws_dynamodb_table.job_stats.name
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
+    }
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-job-stats"
+  }
+}
+
+resource "aws_lambda_permission" "job_stats_apigw" {
+  statement_id  = "AllowAPIGatewayInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.job_stats.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
+}
+
 # ---------------------------------------------------------------------------
 # List Jobs Lambda
 # ---------------------------------------------------------------------------
@@ -257,10 +432,17 @@ resource "aws_lambda_function" "list_jobs" {
   memory_size      = 128
   filename         = data.archive_file.list_jobs.output_path
   source_code_hash = data.archive_file.list_jobs.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
 
   environment {
     variables = {
-      DYNAMODB_TABLE = aws_dynamodb_table.tasks.name
+      DYNAMODB_TABLE      = aws_dynamodb_table.tasks.name
+      ARCHIVE_BUCKET      = aws_s3_bucket.archive.id
+      SEARCH_TABLE        = aws_dynamodb_table.job_search.name
+      TENANT_INDEX_SHARDS = tostring(var.tenant_index_shards)
+      LEGACY_TENANT_INDEX = tostring(!var.tenant_shard_backfill_complete)
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
     }
   }
 
@@ -289,10 +471,13 @@ resource "aws_lambda_function" "register_tenant" {
   memory_size      = 128
   filename         = data.archive_file.register_tenant.output_path
   source_code_hash = data.archive_file.register_tenant.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
 
   environment {
     variables = {
       USERS_TABLE = aws_dynamodb_table.users.name
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
     }
   }
 
@@ -321,11 +506,14 @@ resource "aws_lambda_function" "manage_users" {
   memory_size      = 128
   filename         = data.archive_file.manage_users.output_path
   source_code_hash = data.archive_file.manage_users.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
 
   environment {
     variables = {
       USERS_TABLE  = aws_dynamodb_table.users.name
       USER_POOL_ID = aws_cognito_user_pool.main.id
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
     }
   }
 
@@ -341,3 +529,263 @@ resource "aws_lambda_permission" "manage_users_apigw" {
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
 }
+
+# ---------------------------------------------------------------------------
+# WebSocket Connections Lambda ($connect / $disconnect / $default)
+# ---------------------------------------------------------------------------
+resource "aws_lambda_function" "ws_connections" {
+  function_name    = "${local.name_prefix}-ws-connections"
+  role             = aws_iam_role.lambda_ws_connections.arn
+  handler          = "handler.handler"
+  runtime          = "python3.12"
+  timeout          = 10
+  memory_size      = 128
+  filename         = data.archive_file.ws_connections.output_path
+  source_code_hash = data.archive_file.ws_connections.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
+
+  environment {
+    variables = {
+      CONNECTIONS_TABLE = aws_dynamodb_table.ws_connections.name
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
+    }
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-ws-connections"
+  }
+}
+
+resource "aws_lambda_permission" "ws_connections_apigw" {
+  statement_id  = "AllowAPIGatewayInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ws_connections.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.status.execution_arn}/*/*"
+}
+
+# ---------------------------------------------------------------------------
+# Publish Status Lambda (tasks table stream → WebSocket clients)
+# ---------------------------------------------------------------------------
+resource "aws_lambda_function" "publish_status" {
+  function_name    = "${local.name_prefix}-publish-status"
+  role             = aws_iam_role.lambda_publish_status.arn
+  handler          = "handler.handler"
+  runtime          = "python3.12"
+  timeout          = 30
+  memory_size      = 256
+  filename         = data.archive_file.publish_status.output_path
+  source_code_hash = data.archive_file.publish_status.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
+
+  environment {
+    variables = {
+      CONNECTIONS_TABLE  = aws_dynamodb_table.ws_connections.name
+      WEBSOCKET_ENDPOINT = "https://${aws_apigatewayv2_api.status.id}.execute-api.${var.aws_region}.amazonaws.com/${aws_apigatewayv2_stage.status_v1.name}"
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
+    }
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-publish-status"
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "publish_status_stream" {
+  event_source_arn                   = aws_dynamodb_table.tasks.stream_arn
+  function_name                      = aws_lambda_function.publish_status.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 1
+  maximum_retry_attempts             = 2
+  bisect_batch_on_function_error     = true
+}
+
+# ---------------------------------------------------------------------------
+# Index Jobs Lambda (tasks table stream → per-tenant search index)
+# ---------------------------------------------------------------------------
+resource "aws_lambda_function" "index_jobs" {
+  function_name    = "${local.name_prefix}-index-jobs"
+  role             = aws_iam_role.lambda_index_jobs.arn
+  handler          = "handler.handler"
+  runtime          = "python3.12"
+  timeout          = 60
+  memory_size      = 256
+  filename         = data.archive_file.index_jobs.output_path
+  source_code_hash = data.archive_file.index_jobs.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
+
+  environment {
+    variables = {
+      SEARCH_TABLE = aws_dynamodb_table.job_search.name
+      S3_BUCKET    = aws_s3_bucket.outputs.id
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
+    }
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-index-jobs"
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "index_jobs_stream" {
+  event_source_arn                   = aws_dynamodb_table.tasks.stream_arn
+  function_name                      = aws_lambda_function.index_jobs.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 25
+  maximum_batching_window_in_seconds = 5
+  maximum_retry_attempts             = 5
+  bisect_batch_on_function_error     = true
+
+  # Only writes that leave a job finished; the handler skips finished → finished
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName = ["INSERT", "MODIFY"]
+        dynamodb = {
+          NewImage = {
+            status = { S = ["COMPLETED", "FAILED", "CANCELLED", "TIMED_OUT"] }
+          }
+        }
+      })
+    }
+  }
+}
+
+# ---------------------------------------------------------------------------
+# Archive Tasks Lambda (daily: terminal tasks → per-tenant files in S3)
+# ---------------------------------------------------------------------------
+resource "aws_lambda_function" "archive_tasks" {
+  function_name    = "${local.name_prefix}-archive-tasks"
+  role             = aws_iam_role.lambda_archive_tasks.arn
+  handler          = "handler.handler"
+  runtime          = "python3.12"
+  timeout          = 900
+  memory_size      = 512
+  filename         = data.archive_file.archive_tasks.output_path
+  source_code_hash = data.archive_file.archive_tasks.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
+
+  # Runs never overlap, so each tenant index has a single writer
+  reserved_concurrent_executions = 1
+
+  environment {
+    variables = {
+      DYNAMODB_TABLE     = aws_dynamodb_table.tasks.name
+      ARCHIVE_BUCKET     = aws_s3_bucket.archive.id
+      ARCHIVE_AFTER_DAYS = var.archive_after_days
+      RETENTION_DAYS     = var.task_archive_retention_days
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
+    }
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-archive-tasks"
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "archive_tasks" {
+  name                = "${local.name_prefix}-archive-tasks"
+  description         = "Move old terminal tasks from DynamoDB to the S3 archive"
+  schedule_expression = "cron(30 2 * * ? *)"
+}
+
+resource "aws_cloudwatch_event_target" "archive_tasks" {
+  rule = aws_cloudwatch_event_rule.archive_tasks.name
+  arn  = aws_lambda_function.archive_tasks.arn
+}
+
+resource "aws_lambda_permission" "archive_tasks_schedule" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.archive_tasks.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.archive_tasks.arn
+}
+
+# ---------------------------------------------------------------------------
+# Release Jobs Lambda (every minute: scheduled jobs → job queue, as room allows)
+# ---------------------------------------------------------------------------
+resource "aws_lambda_function" "release_jobs" {
+  function_name    = "${local.name_prefix}-release-jobs"
+  role             = aws_iam_role.lambda_release_jobs.arn
+  handler          = "handler.handler"
+  runtime          = "python3.12"
+  timeout          = 60
+  memory_size      = 256
+  filename         = data.archive_file.release_jobs.output_path
+  source_code_hash = data.archive_file.release_jobs.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
+
+  # One run at a time, so capacity isn't counted twice
+  reserved_concurrent_executions = 1
+
+  environment {
+    variables = {
+      DYNAMODB_TABLE    = aws_dynamodb_table.tasks.name
+      SQS_QUEUE_URL     = aws_sqs_queue.job_queue.url
+      ECS_CLUSTER       = aws_ecs_cluster.main.arn
+      AGENT_TASK_FAMILY = aws_ecs_task_definition.agent.family
+      MAX_ACTIVE_JOBS   = var.scheduler_max_active_jobs
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
+    }
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-release-jobs"
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "release_jobs" {
+  name                = "${local.name_prefix}-release-jobs"
+  description         = "Queue due scheduled and low-priority jobs while there is capacity"
+  schedule_expression = "rate(1 minute)"
+}
+
+resource "aws_cloudwatch_event_target" "release_jobs" {
+  rule = aws_cloudwatch_event_rule.release_jobs.name
+  arn  = aws_lambda_function.release_jobs.arn
+}
+
+resource "aws_lambda_permission" "release_jobs_schedule" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.release_jobs.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.release_jobs.arn
+}
+
+# ---------------------------------------------------------------------------
+# Backfill Tenant Shard Lambda (one-off: tenant_shard on pre-sharding tasks)
+# ---------------------------------------------------------------------------
+resource "aws_lambda_function" "backfill_tenant_shard" {
+  function_name    = "${local.name_prefix}-backfill-tenant-shard"
+  role             = aws_iam_role.lambda_backfill_tenant_shard.arn
+  handler          = "handler.handler"
+  runtime          = "python3.12"
+  timeout          = 900
+  memory_size      = 256
+  filename         = data.archive_file.backfill_tenant_shard.output_path
+  source_code_hash = data.archive_file.backfill_tenant_shard.output_base64sha256
+  layers           = [aws_lambda_layer_version.common.arn]
+
+  reserved_concurrent_executions = 1
+
+  environment {
+    variables = {
+      DYNAMODB_TABLE      = aws_dynamodb_table.tasks.name
+      TENANT_INDEX_SHARDS = tostring(var.tenant_index_shards)
+
+      TRACE_SAMPLE_RATE = tostring(var.aws_call_trace_sample_rate)
+    }
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-backfill-tenant-shard"
+  }
+}
@@ -7,21 +7,41 @@ output "api_gateway_url" {
   value       = aws_api_gateway_stage.v1.invoke_url
 }
 
+output "websocket_url" {
+  description = "WebSocket URL for push-based job status updates"
+  value       = aws_apigatewayv2_stage.status_v1.invoke_url
+}
+
 output "ecr_repository_url" {
   description = "ECR repository URL for the agent image"
   value       = aws_ecr_repository.agent.repository_url
 }
 
+output "proxy_ecr_repository_url" {
+  description = "ECR repository URL for the asset cache proxy image"
+  value       = aws_ecr_repository.proxy.repository_url
+}
+
 output "s3_bucket_name" {
   description = "S3 bucket for task outputs"
   value       = aws_s3_bucket.outputs.id
 }
 
+output "archive_bucket_name" {
+  description = "S3 bucket holding archived tasks"
+  value       = aws_s3_bucket.archive.id
+}
+
 output "dynamodb_table_name" {
   description = "DynamoDB table name"
   value       = aws_dynamodb_table.tasks.name
 }
 
+output "backfill_tenant_shard_function" {
+  description = "One-off Lambda that shards pre-existing tasks (make backfill-tenant-shards)"
+  value       = aws_lambda_function.backfill_tenant_shard.function_name
+}
+
 output "ecs_cluster_name" {
   description = "ECS cluster name"
   value       = aws_ecs_cluster.main.name
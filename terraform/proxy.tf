@@ -1,5 +1,196 @@
 # ============================================================================
-# Proxy — DISABLED
+# Asset Cache Proxy — shared HTTP cache for agent browser traffic
 # ============================================================================
-# Proxy layer has been removed. To re-enable, restore the Squid forward proxy
-# ECS service, NLB, target group, and listener resources.
+# A small ECS service running proxy/cache_proxy.py. Agents reach it at
+# proxy.<namespace>:3128 (Cloud Map) and route static assets through it,
+# so the fleet downloads common CSS/JS/fonts once instead of once per task.
+# Disable with enable_asset_proxy = false.
+
+locals {
+  asset_proxy_port = 3128
+  asset_proxy_url  = "http://proxy.${local.name_prefix}.internal:${local.asset_proxy_port}"
+}
+
+# ---------------------------------------------------------------------------
+# Image repository
+# ---------------------------------------------------------------------------
+resource "aws_ecr_repository" "proxy" {
+  name                 = "${local.name_prefix}-proxy"
+  image_tag_mutability = "MUTABLE"
+  force_delete         = true
+
+  image_scanning_configuration {
+    scan_on_push = true
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-proxy"
+  }
+}
+
+resource "aws_ecr_lifecycle_policy" "proxy" {
+  repository = aws_ecr_repository.proxy.name
+
+  policy = jsonencode({
+    rules = [
+      {
+        rulePriority = 1
+        description  = "Keep last 5 images"
+        selection = {
+          tagStatus   = "any"
+          countType   = "imageCountMoreThan"
+          countNumber = 5
+        }
+        action = {
+          type = "expire"
+        }
+      }
+    ]
+  })
+}
+
+# ---------------------------------------------------------------------------
+# Service discovery
+# ---------------------------------------------------------------------------
+resource "aws_service_discovery_private_dns_namespace" "internal" {
+  name        = "${local.name_prefix}.internal"
+  description = "Private DNS for internal services"
+  vpc         = aws_vpc.main.id
+}
+
+resource "aws_service_discovery_service" "proxy" {
+  name = "proxy"
+
+  dns_config {
+    namespace_id   = aws_service_discovery_private_dns_namespace.internal.id
+    routing_policy = "MULTIVALUE"
+
+    dns_records {
+      type = "A"
+      ttl  = 10
+    }
+  }
+
+  health_check_custom_config {
+    failure_threshold = 1
+  }
+}
+
+# ---------------------------------------------------------------------------
+# Security group — reachable from agent tasks only
+# ---------------------------------------------------------------------------
+resource "aws_security_group" "proxy" {
+  name_prefix = "${local.name_prefix}-proxy-"
+  description = "Security group for the asset cache proxy"
+  vpc_id      = aws_vpc.main.id
+
+  ingress {
+    description     = "Proxy traffic from agents"
+    from_port       = local.asset_proxy_port
+    to_port         = local.asset_proxy_port
+    protocol        = "tcp"
+    security_groups = [aws_security_group.agent.id]
+  }
+
+  # Allow all outbound (internet via NAT)
+  egress {
+    description = "Allow all outbound"
+    from_port   = 0
+    to_port     = 0
+    protocol    = "-1"
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-proxy-sg"
+  }
+
+  lifecycle {
+    create_before_destroy = true
+  }
+}
+
+# ---------------------------------------------------------------------------
+# Task definition & service
+# ---------------------------------------------------------------------------
+resource "aws_ecs_task_definition" "proxy" {
+  family                   = "${local.name_prefix}-proxy"
+  requires_compatibilities = ["FARGATE"]
+  network_mode             = "awsvpc"
+  cpu                      = var.asset_proxy_cpu
+  memory                   = var.asset_proxy_memory
+  execution_role_arn       = aws_iam_role.ecs_execution.arn
+
+  container_definitions = jsonencode([
+    {
+      name      = "proxy"
+      image     = "${aws_ecr_repository.proxy.repository_url}:latest"
+      essential = true
+
+      portMappings = [
+        {
+          containerPort = local.asset_proxy_port
+          protocol      = "tcp"
+        }
+      ]
+
+      environment = [
+        {
+          name  = "PROXY_PORT"
+          value = tostring(local.asset_proxy_port)
+        },
+        {
+          name  = "CACHE_MAX_BYTES"
+          value = tostring(var.asset_proxy_cache_mb * 1024 * 1024)
+        },
+        {
+          name  = "CACHE_HOST_POLICIES"
+          value = jsonencode(var.asset_proxy_host_policies)
+        }
+      ]
+
+      logConfiguration = {
+        logDriver = "awslogs"
+        options = {
+          "awslogs-group"         = aws_cloudwatch_log_group.ecs_proxy.name
+          "awslogs-region"        = var.aws_region
+          "awslogs-stream-prefix" = "proxy"
+        }
+      }
+
+      healthCheck = {
+        command     = ["CMD-SHELL", "python -c \"import urllib.request; urllib.request.urlopen('http://127.0.0.1:${local.asset_proxy_port}/__health', timeout=3)\""]
+        interval    = 30
+        timeout     = 5
+        retries     = 3
+        startPeriod = 10
+      }
+    }
+  ])
+
+  tags = {
+    Name = "${local.name_prefix}-proxy"
+  }
+}
+
+resource "aws_ecs_service" "proxy" {
+  name            = "${local.name_prefix}-proxy"
+  cluster         = aws_ecs_cluster.main.id
+  task_definition = aws_ecs_task_definition.proxy.arn
+  desired_count   = var.enable_asset_proxy ? var.asset_proxy_count : 0
+  launch_type     = "FARGATE"
+
+  network_configuration {
+    subnets          = aws_subnet.private[*].id
+    security_groups  = [aws_security_group.proxy.id]
+    assign_public_ip = false
+  }
+
+  service_registries {
+    registry_arn = aws_service_discovery_service.proxy.arn
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-proxy"
+  }
+}
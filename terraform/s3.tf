@@ -32,7 +32,19 @@ resource "aws_s3_bucket_server_side_encryption_configuration" "outputs" {
   }
 }
 
-# Lifecycle — delete objects after 30 days
+locals {
+  output_retention_days = 30
+  # The agent copies a re-used blob onto itself once it is older than this
+  # (BLOB_REFRESH_DAYS), so its last write can lag its last use by this much
+  blob_refresh_days = 7
+}
+
+# Lifecycle — delete task outputs and profiles after 30 days. Blobs
+# (blobs/{sha256}) shared by several tasks are refreshed on re-use at most
+# every blob_refresh_days, so they get that much longer: every blob outlives
+# its most recent use by at least 30 days. Superseded blob versions are
+# dropped after a day. The rules are split by prefix because S3 applies the
+# shortest of overlapping expirations.
 resource "aws_s3_bucket_lifecycle_configuration" "outputs" {
   bucket = aws_s3_bucket.outputs.id
 
@@ -40,10 +52,67 @@ resource "aws_s3_bucket_lifecycle_configuration" "outputs" {
     id     = "cleanup-old-outputs"
     status = "Enabled"
 
-    filter {}
+    filter {
+      prefix = "tasks/"
+    }
+
+    expiration {
+      days = local.output_retention_days
+    }
+  }
+
+  rule {
+    id     = "cleanup-old-profiles"
+    status = "Enabled"
+
+    filter {
+      prefix = "profiles/"
+    }
+
+    expiration {
+      days = local.output_retention_days
+    }
+  }
+
+  rule {
+    id     = "cleanup-unused-blobs"
+    status = "Enabled"
+
+    filter {
+      prefix = "blobs/"
+    }
 
     expiration {
-      days = 30
+      days = local.output_retention_days + local.blob_refresh_days
+    }
+  }
+
+  rule {
+    id     = "cleanup-refreshed-blob-versions"
+    status = "Enabled"
+
+    filter {
+      prefix = "blobs/"
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days = 1
+    }
+  }
+
+  # Browser profiles (profiles/{tenant}/{name}.json.gz) get a new version on
+  # every refresh; keep the last few superseded snapshots to roll back to
+  rule {
+    id     = "cleanup-old-profile-versions"
+    status = "Enabled"
+
+    filter {
+      prefix = "profiles/"
+    }
+
+    noncurrent_version_expiration {
+      noncurrent_days           = 7
+      newer_noncurrent_versions = 5
     }
   }
 }
@@ -56,3 +125,61 @@ resource "aws_s3_bucket_versioning" "outputs" {
     status = "Enabled"
   }
 }
+
+# ============================================================================
+# S3 — Task Archive
+# ============================================================================
+# Terminal tasks moved out of DynamoDB by the archive_tasks Lambda, as
+# per-tenant daily gzip JSONL files. Kept apart from the outputs bucket so its
+# 30-day expiry doesn't apply; day files are replaced rather than versioned.
+
+resource "aws_s3_bucket" "archive" {
+  bucket_prefix = "${local.name_prefix}-archive-"
+  force_destroy = true
+
+  tags = {
+    Name = "${local.name_prefix}-archive"
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "archive" {
+  bucket = aws_s3_bucket.archive.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "archive" {
+  bucket = aws_s3_bucket.archive.id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
+resource "aws_s3_bucket_lifecycle_configuration" "archive" {
+  count  = var.task_archive_retention_days > 0 ? 1 : 0
+  bucket = aws_s3_bucket.archive.id
+
+  rule {
+    id     = "expire-archived-tasks"
+    status = "Enabled"
+
+    # Day files only (common/archive.py DAY_FILE_TAG): index.json must outlive
+    # them, and archive_tasks prunes its expired entries
+    filter {
+      tag {
+        key   = "archive-object"
+        value = "day-file"
+      }
+    }
+
+    expiration {
+      days = var.task_archive_retention_days
+    }
+  }
+}
@@ -17,7 +17,7 @@ resource "aws_sqs_queue" "job_queue" {
   # DLQ configuration
   redrive_policy = jsonencode({
     deadLetterTargetArn = aws_sqs_queue.job_dlq.arn
-    maxReceiveCount     = 3
+    maxReceiveCount     = var.job_max_receive_count
   })
 
   tags = {
@@ -32,12 +32,118 @@ variable "agent_memory" {
   default     = 2048
 }
 
+variable "aws_call_trace_sample_rate" {
+  description = "Share of Lambda invocations (0-1) that report per-operation AWS call metrics as EMF"
+  type        = number
+  default     = 0.1
+}
+
+variable "tenant_index_shards" {
+  description = "Write shards per tenant in the tasks table's tenant index; may only grow once deployed"
+  type        = number
+  default     = 8
+}
+
+variable "tenant_shard_backfill_complete" {
+  description = "Set once backfill_tenant_shard reports complete and tenant-shard-index is ACTIVE; list_jobs then reads the sharded index"
+  type        = bool
+  default     = false
+}
+
+variable "scheduler_max_active_jobs" {
+  description = "Queued plus running jobs above which release_jobs holds back scheduled and low-priority jobs"
+  type        = number
+  default     = 100
+}
+
+variable "agent_deadline_seconds" {
+  description = "Default job deadline; jobs may set their own (deadline_seconds) up to 1440"
+  type        = number
+  default     = 1200
+}
+
+variable "agent_target_concurrency" {
+  description = "Concurrent browser pages per MULTI_TARGET job (~250 MiB of agent_memory each)"
+  type        = number
+  default     = 4
+}
+
+variable "enable_asset_proxy" {
+  description = "Route agent static assets through the shared cache proxy (proxy.tf)"
+  type        = bool
+  default     = true
+}
+
+variable "asset_proxy_count" {
+  description = "Number of cache proxy tasks (each keeps its own cache; DNS spreads agents across them). At least one per AZ"
+  type        = number
+  default     = 2
+}
+
+variable "asset_proxy_cpu" {
+  description = "CPU units for the cache proxy ECS task"
+  type        = number
+  default     = 512
+}
+
+variable "asset_proxy_memory" {
+  description = "Memory (MiB) for the cache proxy ECS task"
+  type        = number
+  default     = 1024
+}
+
+variable "asset_proxy_cache_mb" {
+  description = "In-memory cache size per proxy task (MiB); keep well under asset_proxy_memory"
+  type        = number
+  default     = 640
+}
+
+variable "asset_proxy_host_policies" {
+  description = "Per-host cache policies, host glob → {cache, default_ttl, max_ttl}; first match wins"
+  type        = any
+  default = {
+    "fonts.gstatic.com"    = { default_ttl = 604800 }
+    "fonts.googleapis.com" = { default_ttl = 86400 }
+    "*.gstatic.com"        = { default_ttl = 86400 }
+  }
+}
+
 variable "max_concurrent_jobs" {
   description = "Maximum concurrent jobs allowed"
   type        = number
   default     = 10
 }
 
+variable "ecs_run_task_rate" {
+  description = "Sustained ECS RunTask launches per second across all process_job containers"
+  type        = number
+  default     = 20
+}
+
+variable "ecs_run_task_burst" {
+  description = "ECS RunTask burst size across all process_job containers"
+  type        = number
+  default     = 100
+}
+
+variable "process_job_max_concurrency" {
+  description = "Maximum concurrent process_job Lambda invocations (min 2)"
+  type        = number
+  default     = 5
+}
+
+variable "process_job_batch_size" {
+  description = "SQS messages handed to each process_job invocation"
+  type        = number
+  default     = 10
+}
+
+variable "job_max_receive_count" {
+  description = "Dispatch attempts per job before its message moves to the DLQ"
+  type        = number
+  default     = 10
+}
+
 variable "api_rate_limit" {
   description = "API Gateway rate limit (requests per second)"
   type        = number
@@ -50,6 +156,24 @@ variable "api_burst_limit" {
   default     = 20
 }
 
+variable "authorizer_cache_ttl_seconds" {
+  description = "How long API Gateway caches an authorizer result per token (0 disables). Role changes and removals take effect for existing tokens after at most this long."
+  type        = number
+  default     = 300
+}
+
+variable "archive_after_days" {
+  description = "Days after which finished tasks move from DynamoDB to the S3 archive (keep below the table's 7-day TTL)"
+  type        = number
+  default     = 3
+}
+
+variable "task_archive_retention_days" {
+  description = "Days to keep archived tasks in S3 (0 keeps them indefinitely)"
+  type        = number
+  default     = 0
+}
+
 variable "vpc_cidr" {
   description = "CIDR block for the VPC"
   type        = string
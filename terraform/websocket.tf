@@ -0,0 +1,74 @@
+# ============================================================================
+# API Gateway — WebSocket API for push-based job status updates
+# ============================================================================
+
+resource "aws_apigatewayv2_api" "status" {
+  name                       = "${local.name_prefix}-status-ws"
+  description                = "Pushes job status changes to subscribed frontend clients"
+  protocol_type              = "WEBSOCKET"
+  route_selection_expression = "$request.body.action"
+
+  tags = {
+    Name = "${local.name_prefix}-status-ws"
+  }
+}
+
+# ---------------------------------------------------------------------------
+# $connect Authorizer — same RBAC Lambda, token passed as ?token=<jwt>
+# ---------------------------------------------------------------------------
+resource "aws_apigatewayv2_authorizer" "status_rbac" {
+  api_id                     = aws_apigatewayv2_api.status.id
+  name                       = "${local.name_prefix}-status-ws-authorizer"
+  authorizer_type            = "REQUEST"
+  authorizer_uri             = aws_lambda_function.authorizer.invoke_arn
+  authorizer_credentials_arn = aws_iam_role.api_gw_authorizer.arn
+  identity_sources           = ["route.request.querystring.token"]
+}
+
+# ---------------------------------------------------------------------------
+# Routes → ws_connections Lambda
+# ---------------------------------------------------------------------------
+resource "aws_apigatewayv2_integration" "ws_connections" {
+  api_id             = aws_apigatewayv2_api.status.id
+  integration_type   = "AWS_PROXY"
+  integration_uri    = aws_lambda_function.ws_connections.invoke_arn
+  integration_method = "POST"
+}
+
+resource "aws_apigatewayv2_route" "connect" {
+  api_id             = aws_apigatewayv2_api.status.id
+  route_key          = "$connect"
+  authorization_type = "CUSTOM"
+  authorizer_id      = aws_apigatewayv2_authorizer.status_rbac.id
+  target             = "integrations/${aws_apigatewayv2_integration.ws_connections.id}"
+}
+
+resource "aws_apigatewayv2_route" "disconnect" {
+  api_id    = aws_apigatewayv2_api.status.id
+  route_key = "$disconnect"
+  target    = "integrations/${aws_apigatewayv2_integration.ws_connections.id}"
+}
+
+resource "aws_apigatewayv2_route" "default" {
+  api_id    = aws_apigatewayv2_api.status.id
+  route_key = "$default"
+  target    = "integrations/${aws_apigatewayv2_integration.ws_connections.id}"
+}
+
+# ---------------------------------------------------------------------------
+# Stage
+# ---------------------------------------------------------------------------
+resource "aws_apigatewayv2_stage" "status_v1" {
+  api_id      = aws_apigatewayv2_api.status.id
+  name        = "v1"
+  auto_deploy = true
+
+  default_route_settings {
+    throttling_rate_limit  = var.api_rate_limit
+    throttling_burst_limit = var.api_burst_limit
+  }
+
+  tags = {
+    Name = "${local.name_prefix}-status-ws-v1"
+  }
+}